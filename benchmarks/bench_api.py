@@ -0,0 +1,229 @@
+"""Benchmark the HTTP API with a mixed read/write load
+
+Usage:
+    python benchmarks/bench_api.py [--connections 16] [--requests 5000] [--users 4]
+                                   [--tasks 1000] [--write-ratio 0.2] [--port 8765]
+
+Without --port a server is started with ``python -m todo serve --port 0``
+in a temporary directory, with cheap password hashing so that setting up
+the users is quick. Each of --users users is registered, logged in and
+given --tasks tasks. Then --connections client connections share
+--requests requests. Reads list a filtered page of tasks, search the task
+names or fetch one task. Writes add, edit or complete a task. The run is
+made once with keep-alive connections and once with a new connection per
+request. Requests per second and the p50/p99 latency, overall and per
+request kind, are printed as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READS = ("list_page", "search", "get_task")
+WRITES = ("add_task", "edit_task", "complete_task")
+
+
+class Connection:
+    """Minimal HTTP/1.1 client connection for JSON requests"""
+    def __init__(self, port: int, keep_alive: bool):
+        self.port = port
+        self.keep_alive = keep_alive
+        self.reader = None
+        self.writer = None
+    
+    async def request(self, method: str, path: str, body=None, token=None):
+        """Send one request and return (status, decoded JSON body)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        payload = b"" if body is None else json.dumps(body).encode('utf-8')
+        head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(payload)}\r\n"
+        if payload:
+            head += "Content-Type: application/json\r\n"
+        if token is not None:
+            head += f"Authorization: Bearer {token}\r\n"
+        if not self.keep_alive:
+            head += "Connection: close\r\n"
+        self.writer.write(head.encode('latin-1') + b"\r\n" + payload)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        close = False
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+            elif name.lower() == "connection" and value.strip().lower() == "close":
+                close = True
+        data = json.loads(await self.reader.readexactly(length)) if length else None
+        if close:
+            self.close()
+        return status, data
+    
+    def close(self):
+        """Close the socket"""
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def percentile(samples, fraction: float) -> float:
+    """Value below which the given fraction of sorted samples fall"""
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def summarize(latencies, elapsed: float):
+    """Requests per second and latency percentiles in milliseconds"""
+    samples = sorted(latencies)
+    return {
+        "requests": len(samples),
+        "requests_per_s": round(len(samples) / elapsed) if elapsed else None,
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+    }
+
+
+async def set_up_users(port: int, users: int, tasks: int):
+    """Register, log in and fill every user; returns [(token, task ids)]"""
+    connection = Connection(port, keep_alive=True)
+    sessions = []
+    for number in range(users):
+        credentials = {"username": f"bench{number}", "password": "benchmark"}
+        await connection.request("POST", "/register", credentials)
+        status, data = await connection.request("POST", "/login", credentials)
+        if status != 200:
+            raise SystemExit(f"Login failed: {data}")
+        token = data["token"]
+        status, data = await connection.request("GET", "/tasks", token=token)
+        ids = [task["id"] for task in data["tasks"]]
+        for i in range(len(ids), tasks):
+            status, task = await connection.request("POST", "/tasks", {
+                "name": f"Task {i} {random.choice(['report', 'groceries', 'invoice', 'meeting'])}",
+                "priority": random.choice(["High", "Low"]),
+                "due_date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "category": random.choice(["Work", "Personal", "Study"]),
+            }, token)
+            ids.append(task["id"])
+        sessions.append((token, ids))
+    connection.close()
+    return sessions
+
+
+async def run_load(port: int, sessions, connections: int, requests: int, write_ratio: float,
+                   keep_alive: bool, rng: random.Random):
+    """Run the mixed workload; returns (latencies by kind, elapsed seconds, errors)"""
+    latencies = {kind: [] for kind in READS + WRITES}
+    remaining = [requests]
+    errors = [0]
+    
+    async def client(number: int):
+        token, ids = sessions[number % len(sessions)]
+        connection = Connection(port, keep_alive)
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            kind = rng.choice(WRITES if rng.random() < write_ratio else READS)
+            if kind == "list_page":
+                request = ("GET", "/tasks?status=Pending&category=Work&order_by=due_date&limit=50", None)
+            elif kind == "search":
+                request = ("GET", f"/tasks?text={rng.choice(['rep', 'groc', 'inv', 'meet'])}&limit=50", None)
+            elif kind == "get_task":
+                request = ("GET", f"/tasks/{rng.choice(ids)}", None)
+            elif kind == "add_task":
+                request = ("POST", "/tasks", {"name": f"New task {remaining[0]}", "category": "Work"})
+            elif kind == "edit_task":
+                request = ("PATCH", f"/tasks/{rng.choice(ids)}", {"priority": rng.choice(["High", "Low"])})
+            else:
+                request = ("POST", f"/tasks/{rng.choice(ids)}/complete", None)
+            start = time.perf_counter()
+            status, data = await connection.request(*request, token=token)
+            latencies[kind].append(time.perf_counter() - start)
+            if status >= 400:
+                errors[0] += 1
+            elif kind == "add_task":
+                ids.append(data["id"])
+        connection.close()
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(connections)))
+    return latencies, time.perf_counter() - start, errors[0]
+
+
+def report(latencies, elapsed: float, errors: int):
+    """Summaries overall and per request kind"""
+    everything = [sample for samples in latencies.values() for sample in samples]
+    result = summarize(everything, elapsed)
+    result["errors"] = errors
+    result["by_kind"] = {}
+    for kind, samples in latencies.items():
+        if samples:
+            summary = summarize(samples, elapsed)
+            del summary["requests_per_s"]
+            result["by_kind"][kind] = summary
+    return result
+
+
+def start_server(directory: str):
+    """Start ``python -m todo serve --port 0``; returns (process, port)"""
+    env = dict(os.environ, PYTHONPATH=ROOT, TODO_PASSWORD_ITERATIONS="1000")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "todo", "serve", "--port", "0"],
+        cwd=directory, env=env, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    if not line:
+        raise SystemExit("The server did not start")
+    return process, int(line.rsplit(":", 1)[1])
+
+
+async def bench(args, port: int):
+    """Set up the users and run the workload both ways"""
+    rng = random.Random(1)
+    sessions = await set_up_users(port, args.users, args.tasks)
+    results = {}
+    for label, keep_alive in (("keep_alive", True), ("connection_per_request", False)):
+        latencies, elapsed, errors = await run_load(
+            port, sessions, args.connections, args.requests, args.write_ratio, keep_alive, rng
+        )
+        results[label] = report(latencies, elapsed, errors)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per run")
+    parser.add_argument("--users", type=int, default=4, help="users the connections are spread over")
+    parser.add_argument("--tasks", type=int, default=1000, help="tasks per user")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="fraction of requests that write")
+    parser.add_argument("--port", type=int, help="use the server already running on this port")
+    args = parser.parse_args()
+    
+    process = None
+    with tempfile.TemporaryDirectory() as directory:
+        port = args.port
+        if port is None:
+            process, port = start_server(directory)
+        try:
+            results = asyncio.run(bench(args, port))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    print(json.dumps({
+        "connections": args.connections, "users": args.users, "tasks_per_user": args.tasks,
+        "write_ratio": args.write_ratio, "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark archiving old completed tasks
+
+Usage:
+    python benchmarks/bench_archive.py [--tasks 100000] [--completed 0.8] [--backend json]
+
+A user's task file with --tasks synthetic tasks, of which the fraction
+--completed were completed 31 to 1,000 days ago, is written to a temporary
+directory. Loading and saving it are timed before and after
+TaskManager.archive_completed moves those tasks to the archive, and reading
+the newest, a middle and the oldest page of the archive is timed. The
+archive is then checked against the tasks that were moved; results are
+printed as JSON and the exit status is 1 if they differ.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager, create_storage  # noqa: E402
+
+
+def make_task(i: int, rng: random.Random, completed: float) -> Task:
+    """Create one synthetic task, completed long ago with probability completed"""
+    task = Task(f"Task {i}", rng.choice(["High", "Low"]), f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                rng.choice(CATEGORIES), "Pending")
+    if rng.random() < completed:
+        task.status = "Completed"
+        task.completed_at = (date.today() - timedelta(days=rng.randint(31, 1000))).isoformat()
+    return task
+
+
+def timed(func) -> float:
+    """Milliseconds taken by one call of func"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def time_load_save(backend: str):
+    """Milliseconds to load the user's tasks and to save them again"""
+    managers = []
+    load_ms = timed(lambda: managers.append(TaskManager("bench", create_storage("bench", backend))))
+    task_manager = managers[0]
+    save_ms = timed(task_manager.save_tasks)
+    task_manager.close()
+    return {"tasks": len(task_manager.tasks), "load_ms": round(load_ms, 1), "save_ms": round(save_ms, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000, help="tasks in the file")
+    parser.add_argument("--completed", type=float, default=0.8, help="fraction of old completed tasks")
+    parser.add_argument("--backend", choices=["json", "ndjson", "sqlite"], default="json")
+    args = parser.parse_args()
+    
+    rng = random.Random(1)
+    tasks = [make_task(i, rng, args.completed) for i in range(args.tasks)]
+    archived_ids = [task.id for task in tasks if task.status == "Completed"]
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            storage = create_storage("bench", args.backend)
+            storage.save_all(tasks)
+            storage.close()
+            before = time_load_save(args.backend)
+            
+            task_manager = TaskManager("bench", create_storage("bench", args.backend))
+            archive_ms = timed(task_manager.archive_completed)
+            task_manager.close()
+            after = time_load_save(args.backend)
+            
+            archive = task_manager.archive
+            pages = archive.page_count()
+            page_ms = {
+                name: round(timed(lambda: archive.read_page(page)), 2)
+                for name, page in (("newest", 0), ("middle", pages // 2), ("oldest", pages - 1))
+            }
+            newest = [task.id for task in archive.read_page(0)]
+            matches = (
+                [task.id for task in archive.iter_tasks()] == archived_ids
+                and newest == archived_ids[::-1][:len(newest)]
+                and after["tasks"] == args.tasks - len(archived_ids)
+            )
+            archive_bytes = os.path.getsize(archive.filename)
+        finally:
+            os.chdir(cwd)
+    print(json.dumps({
+        "tasks": args.tasks, "archived": len(archived_ids), "backend": args.backend,
+        "before": before, "archive_ms": round(archive_ms, 1), "after": after,
+        "archive_bytes": archive_bytes, "pages": pages, "read_page_ms": page_ms,
+        "archive_matches": matches,
+    }, indent=2))
+    if not matches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark opening JSON and binary task files with TaskManager
+
+Usage:
+    python benchmarks/bench_binary.py [--sizes 10000,100000] [--runs 5]
+
+For every size, saves the same synthetic tasks with JsonTaskStorage and
+BinaryTaskStorage in a temporary directory and prints as JSON the file
+sizes, the median time for a TaskManager to load each, the time for a
+binary-backed TaskManager to return the first screenful of tasks and the
+summary counts, the time the GUI's finish_loading then takes to look
+for tasks to archive and to schedule the reminders, which should decode
+no more tasks, and the time it takes to decode every task and build the
+indexes. The binary file is also converted back to JSON, and the
+exit status is 1 if that differs from the JSON file.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager  # noqa: E402
+from todo.formats import convert_tasks  # noqa: E402
+from todo.reminders import ReminderScheduler  # noqa: E402
+from todo.storage import BinaryTaskStorage, JsonTaskStorage  # noqa: E402
+
+# Rows the GUI shows at once
+SCREEN_ROWS = 30
+
+# Archive only tasks completed before make_tasks' date, so none are, as on
+# every start but the first
+KEEP_DAYS = 100000
+
+
+def make_tasks(count: int, seed: int = 1):
+    """Synthetic tasks with a mix of fields"""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(count):
+        due = "" if rng.random() < 0.3 else f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        task = Task(f"Task number {i}", rng.choice(["High", "Low"]), due, rng.choice(CATEGORIES),
+                    rng.choice(["Pending", "Completed"]))
+        if task.status == "Completed":
+            task.completed_at = "2025-06-01"
+        tasks.append(task)
+    return tasks
+
+
+def median_ms(func, runs: int) -> float:
+    """Median wall time of func in milliseconds"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 2)
+
+
+def open_manager(storage_class, filename: str) -> TaskManager:
+    """A TaskManager over the given task file"""
+    return TaskManager("bench", storage_class(filename))
+
+
+def bench_size(directory: str, count: int, runs: int):
+    """Measurements for one size"""
+    json_file = os.path.join(directory, f"json_{count}_tasks.json")
+    binary_file = os.path.join(directory, f"binary_{count}_tasks.tdb")
+    tasks = make_tasks(count)
+    for storage_class, filename in ((JsonTaskStorage, json_file), (BinaryTaskStorage, binary_file)):
+        storage = storage_class(filename)
+        storage.save_all(tasks)
+        storage.close()
+    
+    result = {
+        "tasks": count,
+        "json_bytes": os.path.getsize(json_file),
+        "binary_bytes": os.path.getsize(binary_file),
+        "json_load_ms": median_ms(lambda: open_manager(JsonTaskStorage, json_file).close(), runs),
+        "binary_load_ms": median_ms(lambda: open_manager(BinaryTaskStorage, binary_file).close(), runs),
+    }
+    
+    task_manager = open_manager(BinaryTaskStorage, binary_file)
+    start = time.perf_counter()
+    screen = [task_manager.tasks[index].name for index in range(min(SCREEN_ROWS, count))]
+    task_manager.get_stats().summary()
+    result["binary_first_screen_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    start = time.perf_counter()
+    task_manager.archive_completed(KEEP_DAYS)
+    reminders = ReminderScheduler(task_manager, lambda events: None, call_later=lambda delay, func: None,
+                                  cancel=lambda handle: None)
+    reminders.start()
+    result["binary_archive_and_reminders_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    result["binary_decoded_at_start"] = task_manager.tasks.decoded
+    reminders.stop()
+    start = time.perf_counter()
+    task_manager.index
+    result["binary_decode_and_index_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    assert screen == [task.name for task in tasks[:len(screen)]]
+    task_manager.close()
+    
+    round_trip = os.path.join(directory, f"round_trip_{count}.json")
+    convert_tasks(binary_file, round_trip)
+    with open(json_file, 'rb') as f, open(round_trip, 'rb') as g:
+        result["round_trip_equal"] = f.read() == g.read()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated task counts")
+    parser.add_argument("--runs", type=int, default=5, help="loads per median")
+    args = parser.parse_args()
+    
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (int(size) for size in args.sizes.split(",")):
+            results.append(bench_size(directory, count, args.runs))
+    print(json.dumps(results, indent=2))
+    if not all(result["round_trip_equal"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark bulk task operations against the per-task path
+
+Usage:
+    python benchmarks/bench_bulk.py [--tasks 10000] [--batch 500] [--backends json,sqlite]
+
+For every storage backend this completes and then deletes --batch tasks
+out of a list of --tasks, once with mark_completed/delete_task per task
+and once with complete_tasks/delete_tasks, and prints the elapsed time and
+tasks per second of each as JSON. Files are written to a temporary
+directory with the default durability level.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager, create_storage  # noqa: E402
+
+
+def make_task(i: int) -> Task:
+    """Create one synthetic pending task"""
+    return Task(f"Task {i}", "High" if i % 3 == 0 else "Low", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                CATEGORIES[i % len(CATEGORIES)], "Pending")
+
+
+def fresh_manager(backend: str, username: str, count: int) -> TaskManager:
+    """Create a manager whose storage holds count pending tasks"""
+    task_manager = TaskManager(username, create_storage(username, backend))
+    task_manager.storage.save_all([make_task(i) for i in range(count)])
+    task_manager.load_tasks()
+    return task_manager
+
+
+def measure(func, batch: int):
+    """Run func once, returning elapsed milliseconds and tasks per second"""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    return {"ms": round(elapsed * 1000, 3), "tasks_per_s": round(batch / elapsed)}
+
+
+def bench_backend(backend: str, count: int, batch: int):
+    """Time per-task and bulk completion and deletion on one backend"""
+    # Evenly spaced, so the batch is spread over the whole list
+    step = max(1, count // batch)
+    indexes = list(range(0, count, step))[:batch]
+    results = {}
+    
+    task_manager = fresh_manager(backend, "single", count)
+    results["mark_completed_each"] = measure(lambda: [task_manager.mark_completed(i) for i in indexes], batch)
+    results["delete_task_each"] = measure(
+        lambda: [task_manager.delete_task(i) for i in reversed(indexes)], batch
+    )
+    task_manager.close()
+    
+    task_manager = fresh_manager(backend, "bulk", count)
+    results["complete_tasks"] = measure(lambda: task_manager.complete_tasks(indexes), batch)
+    results["delete_tasks"] = measure(lambda: task_manager.delete_tasks(indexes), batch)
+    task_manager.close()
+    
+    results["complete_speedup"] = round(
+        results["mark_completed_each"]["ms"] / results["complete_tasks"]["ms"], 1
+    )
+    results["delete_speedup"] = round(results["delete_task_each"]["ms"] / results["delete_tasks"]["ms"], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000, help="tasks in the list")
+    parser.add_argument("--batch", type=int, default=500, help="tasks completed and deleted")
+    parser.add_argument("--backends", default="json,sqlite", help="comma-separated storage backends")
+    args = parser.parse_args()
+    
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            results = {
+                backend: bench_backend(backend, args.tasks, args.batch)
+                for backend in args.backends.split(",")
+            }
+        finally:
+            os.chdir(previous)
+    print(json.dumps({"tasks": args.tasks, "batch": args.batch, "backends": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
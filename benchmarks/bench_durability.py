@@ -0,0 +1,88 @@
+"""Benchmark the cost of each durability level for task and user file writes
+
+Usage:
+    python benchmarks/bench_durability.py [--tasks 1000] [--repeat 20]
+
+For every level in DURABILITY_LEVELS this times a full snapshot write
+(atomic_write of a task list), a single journal append, a legacy
+users.json save and a users.db registration, and prints the results as
+JSON. All files are written to a temporary directory.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import DURABILITY_LEVELS, JsonTaskStorage, JsonUserStore, SqliteUserStore, Task, atomic_write  # noqa: E402
+
+
+def make_tasks(count: int):
+    """Create synthetic tasks"""
+    return [
+        Task(f"Task {i}", "High" if i % 3 == 0 else "Low", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+             "Work", "Completed" if i % 4 == 0 else "Pending")
+        for i in range(count)
+    ]
+
+
+def time_calls(func, repeat: int):
+    """Time repeated calls of func, returning milliseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def bench_level(directory: str, durability: str, tasks, repeat: int):
+    """Time snapshot, journal and users.json writes at one durability level"""
+    snapshot = json.dumps([task.to_dict() for task in tasks], indent=2).encode('utf-8')
+    snapshot_file = os.path.join(directory, f"{durability}_tasks.json")
+    
+    storage = JsonTaskStorage(snapshot_file, durability=durability)
+    storage.load()
+    task = tasks[0]
+    
+    users = JsonUserStore(os.path.join(directory, f"{durability}_users.json"), durability)
+    users.users = {f"user{i}": {"password": "0" * 64} for i in range(1000)}
+    user_db = SqliteUserStore(os.path.join(directory, f"{durability}_users.db"), durability, None)
+    names = iter(range(10 ** 9))
+    
+    results = {
+        "snapshot_write": time_calls(lambda: atomic_write(snapshot_file, snapshot, durability), repeat),
+        "journal_append": time_calls(lambda: storage.insert(task), repeat),
+        "users_json_save": time_calls(users.save_users, repeat),
+        "users_db_insert": time_calls(lambda: user_db.add(f"user{next(names)}", {"password": "0" * 64}), repeat),
+    }
+    storage.close()
+    user_db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000, help="tasks in the snapshot")
+    parser.add_argument("--repeat", type=int, default=20, help="writes timed per measurement")
+    args = parser.parse_args()
+    
+    tasks = make_tasks(args.tasks)
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            level: bench_level(directory, level, tasks, args.repeat)
+            for level in DURABILITY_LEVELS
+        }
+    print(json.dumps({"tasks": args.tasks, "repeat": args.repeat, "levels": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
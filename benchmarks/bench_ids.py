@@ -0,0 +1,107 @@
+"""Benchmark finding, updating and deleting tasks by id at several list sizes
+
+Usage:
+    python benchmarks/bench_ids.py [--sizes 10000,100000,1000000] [--repeat 200]
+
+For each size an in-memory TaskManager is filled with synthetic tasks and
+the median time of get_task, index_of_id, update_task_by_id and
+delete_task_by_id is printed as JSON. Deletions are timed at the front of
+the list, where every later task has to move up one place, at random
+positions and at the end. ``pop_front_ms`` is the time of the same move in
+a plain list of that size, which is the O(N) part of a deletion. The exit
+status is 1 if a deletion takes longer than NFR-1 allows for a user action.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager, TaskStorage  # noqa: E402
+
+# NFR-1: every user action within 1000 ms
+ACTION_TARGET_MS = 1000
+
+
+class MemoryStorage(TaskStorage):
+    """Storage that keeps nothing, so only the in-memory work is timed"""
+    def load(self):
+        return []
+    
+    def insert(self, task):
+        return True
+    
+    def update(self, index, task):
+        return True
+    
+    def delete(self, index, task_id=None):
+        return True
+    
+    def save_all(self, tasks):
+        return True
+
+
+def make_task(i: int, rng: random.Random) -> Task:
+    """Create one synthetic task"""
+    return Task(f"Task {i}", rng.choice(["High", "Low"]), f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                rng.choice(CATEGORIES), "Pending")
+
+
+def median_ms(func, ids) -> float:
+    """Median milliseconds taken by func for each id"""
+    times = []
+    for task_id in ids:
+        start = time.perf_counter()
+        func(task_id)
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 4)
+
+
+def bench_size(size: int, repeat: int):
+    """Time the by-id operations on a list of size tasks"""
+    rng = random.Random(1)
+    task_manager = TaskManager("bench", MemoryStorage())
+    task_manager.extend_loaded([make_task(i, rng) for i in range(size)])
+    tasks = task_manager.get_all_tasks()
+    counter = iter(range(size, size * 10))
+    
+    def replace(task_id: str):
+        task = make_task(next(counter), rng)
+        task.id = task_id
+        task_manager.update_task_by_id(task_id, task)
+    
+    random_ids = [tasks[rng.randrange(size)].id for _ in range(repeat)]
+    result = {
+        "get_task_ms": median_ms(task_manager.get_task, random_ids),
+        "index_of_id_ms": median_ms(task_manager.index_of_id, random_ids),
+        "update_task_by_id_ms": median_ms(replace, random_ids),
+        "delete_front_ms": median_ms(task_manager.delete_task_by_id, [task.id for task in tasks[:repeat]]),
+        "delete_random_ms": median_ms(task_manager.delete_task_by_id,
+                                      [task.id for task in rng.sample(tasks, repeat)]),
+        "delete_end_ms": median_ms(task_manager.delete_task_by_id, [task.id for task in tasks[-repeat:][::-1]]),
+    }
+    plain = list(range(size))
+    result["pop_front_ms"] = median_ms(lambda _: plain.pop(0), range(repeat))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated list sizes")
+    parser.add_argument("--repeat", type=int, default=200, help="calls timed per measurement")
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = {size: bench_size(size, args.repeat) for size in sizes}
+    print(json.dumps(results, indent=2))
+    slowest = max(result[key] for result in results.values() for key in result if key.startswith("delete_"))
+    if slowest > ACTION_TARGET_MS:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
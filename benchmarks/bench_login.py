@@ -0,0 +1,74 @@
+"""Benchmark login latency for each password hashing cost
+
+Usage:
+    python benchmarks/bench_login.py [--iterations 100000,300000,600000,1200000] [--repeat 10]
+
+For every PBKDF2 iteration count this times register_user, a first
+verify_user (which derives the hash) and a repeated verify_user answered
+from the session cache, plus verification of a legacy unsalted SHA-256
+hash including its upgrade. Results are printed as JSON. The user
+database is created in a temporary directory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import SqliteUserStore, UserManager  # noqa: E402
+
+PASSWORD = "bench-password"
+
+
+def time_calls(func, repeat: int):
+    """Time repeated calls of func, returning milliseconds per call"""
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def bench_cost(directory: str, iterations: int, repeat: int):
+    """Time registration and login at one iteration count"""
+    store = SqliteUserStore(os.path.join(directory, f"{iterations}_users.db"), legacy_filename=None)
+    users = UserManager(store, iterations=iterations)
+    legacy = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    for i in range(repeat):
+        store.add(f"legacy{i}", {"password": legacy})
+    
+    results = {
+        "register_user": time_calls(lambda i: users.register_user(f"user{i}", PASSWORD), repeat),
+        "verify_user": time_calls(lambda i: users.verify_user(f"user{i}", PASSWORD), repeat),
+        "verify_user_cached": time_calls(lambda i: users.verify_user(f"user{i}", PASSWORD), repeat),
+        "verify_legacy_upgrade": time_calls(lambda i: users.verify_user(f"legacy{i}", PASSWORD), repeat),
+    }
+    users.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", default="100000,300000,600000,1200000",
+                        help="comma-separated PBKDF2 iteration counts")
+    parser.add_argument("--repeat", type=int, default=10, help="logins timed per measurement")
+    args = parser.parse_args()
+    
+    costs = [int(cost) for cost in args.iterations.split(",")]
+    with tempfile.TemporaryDirectory() as directory:
+        results = {str(cost): bench_cost(directory, cost, args.repeat) for cost in costs}
+    print(json.dumps({"repeat": args.repeat, "iterations": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Measure the memory footprint of loaded tasks
+
+Usage:
+    python benchmarks/bench_memory.py [--tasks 100000]
+
+Builds the same synthetic task list twice from decoded JSON, once with a
+plain __dict__-based class equivalent to the original Task and once with
+the current slotted, interned Task, and prints bytes per task for each as
+JSON (measured with tracemalloc).
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task  # noqa: E402
+
+
+class DictTask:
+    """The original Task layout: a plain class with a per-instance __dict__"""
+    def __init__(self, name, priority, due_date, category, status="Pending"):
+        self.name = name
+        self.priority = priority
+        self.due_date = due_date
+        self.category = category
+        self.status = status
+
+
+def make_records(count: int):
+    """Encode and decode synthetic tasks so every string is a separate object"""
+    records = [
+        {
+            "name": f"Task number {i}",
+            "priority": "High" if i % 3 == 0 else "Low",
+            "due_date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "status": "Completed" if i % 4 == 0 else "Pending",
+        }
+        for i in range(count)
+    ]
+    return json.loads(json.dumps(records))
+
+
+def measure(task_class, count: int) -> int:
+    """Bytes kept alive by count task_class objects built from decoded JSON"""
+    gc.collect()
+    tracemalloc.start()
+    records = make_records(count)
+    tasks = [
+        task_class(r["name"], r["priority"], r["due_date"], r["category"], r["status"])
+        for r in records
+    ]
+    # Drop the decoded records so only what the tasks keep alive is counted
+    del records
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tasks
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000, help="number of tasks to build")
+    args = parser.parse_args()
+    
+    results = {}
+    for label, task_class in (("dict", DictTask), ("slots", Task)):
+        used = measure(task_class, args.tasks)
+        results[label] = {"total_bytes": used, "bytes_per_task": round(used / args.tasks, 1)}
+    results["saving"] = round(1 - results["slots"]["total_bytes"] / results["dict"]["total_bytes"], 3)
+    print(json.dumps({"tasks": args.tasks, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measure the cost of the profiling timers and check their percentiles
+
+Usage:
+    python benchmarks/bench_profiling.py [--calls 1000000] [--samples 200000] [--seed 1]
+
+Times --calls calls of an empty function undecorated, decorated with
+profiling.timed while profiling is off, and decorated while it is on, and
+prints the extra nanoseconds per call as JSON. Then --samples random
+log-normal durations are recorded in a LatencyHistogram and its p50, p90,
+p99 and p99.9 are compared with the exact values; the exit status is 1 if
+any is off by more than 12.5%.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import profiling  # noqa: E402
+from todo.profiling import LatencyHistogram  # noqa: E402
+
+
+def empty():
+    """Does nothing"""
+
+
+def ns_per_call(func, calls: int) -> float:
+    """Average nanoseconds per call of func"""
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter_ns() - start) / calls
+
+
+def check_percentiles(samples: int, seed: int):
+    """Relative error of the histogram percentiles on random durations"""
+    rng = random.Random(seed)
+    durations = [int(rng.lognormvariate(13, 2)) for _ in range(samples)]
+    histogram = LatencyHistogram()
+    for duration in durations:
+        histogram.record(duration)
+    durations.sort()
+    errors = {}
+    for fraction in (0.5, 0.9, 0.99, 0.999):
+        exact = durations[max(1, math.ceil(fraction * samples)) - 1]
+        errors[f"p{fraction * 100:g}"] = round(histogram.percentile(fraction) / exact - 1, 4)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000000, help="calls per timing")
+    parser.add_argument("--samples", type=int, default=200000, help="durations in the percentile check")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    decorated = profiling.timed("bench.empty")(empty)
+    profiling.disable()
+    plain_ns = ns_per_call(empty, args.calls)
+    off_ns = ns_per_call(decorated, args.calls)
+    # Set directly: enable() would also write a report at exit
+    profiling.enabled = True
+    on_ns = ns_per_call(decorated, args.calls)
+    profiling.disable()
+    profiling.reset()
+    
+    errors = check_percentiles(args.samples, args.seed)
+    within = all(abs(error) <= 0.125 for error in errors.values())
+    print(json.dumps({
+        "calls": args.calls,
+        "plain_ns_per_call": round(plain_ns, 1),
+        "overhead_off_ns": round(off_ns - plain_ns, 1),
+        "overhead_on_ns": round(on_ns - plain_ns, 1),
+        "percentile_errors": errors,
+        "percentiles_within_12.5%": within,
+    }, indent=2))
+    if not within:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
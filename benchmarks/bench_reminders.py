@@ -0,0 +1,150 @@
+"""Benchmark the due-date reminder scheduler
+
+Usage:
+    python benchmarks/bench_reminders.py [--tasks 200000] [--days 30] [--idle 2]
+
+Builds an in-memory TaskManager with --tasks tasks due within a year
+either side of today, a third of them completed, and times starting a
+ReminderScheduler (parsing every due date and building the heap) and
+add/update/complete/delete with the scheduler following the changes. Then
+a simulated clock runs --days days ahead to count the wake-ups and events,
+and a real scheduler sits idle for --idle seconds to measure the CPU time
+it uses. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, ReminderScheduler, Task, TaskManager, TaskStorage  # noqa: E402
+
+
+class MemoryStorage(TaskStorage):
+    """Storage that keeps nothing, so only the scheduler work is timed"""
+    def load(self):
+        return []
+    
+    def insert(self, task):
+        return True
+    
+    def update(self, index, task):
+        return True
+    
+    def update_many(self, updates):
+        return True
+    
+    def delete(self, index, task_id=None):
+        return True
+    
+    def save_all(self, tasks):
+        return True
+
+
+class SimulatedClock:
+    """Clock and timer pair for ReminderScheduler that runs days in no time"""
+    def __init__(self, now: float):
+        self.now = now
+        self.timers = []
+        self.wakeups = 0
+    
+    def __call__(self) -> float:
+        return self.now
+    
+    def call_later(self, delay: float, func):
+        timer = [self.now + delay, func]
+        self.timers.append(timer)
+        return timer
+    
+    def cancel(self, timer):
+        timer[1] = None
+    
+    def run_until(self, end: float):
+        """Advance to end, running every timer that falls before it"""
+        while True:
+            self.timers = [timer for timer in self.timers if timer[1] is not None]
+            if not self.timers:
+                break
+            timer = min(self.timers, key=lambda timer: timer[0])
+            if timer[0] > end:
+                break
+            self.now = max(self.now, timer[0])
+            func, timer[1] = timer[1], None
+            self.wakeups += 1
+            func()
+        self.now = end
+
+
+def make_task(i: int, rng: random.Random) -> Task:
+    """Create one synthetic task due within a year of today"""
+    due = date.today() + timedelta(days=rng.randint(-365, 365))
+    return Task(f"Task {i}", rng.choice(["High", "Low"]), due.isoformat(), rng.choice(CATEGORIES),
+                "Completed" if i % 3 == 0 else "Pending")
+
+
+def time_calls(func, repeat: int):
+    """Time repeated calls of func, returning milliseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(samples), 4), "max_ms": round(max(samples), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=200000, help="tasks in the list")
+    parser.add_argument("--days", type=int, default=30, help="simulated days to run ahead")
+    parser.add_argument("--idle", type=float, default=2.0, help="seconds to measure idle CPU time")
+    args = parser.parse_args()
+    
+    rng = random.Random(1)
+    task_manager = TaskManager("bench", MemoryStorage())
+    task_manager.extend_loaded([make_task(i, rng) for i in range(args.tasks)])
+    clock = SimulatedClock(time.time())
+    events = []
+    scheduler = ReminderScheduler(task_manager, events.extend, call_later=clock.call_later,
+                                  cancel=clock.cancel, clock=clock)
+    
+    start = time.perf_counter()
+    scheduler.start()
+    results = {"start_ms": round((time.perf_counter() - start) * 1000, 3), "heap_entries": len(scheduler.heap)}
+    clock.run_until(clock.now)
+    results["due_or_overdue_at_start"] = len(events)
+    
+    counter = iter(range(args.tasks, args.tasks * 2))
+    repeat = 1000
+    results["add_task"] = time_calls(lambda: task_manager.add_task(make_task(next(counter), rng)), repeat)
+    results["update_task"] = time_calls(
+        lambda: task_manager.update_task(rng.randrange(args.tasks), make_task(next(counter), rng)), repeat
+    )
+    results["mark_completed"] = time_calls(lambda: task_manager.mark_completed(rng.randrange(args.tasks)), repeat)
+    results["delete_task"] = time_calls(lambda: task_manager.delete_task(rng.randrange(args.tasks)), repeat)
+    
+    events.clear()
+    clock.wakeups = 0
+    clock.run_until(clock.now + args.days * 86400)
+    results["simulated"] = {"days": args.days, "wakeups": clock.wakeups, "events": len(events)}
+    scheduler.stop()
+    
+    # Measured after the first wake-up has reported the tasks already due
+    reported = threading.Event()
+    idle = ReminderScheduler(task_manager, lambda events: reported.set())
+    idle.start()
+    reported.wait(10)
+    cpu = time.process_time()
+    time.sleep(args.idle)
+    results["idle"] = {"seconds": args.idle, "cpu_ms": round((time.process_time() - cpu) * 1000, 3)}
+    idle.stop()
+    print(json.dumps({"tasks": args.tasks, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark text search over task names
+
+Usage:
+    python benchmarks/bench_search.py [--tasks 100000] [--repeat 20]
+
+Builds an in-memory TaskManager with --tasks synthetic tasks whose names
+are drawn from a small vocabulary plus a unique word per task, then times
+the lazy word index build (the first search), several typical
+TaskManager.query_tasks(text=...) searches, and add/update/delete with
+the word index kept up to date. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager, TaskStorage  # noqa: E402
+
+VERBS = ["buy", "call", "write", "review", "fix", "plan", "book", "clean", "send", "read"]
+NOUNS = ["report", "groceries", "dentist", "invoice", "garden", "slides", "car", "budget",
+         "tickets", "letter", "kitchen", "taxes", "presentation", "birthday", "meeting"]
+
+SEARCHES = {
+    "unique_word": "ticket12345",
+    "word": "dentist",
+    "two_words": "call dentist",
+    "prefix_2": "bu",
+    "prefix_then_word": "pre tax",
+    "no_match": "zebra",
+}
+
+
+class MemoryStorage(TaskStorage):
+    """Storage that keeps nothing, so only the index work is timed"""
+    def load(self):
+        return []
+    
+    def insert(self, task):
+        return True
+    
+    def update(self, index, task):
+        return True
+    
+    def delete(self, index, task_id=None):
+        return True
+    
+    def save_all(self, tasks):
+        return True
+
+
+def make_task(i: int, rng: random.Random) -> Task:
+    """Create one synthetic task"""
+    name = f"{rng.choice(VERBS)} {rng.choice(NOUNS)} {rng.choice(NOUNS)} ticket{i}"
+    return Task(name, rng.choice(["High", "Low"]), "", rng.choice(CATEGORIES), "Pending")
+
+
+def time_calls(func, repeat: int):
+    """Time repeated calls of func, returning milliseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "max_ms": round(max(samples), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000, help="tasks in the list")
+    parser.add_argument("--repeat", type=int, default=20, help="calls timed per measurement")
+    args = parser.parse_args()
+    
+    rng = random.Random(1)
+    task_manager = TaskManager("bench", MemoryStorage())
+    task_manager.extend_loaded([make_task(i, rng) for i in range(args.tasks)])
+    
+    start = time.perf_counter()
+    task_manager.query_tasks(text="a")
+    results = {"build_ms": round((time.perf_counter() - start) * 1000, 3), "searches": {}}
+    for label, text in SEARCHES.items():
+        results["searches"][label] = time_calls(lambda: task_manager.query_tasks(text=text), args.repeat)
+        results["searches"][label]["matches"] = len(task_manager.query_tasks(text=text))
+    results["searches"]["word_and_status"] = time_calls(
+        lambda: task_manager.query_tasks(status="Pending", priority="High", text="dentist"), args.repeat
+    )
+    
+    counter = iter(range(args.tasks, args.tasks * 2))
+    results["add_task"] = time_calls(lambda: task_manager.add_task(make_task(next(counter), rng)), args.repeat)
+    results["update_task"] = time_calls(
+        lambda: task_manager.update_task(rng.randrange(args.tasks), make_task(next(counter), rng)), args.repeat
+    )
+    results["delete_task"] = time_calls(lambda: task_manager.delete_task(rng.randrange(args.tasks)), args.repeat)
+    print(json.dumps({"tasks": args.tasks, "repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Measure command-line startup time and check that it avoids GUI imports
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--tasks 100] [--max-ms 150]
+
+Creates a throwaway user with a synthetic task list in a temporary
+directory, logs in once, then runs ``python -m todo --user ... list``
+repeatedly and reports wall-clock startup time, the cumulative import time
+of the todo package and of the CLI (from ``-X importtime``) and a baseline
+``python -c pass``. Exits with status 1 if the median run takes longer
+than --max-ms more than the baseline, or if tkinter, the GUI, the API
+server or the parallel import/export modules show up among the imported
+modules.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from todo import Task, TaskManager, UserManager  # noqa: E402
+
+USERNAME = "startup"
+PASSWORD = "startup-password"
+
+# Milliseconds a CLI command may take beyond starting Python (about 80 ms
+# when measured, with room for slower machines)
+STARTUP_TARGET_MS = 150
+
+# Modules the CLI's list command must not import
+HEAVY_MODULES = (
+    "tkinter", "_tkinter", "todo.gui", "todo.server", "todo.transfer", "asyncio", "multiprocessing",
+)
+
+
+def run(command, directory: str, env) -> float:
+    """Run a command and return its wall-clock time in milliseconds"""
+    start = time.perf_counter()
+    subprocess.run(command, cwd=directory, env=env, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def imported_modules(directory: str, env):
+    """Run the CLI once with -X importtime and return {module: cumulative_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "todo", "--user", USERNAME, "list"],
+        cwd=directory, env=env, check=True, stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE, text=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = [field.strip() for field in line[len("import time:"):].split("|")]
+        if fields[1].isdigit():
+            modules[fields[2]] = int(fields[1])
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per command")
+    parser.add_argument("--tasks", type=int, default=100, help="tasks in the user's list")
+    parser.add_argument("--max-ms", type=float, default=STARTUP_TARGET_MS,
+                        help="allowed median CLI time beyond the Python baseline")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        previous = os.getcwd()
+        os.chdir(directory)
+        try:
+            UserManager().register_user(USERNAME, PASSWORD)
+            task_manager = TaskManager(USERNAME)
+            for i in range(args.tasks):
+                task_manager.add_task(Task(f"Task {i}", "Low", "2025-06-01", "Work"))
+            task_manager.close()
+        finally:
+            os.chdir(previous)
+        
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT, TODO_PASSWORD=PASSWORD)
+        cli = [sys.executable, "-m", "todo", "--user", USERNAME, "list"]
+        # Logs in, so the timed runs use the session like repeated commands do
+        run(cli, directory, env)
+        baseline = [run([sys.executable, "-c", "pass"], directory, env) for _ in range(args.runs)]
+        startup = [run(cli, directory, env) for _ in range(args.runs)]
+        modules = imported_modules(directory, env)
+    
+    heavy_modules = sorted(
+        name for name in modules
+        if any(name == heavy or name.startswith(heavy + ".") for heavy in HEAVY_MODULES)
+    )
+    results = {
+        "runs": args.runs,
+        "tasks": args.tasks,
+        "python_baseline_ms": round(statistics.median(baseline), 1),
+        "cli_list_ms": round(statistics.median(startup), 1),
+        "todo_import_ms": round(modules.get("todo", 0) / 1000, 1),
+        "cli_import_ms": round(modules.get("todo.cli", 0) / 1000, 1),
+        "max_ms": args.max_ms,
+        "heavy_modules_imported": heavy_modules,
+    }
+    print(json.dumps(results, indent=2))
+    too_slow = results["cli_list_ms"] - results["python_baseline_ms"] > args.max_ms
+    return 1 if heavy_modules or too_slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
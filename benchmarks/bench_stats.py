@@ -0,0 +1,175 @@
+"""Check and benchmark the incremental task counters
+
+Usage:
+    python benchmarks/bench_stats.py [--tasks 100000] [--steps 3000] [--seed 1]
+
+First a randomized check: two TaskManagers share one user's JSON files in
+a temporary directory and apply --steps random single and bulk edits,
+deletes, reloads and refreshes (picking up each other's changes), and
+move the date forward. After every step TaskManager.get_stats() is
+compared with a brute-force recount of the task list. Then, for --tasks
+tasks, the time of a summary from the counters is compared with counting
+by scanning the list, and the cost of updating the counters is timed.
+Results are printed as JSON; the exit status is 1 if any count was wrong.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager, create_storage, parse_due_date  # noqa: E402
+
+
+def make_task(rng: random.Random) -> Task:
+    """Create a random task due within a few days of today, or undated"""
+    due = "" if rng.random() < 0.2 else (date.today() + timedelta(days=rng.randint(-5, 5))).isoformat()
+    return Task(f"Task {rng.randrange(10 ** 6)}", rng.choice(["High", "Low"]), due, rng.choice(CATEGORIES),
+                rng.choice(["Pending", "Pending", "Completed"]))
+
+
+def recount(tasks, today: int):
+    """Count by scanning: (combination counts, overdue, due today)"""
+    counts = Counter()
+    overdue = due_today = 0
+    for task in tasks:
+        counts[(task.status, task.priority, task.category)] += 1
+        ordinal = parse_due_date(task.due_date) if task.status != "Completed" else None
+        if ordinal is not None:
+            overdue += ordinal < today
+            due_today += ordinal == today
+    return counts, overdue, due_today
+
+
+def check(task_manager: TaskManager, today: int) -> bool:
+    """Compare the counters with a recount"""
+    stats = task_manager.get_stats()
+    stats.set_today(today)
+    counts, overdue, due_today = recount(task_manager.tasks, today)
+    return (
+        Counter(stats.counts) == counts and stats.overdue == overdue
+        and stats.pending_due.get(today, 0) == due_today
+        and stats.count() == len(task_manager.tasks)
+    )
+
+
+def random_step(task_manager: TaskManager, rng: random.Random):
+    """Apply one random change to a manager; returns its name"""
+    tasks = task_manager.tasks
+    action = rng.choice(["add", "add", "update", "complete", "delete", "bulk_update",
+                         "bulk_complete", "bulk_delete", "save", "load"])
+    if not tasks and action not in ("add", "save", "load"):
+        action = "add"
+    if action == "add":
+        task_manager.add_task(make_task(rng))
+    elif action == "update":
+        task_manager.update_task(rng.randrange(len(tasks)), make_task(rng))
+    elif action == "complete":
+        task_manager.mark_completed(rng.randrange(len(tasks)))
+    elif action == "delete":
+        task_manager.delete_task(rng.randrange(len(tasks)))
+    elif action.startswith("bulk"):
+        indexes = rng.sample(range(len(tasks)), min(len(tasks), rng.randint(1, 20)))
+        if action == "bulk_update":
+            field, value = rng.choice([("priority", "High"), ("category", rng.choice(CATEGORIES)),
+                                       ("status", "Pending"), ("due_date", date.today().isoformat())])
+            task_manager.update_tasks(indexes, **{field: value})
+        elif action == "bulk_complete":
+            task_manager.complete_tasks(indexes)
+        else:
+            task_manager.delete_tasks(indexes)
+    elif action == "save":
+        task_manager.save_tasks()
+    else:
+        task_manager.load_tasks()
+    return action
+
+
+def randomized_check(steps: int, seed: int):
+    """Run the random steps; returns (steps run, mismatches, actions taken)"""
+    rng = random.Random(seed)
+    actions = Counter()
+    mismatches = 0
+    today = date.today().toordinal()
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            managers = [TaskManager("stats", create_storage("stats", "json")) for _ in range(2)]
+            for _ in range(steps):
+                task_manager = rng.choice(managers)
+                if rng.random() < 0.2:
+                    task_manager.refresh()
+                    actions["refresh"] += 1
+                else:
+                    actions[random_step(task_manager, rng)] += 1
+                if rng.random() < 0.01:
+                    today += 1
+                    actions["next_day"] += 1
+                for manager in managers:
+                    if not check(manager, today):
+                        mismatches += 1
+            for manager in managers:
+                manager.close()
+        finally:
+            os.chdir(cwd)
+    return steps, mismatches, dict(actions)
+
+
+def update_counters(task_manager: TaskManager, rng: random.Random):
+    """The counter work of replacing one task by another"""
+    stats = task_manager.get_stats()
+    task = task_manager.tasks[rng.randrange(len(task_manager.tasks))]
+    stats.remove(task)
+    stats.add(task)
+
+
+def time_calls(func, repeat: int):
+    """Time repeated calls of func, returning milliseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(samples), 4), "max_ms": round(max(samples), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000, help="tasks for the timings")
+    parser.add_argument("--steps", type=int, default=3000, help="random steps in the check")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the check")
+    args = parser.parse_args()
+    
+    steps, mismatches, actions = randomized_check(args.steps, args.seed)
+    
+    rng = random.Random(args.seed)
+    # Nothing is written: the tasks are only handed to the manager
+    task_manager = TaskManager("bench", create_storage("bench", "json"), load=False)
+    task_manager.extend_loaded([make_task(rng) for _ in range(args.tasks)])
+    today = date.today().toordinal()
+    timings = {
+        "summary": time_calls(lambda: task_manager.get_stats().summary(), 100),
+        "pending_high_by_category": time_calls(
+            lambda: task_manager.get_stats().count_by("category", status="Pending", priority="High"), 100
+        ),
+        "scan_recount": time_calls(lambda: recount(task_manager.tasks, today), 5),
+        "update_counters": time_calls(lambda: update_counters(task_manager, rng), 1000),
+    }
+    print(json.dumps({
+        "check": {"steps": steps, "mismatches": mismatches, "actions": actions},
+        "tasks": args.tasks, "timings": timings,
+    }, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark importing, exporting and converting task files
+
+Usage:
+    python benchmarks/bench_transfer.py [--tasks 200000] [--workers 1,4]
+
+Writes --tasks synthetic tasks as a .json task file in a temporary
+directory, then converts it through .csv, .ics and .ndjson back to .json
+with each number of --workers, checking that the result equals the
+original byte for byte, and imports the .csv into an in-memory
+TaskManager. Rows per second of every step are printed as JSON, along
+with the cost of checking due dates with the cached parser against a
+strptime call per row. The exit status is 1 if a round trip differs.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager, TaskStorage  # noqa: E402
+from todo.formats import export_tasks  # noqa: E402
+from todo.models import parse_due_date  # noqa: E402
+from todo.transfer import convert_file, import_file  # noqa: E402
+
+
+class MemoryStorage(TaskStorage):
+    """Storage that keeps nothing, so only the import itself is timed"""
+    def load(self):
+        return []
+    
+    def insert(self, task):
+        return True
+    
+    def insert_many(self, tasks):
+        return True
+    
+    def save_all(self, tasks):
+        return True
+
+
+def make_task(i: int, rng: random.Random) -> Task:
+    """Create one synthetic task, some with commas and quotes in the name"""
+    name = f'Task {i}, "quoted"' if i % 10 == 0 else f"Task {i}"
+    due = "" if rng.random() < 0.2 else (date(2025, 1, 1) + timedelta(days=rng.randrange(730))).isoformat()
+    task = Task(name, rng.choice(["High", "Low"]), due, rng.choice(CATEGORIES),
+                rng.choice(["Pending", "Completed"]))
+    if task.status == "Completed":
+        task.completed_at = "2025-06-01"
+    return task
+
+
+def strptime_valid(due_date: str) -> bool:
+    """The date check as a strptime call per row"""
+    try:
+        datetime.strptime(due_date, "%Y-%m-%d")
+        return True
+    except ValueError:
+        return False
+
+
+def time_date_checks(dates):
+    """Rows per second of the cached parser and of strptime"""
+    results = {}
+    for name, check in (("cached_parse", lambda value: parse_due_date(value) is not None),
+                        ("strptime", strptime_valid)):
+        start = time.perf_counter()
+        for value in dates:
+            check(value)
+        results[name] = round(len(dates) / (time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=200000)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="comma-separated worker counts")
+    args = parser.parse_args()
+    
+    rng = random.Random(1)
+    tasks = [make_task(i, rng) for i in range(args.tasks)]
+    results = {"tasks": args.tasks, "cpus": os.cpu_count(), "runs": [], "round_trips_equal": True}
+    with tempfile.TemporaryDirectory() as directory:
+        original = os.path.join(directory, "tasks.json")
+        export_tasks(tasks, original)
+        for workers in sorted({int(value) for value in args.workers.split(",")}):
+            steps = {}
+            source = original
+            for extension in ("csv", "ics", "ndjson", "json"):
+                destination = os.path.join(directory, f"round_trip_{workers}.{extension}")
+                report = convert_file(source, destination, workers)
+                steps[f"{os.path.splitext(source)[1][1:]}_to_{extension}_rows_per_s"] = round(report.rows_per_second)
+                source = destination
+            with open(original, 'rb') as f, open(source, 'rb') as g:
+                equal = f.read() == g.read()
+            results["round_trips_equal"] = results["round_trips_equal"] and equal
+            task_manager = TaskManager("bench", MemoryStorage())
+            report = import_file(task_manager, os.path.join(directory, f"round_trip_{workers}.csv"), workers)
+            steps["import_csv_rows_per_s"] = round(report.rows_per_second)
+            results["runs"].append({"workers": workers, "round_trip_equal": equal, **steps})
+    results["date_check_rows_per_s"] = time_date_checks([task.due_date for task in tasks if task.due_date])
+    print(json.dumps(results, indent=2))
+    if not results["round_trips_equal"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
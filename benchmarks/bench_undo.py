@@ -0,0 +1,101 @@
+"""Benchmark undo and redo at several list sizes
+
+Usage:
+    python benchmarks/bench_undo.py [--sizes 10000,100000,1000000] [--batch 100] [--repeat 20]
+
+For each size an in-memory TaskManager is filled with synthetic tasks,
+then single adds, edits, completions and deletes and bulk edits, completions
+and deletes of --batch tasks are each made, undone and redone. The median
+time of every undo and redo is printed as JSON along with the estimated
+memory the history holds, so the cost can be compared across list sizes.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from todo import CATEGORIES, Task, TaskManager, TaskStorage  # noqa: E402
+
+
+class MemoryStorage(TaskStorage):
+    """Storage that keeps nothing, so only the in-memory work is timed"""
+    def load(self):
+        return []
+    
+    def insert(self, task):
+        return True
+    
+    def update(self, index, task):
+        return True
+    
+    def delete(self, index, task_id=None):
+        return True
+    
+    def save_all(self, tasks):
+        return True
+
+
+def make_task(i: int, rng: random.Random) -> Task:
+    """Create one synthetic task"""
+    return Task(f"Task {i}", rng.choice(["High", "Low"]), f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                rng.choice(CATEGORIES), "Pending")
+
+
+def timed(func) -> float:
+    """Milliseconds taken by one call of func"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_size(size: int, batch: int, repeat: int):
+    """Time undo and redo of every kind of change on a list of size tasks"""
+    rng = random.Random(1)
+    task_manager = TaskManager("bench", MemoryStorage())
+    task_manager.extend_loaded([make_task(i, rng) for i in range(size)])
+    counter = iter(range(size, size * 10))
+    changes = {
+        "add_task": lambda: task_manager.add_task(make_task(next(counter), rng)),
+        "update_task": lambda: task_manager.update_task(rng.randrange(size), make_task(next(counter), rng)),
+        "mark_completed": lambda: task_manager.mark_completed(rng.randrange(size)),
+        "delete_task": lambda: task_manager.delete_task(rng.randrange(size)),
+        "update_tasks": lambda: task_manager.update_tasks(rng.sample(range(size), batch), priority="High"),
+        "complete_tasks": lambda: task_manager.complete_tasks(rng.sample(range(size), batch)),
+        "delete_tasks": lambda: task_manager.delete_tasks(rng.sample(range(size), batch)),
+    }
+    results = {}
+    for label, change in changes.items():
+        undo_times = []
+        redo_times = []
+        for _ in range(repeat):
+            change()
+            undo_times.append(timed(task_manager.undo))
+            redo_times.append(timed(task_manager.redo))
+            task_manager.undo()
+        results[label] = {
+            "undo_ms": round(statistics.median(undo_times), 4),
+            "redo_ms": round(statistics.median(redo_times), 4),
+        }
+    results["history_bytes"] = task_manager.history.size
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated list sizes")
+    parser.add_argument("--batch", type=int, default=100, help="tasks changed by each bulk operation")
+    parser.add_argument("--repeat", type=int, default=20, help="changes undone per measurement")
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = {size: bench_size(size, args.batch, args.repeat) for size in sizes}
+    print(json.dumps({"batch": args.batch, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Benchmark suite for the SRS performance requirements
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1000,10000,100000,1000000]
+                                        [--users 1000] [--output results.json]
+                                        [--baseline previous.json] [--tolerance 1.5]
+
+For each size a synthetic <user>_tasks.json is generated in a temporary
+directory and the suite times TaskManager.load_tasks and save_tasks, every
+mutation method, UserManager.register_user/verify_user against a user base
+of --users accounts, command-line startup, and (when a display or Xvfb is
+available) TodoApp startup plus refresh_task_list and scrolling.
+
+Results are printed (or written to --output) as JSON. The run fails with
+exit status 1 when a measurement exceeds its SRS target:
+
+    NFR-1  every user action (mutation, login, refresh) within 1000 ms
+    NFR-2  loading 1000 tasks within 2000 ms
+    NFR-3  save/load within 500 ms (checked at the 1000 task scale)
+    9.4    application startup within 2000 ms
+
+or, with --baseline, when a measurement is more than --tolerance times
+slower than the same measurement in an earlier results file.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from todo import CATEGORIES, Task, TaskManager, UserManager  # noqa: E402
+
+USERNAME = "bench"
+PASSWORD = "bench-password"
+
+# (metric, SRS requirement, limit in ms, largest size the limit applies to)
+THRESHOLDS = [
+    ("load_ms", "NFR-2", 2000, 1000),
+    ("load_ms", "NFR-3", 500, 1000),
+    ("save_ms", "NFR-3", 500, 1000),
+    ("add_task_ms", "NFR-1", 1000, None),
+    ("update_task_ms", "NFR-1", 1000, None),
+    ("delete_task_ms", "NFR-1", 1000, None),
+    ("mark_completed_ms", "NFR-1", 1000, None),
+    ("register_user_ms", "NFR-1", 1000, None),
+    ("verify_user_ms", "NFR-1", 1000, None),
+    ("cli_startup_ms", "9.4", 2000, None),
+    ("gui_startup_ms", "9.4", 2000, None),
+    ("refresh_task_list_ms", "NFR-1", 1000, None),
+    ("scroll_ms", "NFR-1", 1000, None),
+]
+
+
+def make_task(i: int) -> Task:
+    """Create one synthetic task"""
+    return Task(
+        f"Synthetic task number {i}",
+        "High" if i % 3 == 0 else "Low",
+        "" if i % 10 == 0 else f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+        CATEGORIES[i % len(CATEGORIES)],
+        "Completed" if i % 4 == 0 else "Pending",
+    )
+
+
+def write_task_file(filename: str, count: int):
+    """Write a task file in the format TaskManager saves"""
+    with open(filename, 'w') as f:
+        json.dump([make_task(i).to_dict() for i in range(count)], f, indent=2)
+
+
+def timed(func) -> float:
+    """Run func once and return the elapsed time in milliseconds"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def mean_ms(samples) -> float:
+    """Mean of samples rounded for reporting"""
+    return round(statistics.mean(samples), 3)
+
+
+def bench_tasks(count: int, operations: int):
+    """Time loading, saving and mutating a list of count tasks"""
+    results = {}
+    write_task_file(f"{USERNAME}_tasks.json", count)
+    
+    holder = {}
+    results["load_ms"] = round(timed(lambda: holder.setdefault("tm", TaskManager(USERNAME))), 3)
+    task_manager = holder["tm"]
+    results["save_ms"] = round(timed(task_manager.save_tasks), 3)
+    
+    rng = random.Random(count)
+    samples = {"add_task_ms": [], "update_task_ms": [], "mark_completed_ms": [], "delete_task_ms": []}
+    for i in range(operations):
+        samples["add_task_ms"].append(timed(lambda: task_manager.add_task(make_task(count + i))))
+        index = rng.randrange(len(task_manager.tasks))
+        samples["update_task_ms"].append(timed(lambda: task_manager.update_task(index, make_task(i))))
+        index = rng.randrange(len(task_manager.tasks))
+        samples["mark_completed_ms"].append(timed(lambda: task_manager.mark_completed(index)))
+        index = rng.randrange(len(task_manager.tasks))
+        samples["delete_task_ms"].append(timed(lambda: task_manager.delete_task(index)))
+    for metric, values in samples.items():
+        results[metric] = mean_ms(values)
+    task_manager.close()
+    return results
+
+
+def bench_users(user_count: int, operations: int):
+    """Time registration and login against an existing user base"""
+    users = {f"user{i}": {"password": "0" * 64} for i in range(user_count)}
+    with open("users.json", 'w') as f:
+        json.dump(users, f, indent=2)
+    
+    user_manager = UserManager()
+    register = [timed(lambda: user_manager.register_user(f"new{i}", PASSWORD)) for i in range(operations)]
+    verify = [timed(lambda: user_manager.verify_user(f"new{i}", PASSWORD)) for i in range(operations)]
+    return {"users": user_count, "register_user_ms": mean_ms(register), "verify_user_ms": mean_ms(verify)}
+
+
+def bench_cli(runs: int):
+    """Time `python -m todo list` for the benchmark user"""
+    UserManager().register_user(USERNAME, PASSWORD)
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, TODO_PASSWORD=PASSWORD)
+    command = [sys.executable, "-m", "todo", "--user", USERNAME, "list", "--limit", "20"]
+    samples = [
+        timed(lambda: subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL))
+        for _ in range(runs)
+    ]
+    return {"cli_startup_ms": round(statistics.median(samples), 3)}
+
+
+def start_virtual_display():
+    """Start Xvfb when there is no display; returns the process or None"""
+    if os.environ.get("DISPLAY") or os.name == 'nt' or sys.platform == 'darwin':
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None
+    display = f":{random.randint(100, 999)}"
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def bench_gui(operations: int):
+    """Time TodoApp startup, list refresh and scrolling"""
+    import tkinter as tk
+    from todo.gui import TodoApp
+    
+    try:
+        start = time.perf_counter()
+        app = TodoApp(USERNAME)
+    except tk.TclError as error:
+        return {"gui_skipped": f"no display ({error})"}
+    while app.loading:
+        app.root.update()
+    app.root.update_idletasks()
+    startup = (time.perf_counter() - start) * 1000
+    
+    def refresh():
+        app.refresh_task_list()
+        app.root.update_idletasks()
+    
+    rng = random.Random(0)
+    
+    def scroll():
+        app.task_listbox.yview("moveto", rng.random())
+        app.root.update_idletasks()
+    
+    refresh_samples = [timed(refresh) for _ in range(operations)]
+    scroll_samples = [timed(scroll) for _ in range(operations)]
+    app.on_close()
+    return {
+        "gui_startup_ms": round(startup, 3),
+        "refresh_task_list_ms": mean_ms(refresh_samples),
+        "scroll_ms": mean_ms(scroll_samples),
+    }
+
+
+def check_thresholds(results):
+    """List SRS targets missed by the results"""
+    failures = []
+    for size, measurements in results["sizes"].items():
+        for metric, requirement, limit, max_size in THRESHOLDS:
+            value = measurements.get(metric)
+            if value is None or (max_size is not None and int(size) > max_size):
+                continue
+            if value > limit:
+                failures.append(f"{requirement}: {metric} at {size} tasks took {value} ms (limit {limit} ms)")
+    return failures
+
+
+def check_regressions(results, baseline, tolerance: float):
+    """List measurements more than tolerance times slower than the baseline"""
+    failures = []
+    for size, measurements in results["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size, {})
+        for metric, value in measurements.items():
+            old = previous.get(metric)
+            if not metric.endswith("_ms") or not isinstance(old, (int, float)) or old <= 0:
+                continue
+            if value > old * tolerance:
+                failures.append(f"regression: {metric} at {size} tasks took {value} ms (baseline {old} ms)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="comma-separated task counts (e.g. 1000,10000,100000,1000000)")
+    parser.add_argument("--users", type=int, default=1000, help="existing users for login benchmarks")
+    parser.add_argument("--operations", type=int, default=50, help="timed repetitions per operation")
+    parser.add_argument("--no-gui", action="store_true", help="skip the Tk benchmarks")
+    parser.add_argument("--output", help="write results to this file instead of stdout")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="allowed slowdown factor relative to the baseline")
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(",")]
+    display = None if args.no_gui else start_virtual_display()
+    results = {"python": sys.version.split()[0], "platform": sys.platform, "sizes": {}}
+    previous = os.getcwd()
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                try:
+                    measurements = bench_tasks(size, args.operations)
+                    measurements.update(bench_users(args.users, args.operations))
+                    measurements.update(bench_cli(3))
+                    if not args.no_gui:
+                        measurements.update(bench_gui(args.operations))
+                finally:
+                    os.chdir(previous)
+            results["sizes"][str(size)] = measurements
+            print(f"{size} tasks: done", file=sys.stderr)
+    finally:
+        if display is not None:
+            display.terminate()
+    
+    failures = check_thresholds(results)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += check_regressions(results, json.load(f), args.tolerance)
+    results["failures"] = failures
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""To-Do List Management System
+
+The core modules (models, storage, formats, binary, index, search,
+stats, history, archive, manager, reminders, users, profiling, transfer)
+never import tkinter, so they can be used from scripts, the command-line
+interface and headless servers. The GUI lives in ``todo.gui`` and is only
+imported when the window is started. The names exported here are imported
+from their modules when first used.
+"""
+import importlib
+
+# Public names and the modules that define them. They are imported on first
+# use, so ``from todo.models import Task`` or the command-line interface
+# only load the modules they need.
+_EXPORTS = {
+    "TaskArchive": "todo.archive",
+    "BinaryTaskFile": "todo.binary",
+    "LazyTaskList": "todo.binary",
+    "DURABILITY_LEVELS": "todo.files",
+    "atomic_write": "todo.files",
+    "convert_tasks": "todo.formats",
+    "count_tasks": "todo.formats",
+    "export_tasks": "todo.formats",
+    "iter_tasks": "todo.formats",
+    "TaskIndex": "todo.index",
+    "TaskManager": "todo.manager",
+    "CATEGORIES": "todo.models",
+    "Task": "todo.models",
+    "parse_due_date": "todo.models",
+    "ReminderScheduler": "todo.reminders",
+    "TextIndex": "todo.search",
+    "TaskStats": "todo.stats",
+    "BinaryTaskStorage": "todo.storage",
+    "JsonTaskStorage": "todo.storage",
+    "NdjsonTaskStorage": "todo.storage",
+    "SqliteTaskStorage": "todo.storage",
+    "StorageWorker": "todo.storage",
+    "TaskStorage": "todo.storage",
+    "create_storage": "todo.storage",
+    "JsonUserStore": "todo.users",
+    "SqliteUserStore": "todo.users",
+    "UserManager": "todo.users",
+    "UserStore": "todo.users",
+}
+
+__all__ = [
+    "BinaryTaskFile",
+    "BinaryTaskStorage",
+    "CATEGORIES",
+    "DURABILITY_LEVELS",
+    "JsonTaskStorage",
+    "JsonUserStore",
+    "LazyTaskList",
+    "NdjsonTaskStorage",
+    "ReminderScheduler",
+    "SqliteTaskStorage",
+    "SqliteUserStore",
+    "StorageWorker",
+    "Task",
+    "TaskArchive",
+    "TaskIndex",
+    "TaskManager",
+    "TaskStats",
+    "TaskStorage",
+    "TextIndex",
+    "UserManager",
+    "UserStore",
+    "atomic_write",
+    "convert_tasks",
+    "count_tasks",
+    "create_storage",
+    "export_tasks",
+    "iter_tasks",
+    "parse_due_date",
+]
+
+
+def __getattr__(name: str):
+    """Import a public name from its module on first use"""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'todo' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
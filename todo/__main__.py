@@ -0,0 +1,6 @@
+"""Run the command-line interface with ``python -m todo``"""
+import sys
+
+from todo.cli import main
+
+sys.exit(main())
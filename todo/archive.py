@@ -0,0 +1,156 @@
+"""Compressed, append-only archive of old completed tasks"""
+import gzip
+import io
+import os
+from typing import Iterator, List, Optional, Tuple
+
+from todo.files import DURABILITY, DURABILITY_NONE, FileLock, file_signature
+from todo.formats import encode_ndjson, iter_ndjson
+from todo.models import Task
+
+
+# Completed tasks are archived this many days after they were completed
+ARCHIVE_AFTER_DAYS = int(os.environ.get("TODO_ARCHIVE_DAYS", "30"))
+
+# Tasks per gzip member of the archive file; reading a page of history
+# decompresses only the members it spans
+ARCHIVE_MEMBER_TASKS = 500
+
+# zlib level of the archive; the default of gzip.compress, 9, is much
+# slower for little gain on task records
+ARCHIVE_COMPRESS_LEVEL = 6
+
+# Tasks per page when browsing the archive
+ARCHIVE_PAGE_SIZE = 50
+
+
+class TaskArchive:
+    """A user's archived tasks in ``<username>_archive.ndjson.gz``
+
+    Every append adds gzip members of up to ARCHIVE_MEMBER_TASKS tasks as
+    NDJSON lines to the end of the file, which gzip tools read as one
+    stream. ``<username>_archive.idx`` holds a line "offset length count"
+    per member and is written after the member, so a member is only part
+    of the archive once it is listed; whatever a crash left past the last
+    listed member is cut off by the next append. Nothing is read until
+    the archive is browsed, and a page reads only its own members.
+    """
+    def __init__(self, username: str, durability: Optional[str] = None):
+        base = f"{username}_archive"
+        self.filename = base + ".ndjson.gz"
+        self.index_filename = base + ".idx"
+        self.durability = durability or DURABILITY
+        self.lock = FileLock(base + ".lock")
+        self._members: List[Tuple[int, int, int]] = []
+        self._index_length = 0
+        self._index_signature = None
+    
+    def members(self) -> List[Tuple[int, int, int]]:
+        """(offset, length, task count) of every member, oldest first
+
+        The index file is only read again when it has changed.
+        """
+        signature = file_signature(self.index_filename)
+        if signature != self._index_signature:
+            members = []
+            length = 0
+            try:
+                with open(self.index_filename, 'rb') as f:
+                    for line in f:
+                        parts = line.split()
+                        if not line.endswith(b"\n") or len(parts) != 3:
+                            # An entry cut short by a crash
+                            break
+                        members.append((int(parts[0]), int(parts[1]), int(parts[2])))
+                        length += len(line)
+            except FileNotFoundError:
+                pass
+            self._members = members
+            self._index_length = length
+            self._index_signature = signature
+        return self._members
+    
+    def count(self) -> int:
+        """Number of archived tasks"""
+        return sum(member[2] for member in self.members())
+    
+    def page_count(self, page_size: int = ARCHIVE_PAGE_SIZE) -> int:
+        """Number of pages of history, at least one"""
+        return max(1, -(-self.count() // page_size))
+    
+    def append(self, tasks: List[Task]) -> int:
+        """Add tasks to the end of the archive; returns the number added
+
+        Raises OSError if the archive cannot be written.
+        """
+        if not tasks:
+            return 0
+        with self.lock:
+            members = self.members()
+            end = members[-1][0] + members[-1][1] if members else 0
+            entries = []
+            with open(self.filename, 'ab') as f:
+                f.truncate(end)
+                for start in range(0, len(tasks), ARCHIVE_MEMBER_TASKS):
+                    chunk = tasks[start:start + ARCHIVE_MEMBER_TASKS]
+                    data = b"".join(encode_ndjson(task.to_dict() for task in chunk))
+                    member = gzip.compress(data, ARCHIVE_COMPRESS_LEVEL, mtime=0)
+                    f.write(member)
+                    entries.append(f"{end} {len(member)} {len(chunk)}\n")
+                    end += len(member)
+                self._sync(f)
+            with open(self.index_filename, 'ab') as f:
+                f.truncate(self._index_length)
+                f.write("".join(entries).encode('ascii'))
+                self._sync(f)
+        return len(tasks)
+    
+    def _sync(self, f):
+        """Flush a written file to disk as the durability level asks"""
+        f.flush()
+        if self.durability != DURABILITY_NONE:
+            os.fsync(f.fileno())
+    
+    def _read_member(self, f, offset: int, length: int) -> List[Task]:
+        """Decompress the tasks of one member"""
+        f.seek(offset)
+        data = gzip.decompress(f.read(length))
+        return [Task.from_dict(record) for record in iter_ndjson(io.BytesIO(data))]
+    
+    def read_page(self, page: int, page_size: int = ARCHIVE_PAGE_SIZE) -> List[Task]:
+        """Archived tasks on a page, most recently archived first
+
+        Page 0 holds the newest tasks. Returns an empty list past the end.
+        """
+        members = self.members()
+        total = sum(member[2] for member in members)
+        # The page as a range of positions counted from the oldest task
+        last = total - page * page_size
+        first = max(0, last - page_size)
+        if page < 0 or last <= 0:
+            return []
+        tasks = []
+        position = 0
+        with open(self.filename, 'rb') as f:
+            for offset, length, count in members:
+                if position + count > first:
+                    chunk = self._read_member(f, offset, length)
+                    tasks.extend(chunk[max(0, first - position):last - position])
+                position += count
+                if position >= last:
+                    break
+        tasks.reverse()
+        return tasks
+    
+    def iter_tasks(self) -> Iterator[Task]:
+        """Yield every archived task, oldest first, one member at a time"""
+        members = self.members()
+        if not members:
+            return
+        with open(self.filename, 'rb') as f:
+            for offset, length, _ in members:
+                yield from self._read_member(f, offset, length)
+    
+    def close(self):
+        """Close the lock file"""
+        self.lock.close()
@@ -0,0 +1,518 @@
+"""Binary task files (.tdb), read through a memory map
+
+A binary task file holds the same records as a JSON task file in a form
+that can be used without parsing it first. Opening one maps it into
+memory and reads only its header and value table, which takes the same
+time however many tasks it holds; a task is decoded when it is used (see
+LazyTaskList). Integers are little-endian; the file is, in order:
+
+- the header: HEADER, ending with the SHA-256 of the rest of the file
+- the value table: JSON with the priority, category and status strings
+  the records refer to by number, and the counts TaskStats starts from
+- the records: one RECORD per task, in list order, with the due and
+  completion dates as date ordinals (0 for none)
+- the id directory: one ID_ENTRY per task, sorted by id for binary search
+- the heap: the UTF-8 task names the records point into
+
+A record whose fields would not come back exactly from those columns (an
+id that is not 32 lower case hex digits, a date that is not a valid
+YYYY-MM-DD date, missing or extra keys) keeps the whole record as JSON in
+the heap instead of its name, so converting a task file to this format
+and back gives the same records.
+"""
+import functools
+import hashlib
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import MutableSequence
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from todo.models import Task, parse_due_date
+from todo.stats import TaskStats
+
+
+MAGIC = b"TODOTDB\x00"
+VERSION = 1
+
+# Magic, version, record size, tasks, id directory entries, value table
+# length, SHA-256 of everything after the header
+HEADER = struct.Struct("<8sHHIII32s")
+
+# Id, name offset in the heap and length, priority, category and status
+# numbers, due and completion date ordinals, flags
+RECORD = struct.Struct("<16sIIHHHiiBx")
+
+# Id, record number
+ID_ENTRY = struct.Struct("<16sI")
+
+# The heap holds the whole record as JSON instead of the name
+FLAG_JSON = 1
+
+# Keys of the records that fit the columns, in the order of Task.to_dict
+FIXED_KEYS = ("id", "name", "priority", "due_date", "category", "status")
+
+# Most distinct priority, category and status strings in one file
+MAX_VALUES = 0xFFFF
+
+# Files are mapped into memory, except on Windows, where a mapped file
+# cannot be replaced by saving; there they are read into memory instead
+MAP_FILES = os.name != "nt"
+
+
+@functools.lru_cache(maxsize=8192)
+def _iso(ordinal: int) -> str:
+    """YYYY-MM-DD of a date ordinal, or an empty string for 0"""
+    return date.fromordinal(ordinal).isoformat() if ordinal else ""
+
+
+def _ordinal(value) -> Optional[int]:
+    """Ordinal of a date that is written back the same way (0 if empty), else None"""
+    if value == "":
+        return 0
+    ordinal = parse_due_date(value) if isinstance(value, str) else None
+    if ordinal is None or _iso(ordinal) != value:
+        return None
+    return ordinal
+
+
+def _id_bytes(value) -> Optional[bytes]:
+    """The 16 bytes of an id of 32 lower case hex digits, else None"""
+    if not isinstance(value, str) or len(value) != 32:
+        return None
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        return None
+    return raw if raw.hex() == value else None
+
+
+def _fixed_fields(record: Dict) -> Optional[tuple]:
+    """(id bytes, name bytes, due ordinal, completion ordinal) of a record that fits the columns"""
+    keys = tuple(record)
+    if keys != FIXED_KEYS and keys != FIXED_KEYS + ("completed_at",):
+        return None
+    if not all(isinstance(record[key], str) for key in ("name", "priority", "category", "status")):
+        return None
+    if not (record["priority"] and record["category"] and record["status"]):
+        # Task.from_dict would replace them with its defaults
+        return None
+    raw_id = _id_bytes(record["id"])
+    due = _ordinal(record["due_date"])
+    completed = _ordinal(record.get("completed_at", ""))
+    if raw_id is None or due is None or completed is None or ("completed_at" in record and not completed):
+        return None
+    try:
+        name = record["name"].encode('utf-8')
+    except UnicodeEncodeError:
+        return None
+    return raw_id, name, due, completed
+
+
+def encode_binary(records: Iterable[Dict]) -> bytes:
+    """Encode task records as a binary task file"""
+    numbers: Dict[str, int] = {}
+    rows = bytearray()
+    heap = bytearray()
+    ids = []
+    counts: Counter = Counter()
+    pending_due: Counter = Counter()
+    regular_ids = True
+    for row, record in enumerate(records):
+        fields = _fixed_fields(record)
+        if fields is not None:
+            values = (record["priority"], record["category"], record["status"])
+            if len(numbers) > MAX_VALUES - 3 and any(value not in numbers for value in values):
+                fields = None
+        if fields is None:
+            task = Task.from_dict(record)
+            raw_id = _id_bytes(record.get("id"))
+            text = json.dumps(record, separators=(",", ":")).encode('utf-8')
+            packed = RECORD.pack(raw_id or bytes(16), len(heap), len(text), 0, 0, 0, 0, 0, FLAG_JSON)
+            status, priority, category, due_date = task.status, task.priority, task.category, task.due_date
+        else:
+            raw_id, text, due, completed = fields
+            status, priority, category = record["status"], record["priority"], record["category"]
+            due_date = record["due_date"]
+            codes = [numbers.setdefault(value, len(numbers)) for value in (priority, category, status)]
+            packed = RECORD.pack(raw_id, len(heap), len(text), *codes, due, completed, 0)
+        rows += packed
+        heap += text
+        if raw_id is None:
+            regular_ids = False
+        else:
+            ids.append((raw_id, row))
+        counts[(status, priority, category)] += 1
+        if status != "Completed":
+            ordinal = parse_due_date(due_date)
+            if ordinal is not None:
+                pending_due[ordinal] += 1
+    ids.sort()
+    table = json.dumps({
+        "values": list(numbers),
+        "counts": [[*key, number] for key, number in counts.items()],
+        "pending_due": sorted(pending_due.items()),
+        "regular_ids": regular_ids,
+    }, separators=(",", ":")).encode('utf-8')
+    directory = b"".join(ID_ENTRY.pack(raw_id, row) for raw_id, row in ids)
+    digest = hashlib.sha256(table)
+    for part in (rows, directory, heap):
+        digest.update(part)
+    header = HEADER.pack(MAGIC, VERSION, RECORD.size, len(rows) // RECORD.size, len(ids), len(table),
+                         digest.digest())
+    return b"".join([header, table, rows, directory, heap])
+
+
+def stored_digest(data: bytes) -> Optional[str]:
+    """The SHA-256 in the header of a binary task file, or None if data is not one"""
+    if len(data) < HEADER.size:
+        return None
+    magic, version, *_, digest = HEADER.unpack_from(data)
+    return digest.hex() if magic == MAGIC and version == VERSION else None
+
+
+class BinaryTaskFile:
+    """A binary task file opened for reading
+
+    ``buffer`` holds the file's contents, as bytes or a memory map.
+    Raises ValueError if it is not a binary task file of this version.
+    ``regular_ids`` tells whether every task has an id of 32 hex digits,
+    and so can be found with ``row_of_id``.
+    """
+    def __init__(self, buffer):
+        if len(buffer) < HEADER.size:
+            raise ValueError("Not a binary task file")
+        magic, version, record_size, count, id_count, table_length, digest = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Not a binary task file")
+        if version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"Unsupported binary task file version {version}")
+        self.records_start = HEADER.size + table_length
+        self.ids_start = self.records_start + count * RECORD.size
+        self.heap_start = self.ids_start + id_count * ID_ENTRY.size
+        if len(buffer) < self.heap_start:
+            raise ValueError("Binary task file is truncated")
+        try:
+            table = json.loads(buffer[HEADER.size:self.records_start].decode('utf-8'))
+            self.values: List[str] = table["values"]
+            self.regular_ids: bool = table["regular_ids"]
+            self._counts = table["counts"]
+            self._pending_due = table["pending_due"]
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"Damaged binary task file: {error}") from None
+        self.buffer = buffer
+        self.count = count
+        self.id_count = id_count
+        self.digest = digest.hex()
+    
+    @classmethod
+    def open(cls, filename: str) -> 'BinaryTaskFile':
+        """Open a file, mapping it into memory where MAP_FILES allows"""
+        with open(filename, 'rb') as f:
+            if not MAP_FILES:
+                return cls(f.read())
+            # Raises ValueError for an empty file, which cannot be mapped
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(buffer)
+        except ValueError:
+            buffer.close()
+            raise
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _unpack(self, row: int) -> tuple:
+        """The fields of a record"""
+        if not 0 <= row < self.count:
+            raise IndexError("task row out of range")
+        return RECORD.unpack_from(self.buffer, self.records_start + row * RECORD.size)
+    
+    def _text(self, offset: int, length: int) -> str:
+        """A string from the heap"""
+        start = self.heap_start + offset
+        return self.buffer[start:start + length].decode('utf-8')
+    
+    def record(self, row: int) -> Dict:
+        """The record of a row, as it was encoded"""
+        raw_id, offset, length, priority, category, status, due, completed, flags = self._unpack(row)
+        text = self._text(offset, length)
+        if flags & FLAG_JSON:
+            return json.loads(text)
+        values = self.values
+        record = {"id": raw_id.hex(), "name": text, "priority": values[priority], "due_date": _iso(due),
+                  "category": values[category], "status": values[status]}
+        if completed:
+            record["completed_at"] = _iso(completed)
+        return record
+    
+    def task(self, row: int) -> Task:
+        """Decode the task of a row"""
+        raw_id, offset, length, priority, category, status, due, completed, flags = self._unpack(row)
+        text = self._text(offset, length)
+        if flags & FLAG_JSON:
+            return Task.from_dict(json.loads(text))
+        values = self.values
+        return Task(text, values[priority], _iso(due), values[category], values[status], raw_id.hex(),
+                    _iso(completed))
+    
+    def iter_records(self) -> Iterator[Dict]:
+        """Yield every record in order"""
+        for row in range(self.count):
+            yield self.record(row)
+    
+    def iter_tasks(self) -> Iterator[Task]:
+        """Decode every task in order, faster than task() row by row"""
+        values = self.values
+        heap = self.buffer[self.heap_start:]
+        for raw_id, offset, length, priority, category, status, due, completed, flags in RECORD.iter_unpack(
+                self.buffer[self.records_start:self.ids_start]):
+            text = heap[offset:offset + length].decode('utf-8')
+            if flags & FLAG_JSON:
+                yield Task.from_dict(json.loads(text))
+            else:
+                yield Task(text, values[priority], _iso(due), values[category], values[status], raw_id.hex(),
+                           _iso(completed))
+    
+    def iter_summaries(self) -> Iterator[Tuple[str, str, str, str]]:
+        """Yield the (id, status, due date, completion date) of every row from the columns
+
+        Unlike iter_tasks this builds no Task and reads no name, so it is
+        several times faster; only rows kept as JSON are decoded.
+        """
+        values = self.values
+        for row, (raw_id, _, _, _, _, status, due, completed, flags) in enumerate(RECORD.iter_unpack(
+                self.buffer[self.records_start:self.ids_start])):
+            if flags & FLAG_JSON:
+                task = self.task(row)
+                yield task.id, task.status, task.due_date, task.completed_at
+            else:
+                yield raw_id.hex(), values[status], _iso(due), _iso(completed)
+    
+    def row_of_id(self, task_id: str) -> Optional[int]:
+        """Row of the task with an id, by binary search of the id directory, or None"""
+        key = _id_bytes(task_id)
+        if key is None:
+            return None
+        low, high = 0, self.id_count
+        while low < high:
+            middle = (low + high) // 2
+            start = self.ids_start + middle * ID_ENTRY.size
+            if self.buffer[start:start + 16] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.id_count:
+            found, row = ID_ENTRY.unpack_from(self.buffer, self.ids_start + low * ID_ENTRY.size)
+            if found == key:
+                return row
+        return None
+    
+    def stats(self) -> TaskStats:
+        """TaskStats of the file's tasks, from the counts saved with them"""
+        counts = {(status, priority, category): number for status, priority, category, number in self._counts}
+        return TaskStats.from_counts(counts, dict(self._pending_due))
+    
+    def close(self):
+        """Unmap the file"""
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+def iter_binary(f) -> Iterator[Dict]:
+    """Yield the records of a binary task file opened in binary mode
+
+    Files on disk are mapped where MAP_FILES allows, so only the pages
+    read so far take memory.
+    """
+    try:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if MAP_FILES else f.read()
+    except (OSError, ValueError):
+        # Not a file on disk (io.BytesIO), or empty
+        buffer = f.read()
+    task_file = BinaryTaskFile(buffer)
+    try:
+        yield from task_file.iter_records()
+    finally:
+        task_file.close()
+
+
+class LazyTaskList(MutableSequence):
+    """A task list read from a BinaryTaskFile as its tasks are used
+
+    A row is decoded the first time it is read and then kept, so the same
+    Task object comes back every time. ``replaced`` maps rows to the
+    tasks that take their place, ``deleted`` rows are left out and
+    ``tail`` holds tasks after the file's; that is how BinaryTaskStorage
+    applies its journal without decoding the file. Appending adds to the
+    tail and ``delete_many`` adds to ``deleted``. Any other change,
+    iterating, and reading the last row not yet decoded turn the list into
+    a plain list of every task and close the file. ``summaries`` and
+    ``find`` answer the questions TaskManager asks at startup from the
+    file's columns and id directory instead.
+    """
+    def __init__(self, file: BinaryTaskFile, replaced: Optional[Dict[int, Task]] = None,
+                 deleted: Iterable[int] = (), tail: Iterable[Task] = ()):
+        self.file = file
+        self._replaced = dict(replaced or {})
+        self._deleted = sorted(deleted)
+        self._cache: Dict[int, Task] = dict(self._replaced)
+        self._tail = list(tail)
+        self._undecoded = len(file) - len(self._deleted) - len(self._replaced)
+        self._list: Optional[List[Task]] = None
+        if not self._undecoded:
+            self.decode_all()
+    
+    def __len__(self) -> int:
+        if self._list is not None:
+            return len(self._list)
+        return len(self.file) - len(self._deleted) + len(self._tail)
+    
+    def _row(self, position: int) -> int:
+        """File row of a position among the rows not deleted"""
+        row = position
+        skipped = 0
+        while True:
+            deleted_before = bisect_right(self._deleted, row)
+            if deleted_before == skipped:
+                return row
+            skipped = deleted_before
+            row = position + skipped
+    
+    def __getitem__(self, index):
+        if self._list is not None:
+            return self._list[index]
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("list index out of range")
+        in_file = length - len(self._tail)
+        if index >= in_file:
+            return self._tail[index - in_file]
+        row = self._row(index)
+        task = self._cache.get(row)
+        if task is None:
+            task = self._cache[row] = self.file.task(row)
+            self._undecoded -= 1
+            if not self._undecoded:
+                self.decode_all()
+        return task
+    
+    def __iter__(self) -> Iterator[Task]:
+        return iter(self.decode_all())
+    
+    def __setitem__(self, index, value):
+        self.decode_all()[index] = value
+    
+    def __delitem__(self, index):
+        del self.decode_all()[index]
+    
+    def insert(self, index: int, task: Task):
+        self.decode_all().insert(index, task)
+    
+    def append(self, task: Task):
+        if self._list is not None:
+            self._list.append(task)
+        else:
+            self._tail.append(task)
+    
+    @property
+    def decoded(self) -> bool:
+        """Whether the list has been turned into a plain list"""
+        return self._list is not None
+    
+    def delete_many(self, positions: List[int]):
+        """Delete the tasks at sorted positions without decoding the others"""
+        if self._list is not None:
+            removed = set(positions)
+            self._list[:] = [task for position, task in enumerate(self._list) if position not in removed]
+            return
+        in_file = len(self) - len(self._tail)
+        rows = [self._row(position) for position in positions if position < in_file]
+        tail = {position - in_file for position in positions if position >= in_file}
+        if tail:
+            self._tail = [task for position, task in enumerate(self._tail) if position not in tail]
+        for row in rows:
+            self._replaced.pop(row, None)
+            if self._cache.pop(row, None) is None:
+                self._undecoded -= 1
+        self._deleted = sorted(self._deleted + rows)
+        if not self._undecoded:
+            self.decode_all()
+    
+    def find(self, task_id: str) -> Optional[Task]:
+        """The task with an id, or None, looked up in the file's id directory"""
+        if self._list is not None or not self.file.regular_ids:
+            return next((task for task in self if task.id == task_id), None)
+        for task in self._tail:
+            if task.id == task_id:
+                return task
+        for task in self._replaced.values():
+            if task.id == task_id:
+                return task
+        row = self.file.row_of_id(task_id)
+        if row is None or row in self._replaced:
+            return None
+        deleted_before = bisect_right(self._deleted, row)
+        if deleted_before and self._deleted[deleted_before - 1] == row:
+            return None
+        return self[row - deleted_before]
+    
+    def summaries(self) -> Iterator[Tuple[str, str, str, str]]:
+        """Yield the (id, status, due date, completion date) of every task in order
+
+        Rows not decoded yet are read from the file's columns (see
+        BinaryTaskFile.iter_summaries), so this does not decode the list.
+        """
+        if self._list is not None:
+            for task in self._list:
+                yield task.id, task.status, task.due_date, task.completed_at
+            return
+        deleted = set(self._deleted)
+        cache = self._cache
+        for row, summary in enumerate(self.file.iter_summaries()):
+            if row in deleted:
+                continue
+            task = cache.get(row)
+            yield summary if task is None else (task.id, task.status, task.due_date, task.completed_at)
+        for task in self._tail:
+            yield task.id, task.status, task.due_date, task.completed_at
+    
+    def decode_all(self) -> List[Task]:
+        """Decode every task into a plain list, which the list uses from now on, and close the file"""
+        if self._list is None:
+            deleted = set(self._deleted)
+            cache = self._cache
+            tasks = [
+                cache.get(row) or task
+                for row, task in enumerate(self.file.iter_tasks()) if row not in deleted
+            ]
+            tasks.extend(self._tail)
+            self._list = tasks
+            self._cache = {}
+            self._replaced = {}
+            self._deleted = []
+            self._tail = []
+            self.file.close()
+        return self._list
+    
+    def stats(self) -> TaskStats:
+        """TaskStats of the tasks, starting from the counts saved in the file"""
+        if self._list is not None:
+            return TaskStats(self._list)
+        stats = self.file.stats()
+        for row in self._deleted:
+            stats.remove(self.file.task(row))
+        for row, task in self._replaced.items():
+            stats.remove(self.file.task(row))
+            stats.add(task)
+        for task in self._tail:
+            stats.add(task)
+        return stats
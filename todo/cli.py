@@ -0,0 +1,278 @@
+"""Command-line interface for adding, listing, completing and deleting tasks
+
+Usage:
+    python -m todo --user NAME list [--status S] [--priority P] [--category C] [--search TEXT] [--sort FIELD]
+    python -m todo --user NAME add "Task name" [--priority High] [--due 2025-12-31] [--category Work]
+    python -m todo --user NAME complete NUMBER [NUMBER ...]
+    python -m todo --user NAME delete NUMBER [NUMBER ...]
+    python -m todo --user NAME archive [--days 30]
+    python -m todo --user NAME history [--page 1] [--page-size 50]
+    python -m todo --user NAME import FILE [--workers N]
+    python -m todo --user NAME export FILE [--workers N]
+    python -m todo convert SOURCE DESTINATION [--workers N]
+    python -m todo count FILE
+    python -m todo batch-export OUTPUT_DIR [--directory DIR] [--format csv] [--workers N]
+    python -m todo serve [--host 127.0.0.1] [--port 8765]
+    python -m todo --profile [--profile-dump FILE] ...
+
+The password is read from the TODO_PASSWORD environment variable or an
+interactive prompt, never from the command line, where other users could
+see it in the process list, and a successful login is remembered for later
+commands in a session file (see UserManager.start_cli_session); convert,
+count and batch-export work on task files directly and need no user, and
+serve starts the HTTP API server (see todo.server), whose clients log in
+themselves. Task files are .json, .ndjson, .csv, .ics or .tdb (see
+todo.formats and todo.transfer). Task numbers are the ones printed by
+``list`` (1-based positions in the task list). ``archive`` moves old
+completed tasks out of the list into the archive, which ``history`` pages
+through. Only core modules are imported, so tkinter is never loaded.
+"""
+import argparse
+import getpass
+import os
+import sys
+import time
+from typing import List, Optional
+
+from todo import profiling
+from todo.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_PAGE_SIZE
+from todo.formats import count_tasks
+from todo.manager import TaskManager
+from todo.models import CATEGORIES, Task, parse_due_date
+from todo.users import UserManager, canonical_username
+
+
+def format_task(number: int, task: Task) -> str:
+    """Format a task like a row of the GUI task list"""
+    status_icon = "✓" if task.status == "Completed" else "○"
+    priority_icon = "🔴" if task.priority == "High" else "🟢"
+    due = task.due_date if task.due_date else 'No date'
+    return f"{number:>4}. {status_icon} {priority_icon} {task.name} | {task.category} | Due: {due}"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser"""
+    parser = argparse.ArgumentParser(prog="todo", description="To-Do List Management System")
+    parser.add_argument("--user", help="username (required except for convert, count, batch-export and serve); "
+                                       "the password is taken from $TODO_PASSWORD or prompted for")
+    parser.add_argument("--profile", action="store_true",
+                        help="print call counts and latencies of the slow paths at exit (also $TODO_PROFILE)")
+    parser.add_argument("--profile-dump", metavar="FILE",
+                        help="write cProfile statistics of the run to FILE (also $TODO_PROFILE_DUMP)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    list_parser = commands.add_parser("list", help="list tasks")
+    list_parser.add_argument("--status", choices=["Pending", "Completed"])
+    list_parser.add_argument("--priority", choices=["High", "Low"])
+    list_parser.add_argument("--category", choices=CATEGORIES)
+    list_parser.add_argument("--search", help="words (or word prefixes) in the name or category")
+    list_parser.add_argument("--sort", choices=["due_date", "priority"], help="order of the list")
+    list_parser.add_argument("--limit", type=int, help="show at most this many tasks")
+    
+    add_parser = commands.add_parser("add", help="add a task")
+    add_parser.add_argument("name")
+    add_parser.add_argument("--priority", choices=["High", "Low"], default="Low")
+    add_parser.add_argument("--due", default="", help="due date (YYYY-MM-DD)")
+    add_parser.add_argument("--category", choices=CATEGORIES, default="Personal")
+    
+    for command, help_text in (("complete", "mark a task as completed"), ("delete", "delete a task")):
+        command_parser = commands.add_parser(command, help=help_text)
+        command_parser.add_argument("numbers", type=int, nargs="+", metavar="number",
+                                    help="task numbers shown by list")
+    
+    archive_parser = commands.add_parser("archive", help="move old completed tasks to the archive")
+    archive_parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                                help=f"archive tasks completed more than this many days ago (default {ARCHIVE_AFTER_DAYS})")
+    history_parser = commands.add_parser("history", help="list archived tasks, most recently archived first")
+    history_parser.add_argument("--page", type=int, default=1, help="page to show (default 1)")
+    history_parser.add_argument("--page-size", type=int, default=ARCHIVE_PAGE_SIZE, help="tasks per page")
+    
+    workers_help = "processes converting chunks of the file (0: one per core; default 1)"
+    import_parser = commands.add_parser("import", help="add the valid tasks of a .json, .ndjson, .csv, .ics or .tdb file")
+    import_parser.add_argument("filename")
+    import_parser.add_argument("--workers", type=int, default=1, help=workers_help)
+    export_parser = commands.add_parser("export", help="write all tasks to a .json, .ndjson, .csv, .ics or .tdb file")
+    export_parser.add_argument("filename")
+    export_parser.add_argument("--workers", type=int, default=1, help=workers_help)
+    
+    convert_parser = commands.add_parser("convert", help="convert a task file between .json, .ndjson, .csv, .ics and .tdb")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("destination")
+    convert_parser.add_argument("--workers", type=int, default=1, help=workers_help)
+    count_parser = commands.add_parser("count", help="count the tasks in a task file")
+    count_parser.add_argument("filename")
+    batch_parser = commands.add_parser("batch-export", help="export every user's task file in a directory")
+    batch_parser.add_argument("output", help="directory to write the exported files to")
+    batch_parser.add_argument("--directory", default=".", help="directory of the *_tasks.json files (default .)")
+    batch_parser.add_argument("--format", choices=["json", "ndjson", "csv", "ics", "tdb"], default="csv")
+    batch_parser.add_argument("--workers", type=int, default=1, help="users exported at the same time (0: one per core)")
+    
+    serve_parser = commands.add_parser("serve", help="run the local HTTP/JSON API server")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=None, help="port to listen on (default 8765)")
+    return parser
+
+
+def authenticate(username: str) -> bool:
+    """Check the user's credentials
+
+    A current session from an earlier command (see
+    UserManager.start_cli_session) is accepted without the password;
+    otherwise the password is checked and a new session is started.
+    """
+    user_manager = UserManager()
+    try:
+        if user_manager.check_cli_session(username):
+            return True
+        password = os.environ.get("TODO_PASSWORD")
+        if password is None:
+            password = getpass.getpass("Password: ")
+        if not user_manager.verify_user(username, password):
+            return False
+        user_manager.start_cli_session(username)
+        return True
+    finally:
+        user_manager.close()
+
+
+def worker_count(workers: int) -> int:
+    """The --workers value, with 0 meaning one per core"""
+    return workers if workers > 0 else os.cpu_count() or 1
+
+
+def print_report(report) -> None:
+    """Print a TransferReport, with the rejected rows on stderr"""
+    print(report.summary())
+    for error in report.errors:
+        print(f"Rejected {error}", file=sys.stderr)
+    if report.rejected > len(report.errors):
+        print(f"... and {report.rejected - len(report.errors)} more rejected rows", file=sys.stderr)
+
+
+def run_file_command(args) -> int:
+    """Convert, count or batch-export task files without loading them into memory"""
+    # Imported here so that other commands do not load the process pool
+    from todo import transfer
+    try:
+        if args.command == "convert":
+            print_report(transfer.convert_file(args.source, args.destination, worker_count(args.workers)))
+        elif args.command == "batch-export":
+            started = time.perf_counter()
+            reports = transfer.batch_export(args.directory, args.output, args.format, worker_count(args.workers))
+            seconds = time.perf_counter() - started
+            for report in reports:
+                print_report(report)
+            rows = sum(report.rows for report in reports)
+            print(f"Exported {len(reports)} users, {rows} tasks in {seconds:.2f} s, "
+                  f"{rows / seconds if seconds else 0:,.0f} rows/s")
+        else:
+            print(count_tasks(args.filename))
+    except (ValueError, OSError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command-line interface and return the exit status"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.profile or args.profile_dump:
+        profiling.enable(args.profile_dump)
+    if args.command in ("convert", "count", "batch-export"):
+        return run_file_command(args)
+    if args.command == "serve":
+        # Imported here so that other commands do not load asyncio
+        from todo.server import DEFAULT_PORT, run_server
+        return run_server(args.host, DEFAULT_PORT if args.port is None else args.port)
+    if not args.user:
+        parser.error("--user is required")
+    username = canonical_username(args.user)
+    if not authenticate(username):
+        print("Invalid username or password!", file=sys.stderr)
+        return 1
+    
+    try:
+        task_manager = TaskManager(username, load=args.command not in ("export", "history"))
+    except ValueError as error:
+        print(f"Could not load tasks: {error}", file=sys.stderr)
+        return 1
+    try:
+        if args.command in ("import", "export"):
+            from todo import transfer
+            try:
+                if args.command == "import":
+                    report = transfer.import_file(task_manager, args.filename, worker_count(args.workers))
+                else:
+                    # Streamed straight from storage without building the task list or writing to it
+                    records = (task.to_dict() for task in task_manager.storage.iter_load(save_ids=False))
+                    report = transfer.export_records(records, args.filename, worker_count(args.workers),
+                                                     source=username)
+            except (ValueError, OSError) as error:
+                print(f"{args.command.capitalize()} failed: {error}", file=sys.stderr)
+                return 1
+            print_report(report)
+            return 0
+        
+        if args.command == "archive":
+            try:
+                count = task_manager.archive_completed(args.days)
+            except OSError as error:
+                print(f"Archiving failed: {error}", file=sys.stderr)
+                return 1
+            print(f"Archived {count} tasks")
+            return 0
+        
+        if args.command == "history":
+            # Only the members of the archive holding this page are read
+            archive = task_manager.archive
+            pages = archive.page_count(args.page_size)
+            if not 1 <= args.page <= pages:
+                print(f"No page {args.page}! The history has {pages} pages", file=sys.stderr)
+                return 1
+            first = (args.page - 1) * args.page_size
+            for number, task in enumerate(archive.read_page(args.page - 1, args.page_size), first + 1):
+                print(format_task(number, task))
+            print(f"Page {args.page} of {pages} ({archive.count()} archived tasks)")
+            return 0
+        
+        if args.command == "list":
+            indexes = task_manager.query_tasks(
+                status=args.status, priority=args.priority, category=args.category,
+                order_by=args.sort, limit=args.limit, text=args.search
+            )
+            for index in indexes:
+                print(format_task(index + 1, task_manager.tasks[index]))
+            return 0
+        
+        if args.command == "add":
+            name = args.name.strip()
+            if not name:
+                print("Please enter a task name!", file=sys.stderr)
+                return 1
+            due_date = args.due.strip()
+            if due_date and parse_due_date(due_date) is None:
+                print("Invalid date format! Please use YYYY-MM-DD", file=sys.stderr)
+                return 1
+            task_manager.add_task(Task(name, args.priority, due_date, args.category, "Pending"))
+            print(format_task(len(task_manager.tasks), task_manager.tasks[-1]))
+            return 0
+        
+        for number in args.numbers:
+            if not 1 <= number <= len(task_manager.tasks):
+                print(f"No task number {number}!", file=sys.stderr)
+                return 1
+        # All numbers are applied as one batch with a single write
+        indexes = sorted({number - 1 for number in args.numbers})
+        if args.command == "complete":
+            task_manager.complete_tasks(indexes)
+            for index in indexes:
+                print(format_task(index + 1, task_manager.tasks[index]))
+        else:
+            names = [task_manager.tasks[index].name for index in indexes]
+            task_manager.delete_tasks(indexes)
+            for name in names:
+                print(f"Deleted '{name}'")
+        return 0
+    finally:
+        task_manager.close()
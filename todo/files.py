@@ -0,0 +1,160 @@
+"""Atomic file writes with configurable durability, and file locks"""
+import contextlib
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Durability levels for file writes: "none" leaves flushing to the OS,
+# "file" fsyncs the written file and "dir" also fsyncs its directory so
+# that the rename itself survives a power loss.
+DURABILITY_NONE = "none"
+DURABILITY_FILE = "file"
+DURABILITY_DIR = "dir"
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_DIR)
+DURABILITY = os.environ.get("TODO_DURABILITY", DURABILITY_FILE)
+
+# SQLite equivalents of the durability levels
+SQLITE_SYNCHRONOUS = {DURABILITY_NONE: "OFF", DURABILITY_FILE: "NORMAL", DURABILITY_DIR: "FULL"}
+
+
+def fsync_directory(directory: str):
+    """Flush a directory entry to disk (no-op where unsupported)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def atomic_writer(filename: str, durability: Optional[str] = None):
+    """Open a temporary file that replaces filename when the block exits
+
+    Yields a binary file object. The data is written to a temporary file in
+    the same directory which is then renamed over the target, so readers
+    and crashes only ever see the old or the new contents. If the block
+    raises, the target is left untouched. Raises OSError on failure.
+    """
+    durability = durability or DURABILITY
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Unknown durability level: {durability}")
+    directory = os.path.dirname(os.path.abspath(filename))
+    # Unique per writing thread; avoids importing tempfile on the CLI path
+    temp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_filename, 'wb') as f:
+            yield f
+            if durability != DURABILITY_NONE:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        try:
+            os.remove(temp_filename)
+        except OSError:
+            pass
+        raise
+    if durability == DURABILITY_DIR:
+        fsync_directory(directory)
+
+
+def file_signature(filename: str) -> Optional[Tuple[int, int, int]]:
+    """(inode, size, modification time in ns) of a file, or None if missing
+
+    Changes whenever the file is written to or replaced by a rename.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def atomic_write(filename: str, data: bytes, durability: Optional[str] = None):
+    """Replace a file atomically with data (see atomic_writer)"""
+    with atomic_writer(filename, durability) as f:
+        f.write(data)
+
+
+# Seconds between attempts to take a lock held by another process (Windows)
+LOCK_RETRY_DELAY = 0.05
+
+
+class FileLock:
+    """Exclusive advisory lock shared by all processes using one lock file
+
+    Uses flock on POSIX and msvcrt.locking on Windows. The lock file is a
+    separate, otherwise empty file, so the files it protects can still be
+    replaced by renaming. Reentrant: the thread holding the lock can take
+    it again, and other threads of the process wait as for an RLock.
+    """
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._fd = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+    
+    def acquire(self):
+        """Block until the lock is held"""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+                self._lock()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+    
+    def release(self):
+        """Release one level of the lock"""
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock()
+        self._thread_lock.release()
+    
+    def _lock(self):
+        """Take the operating system lock on the lock file"""
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(LOCK_RETRY_DELAY)
+    
+    def _unlock(self):
+        """Release the operating system lock"""
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+    
+    def close(self):
+        """Close the lock file; the lock must not be held"""
+        with self._thread_lock:
+            if self._fd is not None and self._depth == 0:
+                os.close(self._fd)
+                self._fd = None
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,429 @@
+"""Streaming readers and writers for task files
+
+Five file formats are supported, chosen by file extension:
+
+* ``.json``: the indented JSON array written by JsonTaskStorage
+* ``.ndjson``: one task object per line (newline-delimited JSON)
+* ``.csv``: a header row naming the task fields, then one row per task
+* ``.ics``: an iCalendar file with one VTODO per task
+* ``.tdb``: the binary task file of BinaryTaskStorage (see todo.binary)
+
+The readers are generators that decode one task at a time, so counting,
+exporting and converting files uses memory bounded by the largest task
+rather than the whole file; binary files are written whole, as their
+header counts the tasks. The command-line interface exposes conversion
+and counting as ``python -m todo convert`` and ``python -m todo count``;
+todo.transfer adds validation and conversion on several processes.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+import re
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from todo.binary import BinaryTaskFile, encode_binary, iter_binary
+from todo.files import atomic_writer
+from todo.models import CATEGORIES, Task, parse_due_date
+
+
+# Bytes read from a task file per step of a streaming read
+READ_CHUNK_SIZE = 64 * 1024
+
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+FORMAT_ICAL = "ics"
+FORMAT_BINARY = "tdb"
+FORMATS = (FORMAT_JSON, FORMAT_NDJSON, FORMAT_CSV, FORMAT_ICAL, FORMAT_BINARY)
+
+# Columns of a CSV task file, in the order they are written
+CSV_FIELDS = ("id", "name", "priority", "due_date", "category", "status", "completed_at")
+
+# Longest iCalendar line in bytes before it is folded (RFC 5545)
+ICAL_LINE_LIMIT = 75
+
+# Whitespace and commas between elements of a JSON array
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def format_of(filename: str) -> str:
+    """Return the task file format implied by a file name"""
+    extension = os.path.splitext(filename)[1].lower()[1:]
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f"Unknown task file format: {filename}")
+
+
+def iter_json_array(f, digest=None) -> Iterator[Dict]:
+    """Yield the elements of a JSON array from a binary file one at a time
+
+    Raises ValueError if the file is not a well-formed array. An empty file
+    yields nothing. If digest (a hashlib object) is given it is updated with
+    every byte read.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    position = 0
+    started = False
+    while True:
+        chunk = f.read(READ_CHUNK_SIZE)
+        if digest is not None:
+            digest.update(chunk)
+        buffer = buffer[position:] + text.decode(chunk, final=not chunk)
+        position = 0
+        while True:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("task file is not a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if not chunk:
+                    raise
+                # Element continues in the next chunk
+                break
+            position = end
+            yield element
+        if not chunk:
+            if started:
+                raise ValueError("task file ends inside the JSON array")
+            return
+
+
+def iter_ndjson(f, digest=None) -> Iterator[Dict]:
+    """Yield the objects of a newline-delimited JSON binary file
+
+    Blank lines are skipped. Raises ValueError on a malformed line. If
+    digest is given it is updated with every byte read.
+    """
+    for line in f:
+        if digest is not None:
+            digest.update(line)
+        if line.strip():
+            yield json.loads(line.decode('utf-8'))
+
+
+def iter_csv(f) -> Iterator[Dict]:
+    """Yield the rows of a CSV binary file as dictionaries keyed by the header
+
+    Header names are matched loosely ("Due Date" is ``due_date``), columns
+    that are not task fields are dropped and missing ones are left out.
+    Blank rows are skipped.
+    """
+    reader = csv.reader(io.TextIOWrapper(f, encoding='utf-8-sig', newline=''))
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [
+        (position, key) for position, key in
+        enumerate(name.strip().lower().replace(" ", "_") for name in header)
+        if key in CSV_FIELDS
+    ]
+    for row in reader:
+        if row:
+            yield {key: row[position] for position, key in columns if position < len(row)}
+
+
+# Escaped characters of iCalendar text values
+_ICAL_ESCAPE = re.compile(r"\\([\\;,nN])")
+# A content line: name, parameters (possibly quoted) and value
+_ICAL_LINE = re.compile(r'([^:;]+)((?:;[^:;=]+=(?:"[^"]*"|[^:;"]*))*):(.*)')
+_ICAL_PRIORITY_HIGH = frozenset("1234")
+_CATEGORY_NAMES = {category.lower(): category for category in CATEGORIES}
+
+
+def _ical_unescape(value: str) -> str:
+    """Decode an iCalendar text value"""
+    if "\\" not in value:
+        return value
+    return _ICAL_ESCAPE.sub(lambda match: "\n" if match.group(1) in "nN" else match.group(1), value)
+
+
+def _ical_date(value: str) -> str:
+    """YYYY-MM-DD from an iCalendar DATE or DATE-TIME value, or "" if it is not one"""
+    digits = value[:8]
+    if len(digits) == 8 and digits.isdigit():
+        return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+    return ""
+
+
+def _ical_record(properties: Dict[str, str]) -> Dict:
+    """Map the properties of a VTODO to a task record"""
+    status = properties.get("STATUS", "").upper()
+    completed = status == "COMPLETED" or (not status and "COMPLETED" in properties)
+    # CATEGORIES is a list; the first known category wins, others are "Other"
+    category = "Other"
+    for value in re.split(r"(?<!\\),", properties.get("CATEGORIES", "")):
+        known = _CATEGORY_NAMES.get(_ical_unescape(value).strip().lower())
+        if known:
+            category = known
+            break
+    record = {
+        "name": _ical_unescape(properties.get("SUMMARY", "")),
+        "priority": "High" if properties.get("PRIORITY", "").strip() in _ICAL_PRIORITY_HIGH else "Low",
+        "due_date": _ical_date(properties.get("DUE", "")),
+        "category": category,
+        "status": "Completed" if completed else "Pending",
+        "completed_at": _ical_date(properties.get("COMPLETED", "")) if completed else "",
+    }
+    if properties.get("UID"):
+        record["id"] = _ical_unescape(properties["UID"])
+    return record
+
+
+def iter_ical(f) -> Iterator[Dict]:
+    """Yield a task record for every VTODO of an iCalendar binary file
+
+    Folded lines are unfolded and parameters are ignored. SUMMARY is the
+    name, PRIORITY 1 to 4 is High and anything else Low, DUE and
+    COMPLETED give the dates, STATUS:COMPLETED marks completed tasks and
+    the first known CATEGORIES value is the category ("Other" if none is
+    known). Components other than VTODO are skipped.
+    """
+    properties = None
+    depth = 0
+    pending = ""
+    
+    def lines():
+        nonlocal pending
+        for raw in io.TextIOWrapper(f, encoding='utf-8-sig', newline=''):
+            line = raw.rstrip("\r\n")
+            if line[:1] in (" ", "\t"):
+                pending += line[1:]
+                continue
+            if pending:
+                yield pending
+            pending = line
+        if pending:
+            yield pending
+    
+    for line in lines():
+        match = _ICAL_LINE.match(line)
+        if match is None:
+            continue
+        name = match.group(1).upper()
+        value = match.group(3)
+        if name == "BEGIN":
+            if value.upper() == "VTODO" and properties is None:
+                properties = {}
+            elif properties is not None:
+                # A nested component such as VALARM
+                depth += 1
+        elif name == "END" and properties is not None:
+            if depth:
+                depth -= 1
+            elif value.upper() == "VTODO":
+                yield _ical_record(properties)
+                properties = None
+        elif properties is not None and not depth:
+            properties.setdefault(name, value)
+
+
+READERS: Dict[str, Callable] = {
+    FORMAT_JSON: iter_json_array,
+    FORMAT_NDJSON: iter_ndjson,
+    FORMAT_CSV: iter_csv,
+    FORMAT_ICAL: iter_ical,
+    FORMAT_BINARY: iter_binary,
+}
+
+
+def iter_task_records(filename: str) -> Iterator[Dict]:
+    """Yield the task dictionaries stored in a task file of any format"""
+    reader = READERS[format_of(filename)]
+    with open(filename, 'rb') as f:
+        yield from reader(f)
+
+
+def iter_tasks(filename: str) -> Iterator[Task]:
+    """Yield the tasks stored in a task file of any format"""
+    for record in iter_task_records(filename):
+        yield Task.from_dict(record)
+
+
+def encode_json_record(record: Dict) -> bytes:
+    """One element of the indented JSON array"""
+    return json.dumps(record, indent=2).replace("\n", "\n  ").encode('utf-8')
+
+
+def encode_ndjson_record(record: Dict) -> bytes:
+    """One line of a newline-delimited JSON file"""
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode('utf-8')
+
+
+def _csv_field(value) -> str:
+    """Quote a CSV field where needed, as csv.writer does"""
+    value = "" if value is None else str(value)
+    if '"' in value or "," in value or "\n" in value or "\r" in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def encode_csv_record(record: Dict) -> bytes:
+    """One CSV row with the CSV_FIELDS columns"""
+    return (",".join([_csv_field(record.get(field)) for field in CSV_FIELDS]) + "\r\n").encode('utf-8')
+
+
+def _ical_escape(value: str) -> str:
+    """Encode an iCalendar text value"""
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n").replace("\r", "")
+
+
+def _ical_fold(line: str) -> str:
+    """Fold a content line into lines of at most ICAL_LINE_LIMIT bytes"""
+    if len(line) * 4 <= ICAL_LINE_LIMIT or len(line.encode('utf-8')) <= ICAL_LINE_LIMIT:
+        return line + "\r\n"
+    pieces = []
+    current = ""
+    size = 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > ICAL_LINE_LIMIT:
+            pieces.append(current)
+            # The continuation's leading space counts towards the limit
+            current = " "
+            size = 1
+        current += char
+        size += char_size
+    pieces.append(current)
+    return "\r\n".join(pieces) + "\r\n"
+
+
+def _ical_date_value(value: Optional[str]) -> str:
+    """YYYYMMDD for a valid task date, or an empty string"""
+    ordinal = parse_due_date(value or "")
+    return "" if ordinal is None else date.fromordinal(ordinal).strftime("%Y%m%d")
+
+
+def encode_ical_record(record: Dict) -> bytes:
+    """One VTODO component"""
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    lines = [
+        "BEGIN:VTODO",
+        f"UID:{_ical_escape(record.get('id') or '')}",
+        f"DTSTAMP:{stamp}",
+        _ical_fold(f"SUMMARY:{_ical_escape(record.get('name') or '')}").rstrip("\r\n"),
+        f"PRIORITY:{1 if record.get('priority') == 'High' else 9}",
+        f"CATEGORIES:{_ical_escape(record.get('category') or 'Personal')}",
+    ]
+    due = _ical_date_value(record.get("due_date"))
+    if due:
+        lines.append(f"DUE;VALUE=DATE:{due}")
+    if record.get("status") == "Completed":
+        lines.append("STATUS:COMPLETED")
+        completed = _ical_date_value(record.get("completed_at"))
+        if completed:
+            lines.append(f"COMPLETED:{completed}T000000Z")
+    else:
+        lines.append("STATUS:NEEDS-ACTION")
+    lines.append("END:VTODO")
+    return ("\r\n".join(lines) + "\r\n").encode('utf-8')
+
+
+class Encoding(NamedTuple):
+    """How a file format lays out encoded records
+
+    The file is ``header``, the records encoded by ``encode`` with
+    ``separator`` between them, then ``footer``; a file without records
+    is ``empty``. Records encoded separately, for instance on several
+    processes, can so be joined into one file.
+    """
+    header: bytes
+    encode: Callable[[Dict], bytes]
+    separator: bytes
+    footer: bytes
+    empty: bytes
+
+
+_ICAL_HEADER = b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//To-Do List Management System//EN\r\n"
+_CSV_HEADER = (",".join(CSV_FIELDS) + "\r\n").encode('ascii')
+
+ENCODINGS: Dict[str, Encoding] = {
+    FORMAT_JSON: Encoding(b"[\n  ", encode_json_record, b",\n  ", b"\n]", b"[]"),
+    FORMAT_NDJSON: Encoding(b"", encode_ndjson_record, b"", b"", b""),
+    FORMAT_CSV: Encoding(_CSV_HEADER, encode_csv_record, b"", b"", _CSV_HEADER),
+    FORMAT_ICAL: Encoding(_ICAL_HEADER, encode_ical_record, b"", b"END:VCALENDAR\r\n",
+                          _ICAL_HEADER + b"END:VCALENDAR\r\n"),
+}
+
+
+def encode_records(records: Iterable[Dict], file_format: str) -> Iterator[bytes]:
+    """Encode records as a whole file of the given format, piecewise"""
+    encoding = ENCODINGS[file_format]
+    separator = encoding.header
+    empty = True
+    for record in records:
+        yield separator + encoding.encode(record)
+        separator = encoding.separator
+        empty = False
+    yield encoding.empty if empty else encoding.footer
+
+
+def encode_json_array(records: Iterable[Dict]) -> Iterator[bytes]:
+    """Encode records exactly like json.dumps(list(records), indent=2), piecewise"""
+    return encode_records(records, FORMAT_JSON)
+
+
+def encode_ndjson(records: Iterable[Dict]) -> Iterator[bytes]:
+    """Encode records one per line"""
+    for record in records:
+        yield encode_ndjson_record(record)
+
+
+def write_task_records(filename: str, records: Iterable[Dict], durability: Optional[str] = None) -> int:
+    """Atomically write records to a task file of any format; returns the count
+
+    Records are encoded as they are consumed, so the input may be a
+    generator over a file larger than memory, except for binary files,
+    which are encoded in memory.
+    """
+    count = 0
+    
+    def counted():
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+    
+    file_format = format_of(filename)
+    with atomic_writer(filename, durability) as f:
+        if file_format == FORMAT_BINARY:
+            f.write(encode_binary(counted()))
+            return count
+        for piece in encode_records(counted(), file_format):
+            f.write(piece)
+    return count
+
+
+def export_tasks(tasks: Iterable[Task], filename: str, durability: Optional[str] = None) -> int:
+    """Write tasks to a task file of any format; returns the count"""
+    return write_task_records(filename, (task.to_dict() for task in tasks), durability)
+
+
+def convert_tasks(source: str, destination: str, durability: Optional[str] = None) -> int:
+    """Convert a task file between formats; returns the number of tasks"""
+    return write_task_records(destination, iter_task_records(source), durability)
+
+
+def count_tasks(filename: str) -> int:
+    """Count the tasks in a file without keeping them in memory"""
+    if format_of(filename) == FORMAT_BINARY:
+        # The header says
+        task_file = BinaryTaskFile.open(filename)
+        task_file.close()
+        return len(task_file)
+    return sum(1 for _ in iter_task_records(filename))
+
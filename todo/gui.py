@@ -0,0 +1,1312 @@
+"""Tkinter user interface: login window and main application"""
+import tkinter as tk
+from tkinter import ttk, messagebox
+import tkinter.font as tkfont
+import queue
+import threading
+from typing import List, Dict, Optional
+
+from todo import profiling
+from todo.archive import ARCHIVE_AFTER_DAYS, TaskArchive
+from todo.manager import TaskManager
+from todo.models import CATEGORIES, Task, parse_due_date
+from todo.reminders import ReminderScheduler
+from todo.users import UserManager, canonical_username, valid_username
+
+
+# Milliseconds between checks for background load and login results
+LOAD_POLL_MS = 20
+
+# Milliseconds of typing pause before the search box filters the list
+SEARCH_DELAY_MS = 150
+
+# Milliseconds between checks for changes saved by other instances
+CHANGE_POLL_MS = 2000
+
+# Task names listed in a reminder before "and N more"
+REMINDER_NAMES_SHOWN = 3
+
+# Milliseconds between updates of the debug panel
+DEBUG_PANEL_REFRESH_MS = 1000
+
+# Sort choices in the GUI mapped to TaskIndex.query order_by values
+SORT_OPTIONS = {"List order": None, "Due date": "due_date", "Priority": "priority"}
+
+
+class LoginWindow:
+    """Login window for user authentication"""
+    def __init__(self):
+        self.user_manager = UserManager()
+        self.root = tk.Tk()
+        self.root.title("To-Do List - Login")
+        self.root.geometry("450x300")
+        self.root.resizable(False, False)
+        self.username = None
+        self.busy = False
+        
+        # Center the window
+        self.center_window()
+        
+        # Create UI
+        self.create_widgets()
+    
+    def center_window(self):
+        """Center the window on screen"""
+        self.root.update_idletasks()
+        width = self.root.winfo_width()
+        height = self.root.winfo_height()
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f'{width}x{height}+{x}+{y}')
+    
+    def create_widgets(self):
+        """Create login UI widgets"""
+        # Title
+        title_label = tk.Label(
+            self.root,
+            text="To-Do List Management System",
+            font=("Arial", 16, "bold"),
+            pady=20
+        )
+        title_label.pack()
+        
+        # Login form frame
+        form_frame = tk.Frame(self.root)
+        form_frame.pack(pady=10)
+        
+        # Username
+        username_frame = tk.Frame(form_frame)
+        username_frame.pack(pady=8)
+        tk.Label(username_frame, text="Username:", font=("Arial", 11), width=12, anchor=tk.W).pack(side=tk.LEFT, padx=5)
+        self.username_entry = tk.Entry(username_frame, font=("Arial", 11), width=20)
+        self.username_entry.pack(side=tk.LEFT, padx=5)
+        self.username_entry.focus()
+        self.username_entry.bind('<Return>', lambda e: self.password_entry.focus())
+        
+        # Password
+        password_frame = tk.Frame(form_frame)
+        password_frame.pack(pady=8)
+        tk.Label(password_frame, text="Password:", font=("Arial", 11), width=12, anchor=tk.W).pack(side=tk.LEFT, padx=5)
+        self.password_entry = tk.Entry(password_frame, font=("Arial", 11), width=20, show="*")
+        self.password_entry.pack(side=tk.LEFT, padx=5)
+        self.password_entry.bind('<Return>', lambda e: self.login())
+        
+        # Buttons frame
+        button_frame = tk.Frame(self.root)
+        button_frame.pack(pady=20)
+        
+        # Login button
+        self.login_btn = tk.Button(
+            button_frame,
+            text="Login",
+            font=("Arial", 11, "bold"),
+            bg="#4CAF50",
+            fg="white",
+            padx=20,
+            pady=5,
+            command=self.login
+        )
+        self.login_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Register button
+        self.register_btn = tk.Button(
+            button_frame,
+            text="Register",
+            font=("Arial", 11, "bold"),
+            bg="#2196F3",
+            fg="white",
+            padx=20,
+            pady=5,
+            command=self.register
+        )
+        self.register_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Shown while a password is being hashed
+        self.status_label = tk.Label(self.root, text="", font=("Arial", 10), fg="gray")
+        self.status_label.pack()
+    
+    def run_in_background(self, message: str, func, on_done):
+        """Run func on a worker thread and pass its result to on_done
+
+        Password hashing is deliberately slow, so it must not block the
+        event loop. The buttons are disabled until the result arrives.
+        """
+        if self.busy:
+            return
+        self.busy = True
+        self.login_btn.config(state=tk.DISABLED)
+        self.register_btn.config(state=tk.DISABLED)
+        self.status_label.config(text=message)
+        results = queue.Queue()
+        
+        def work():
+            try:
+                results.put(func())
+            except Exception:
+                results.put(False)
+        threading.Thread(target=work, daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.poll_background, results, on_done)
+    
+    def poll_background(self, results: queue.Queue, on_done):
+        """Check for the worker thread's result"""
+        try:
+            result = results.get_nowait()
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self.poll_background, results, on_done)
+            return
+        self.busy = False
+        self.login_btn.config(state=tk.NORMAL)
+        self.register_btn.config(state=tk.NORMAL)
+        self.status_label.config(text="")
+        on_done(result)
+    
+    def login(self):
+        """Handle login"""
+        username = self.username_entry.get().strip()
+        password = self.password_entry.get()
+        
+        # Validation
+        if not username:
+            messagebox.showerror("Error", "Please enter a username!")
+            self.username_entry.focus()
+            return
+        
+        if not password:
+            messagebox.showerror("Error", "Please enter a password!")
+            self.password_entry.focus()
+            return
+        
+        # Verify credentials
+        self.run_in_background(
+            "Checking password...",
+            lambda: self.user_manager.verify_user(username, password),
+            lambda verified: self.on_login_result(username, verified)
+        )
+    
+    def on_login_result(self, username: str, verified: bool):
+        """Close the window on success, otherwise ask again"""
+        if verified:
+            # The name the account is stored under, and the task files named after it
+            self.username = canonical_username(username)
+            self.root.destroy()
+        else:
+            messagebox.showerror("Login Failed", "Invalid username or password!")
+            self.password_entry.delete(0, tk.END)
+            self.password_entry.focus()
+    
+    def register(self):
+        """Handle user registration"""
+        username = self.username_entry.get().strip()
+        password = self.password_entry.get()
+        
+        # Validation
+        if not username:
+            messagebox.showerror("Error", "Please enter a username!")
+            self.username_entry.focus()
+            return
+        
+        if not password:
+            messagebox.showerror("Error", "Please enter a password!")
+            self.password_entry.focus()
+            return
+        
+        if not valid_username(canonical_username(username)):
+            messagebox.showerror("Error", "Usernames may only contain letters, digits, '.', '_' and '-', "
+                                          "must not start with '.' and are at most 64 characters long!")
+            self.username_entry.focus()
+            return
+        
+        if len(password) < 4:
+            messagebox.showerror("Error", "Password must be at least 4 characters long!")
+            self.password_entry.focus()
+            return
+        
+        # Check if user already exists
+        if self.user_manager.user_exists(username):
+            messagebox.showerror("Registration Failed", "Username already exists! Please choose a different username.")
+            self.username_entry.focus()
+            return
+        
+        # Register new user
+        self.run_in_background(
+            "Creating account...",
+            lambda: self.user_manager.register_user(username, password),
+            lambda registered: self.on_register_result(username, registered)
+        )
+    
+    def on_register_result(self, username: str, registered: bool):
+        """Report the result of a registration"""
+        if registered:
+            messagebox.showinfo("Success", f"User '{username}' registered successfully! You can now login.")
+            self.password_entry.delete(0, tk.END)
+            self.password_entry.focus()
+        else:
+            messagebox.showerror("Registration Failed", "Failed to register user. Please try again.")
+    
+    def run(self) -> Optional[str]:
+        """Run login window and return username"""
+        self.root.mainloop()
+        return self.username
+
+
+class VirtualListbox(tk.Frame):
+    """Scrollable list that only draws the rows visible in the viewport
+
+    Rows are produced on demand by ``row_provider(index) -> (text, color)``,
+    so redrawing costs the same for 100 or 100,000 rows. Implements the
+    parts of the tk.Listbox interface used by TodoApp (``curselection``,
+    ``selection_clear``, ``<<ListboxSelect>>``). With
+    ``selectmode=tk.EXTENDED`` Ctrl-click toggles rows, Shift-click selects
+    a range and Ctrl+A selects every row.
+    """
+    def __init__(self, master, row_provider, font=("Arial", 10), selectmode=tk.BROWSE, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_provider = row_provider
+        self.font = tkfont.Font(font=font)
+        self.row_height = self.font.metrics("linespace") + 4
+        self.selectmode = selectmode
+        self.count = 0
+        self.top = 0
+        self.selected = set()
+        self.anchor = None
+        self._rows = []  # pool of canvas (highlight, text) items, one per visible row
+        
+        self.scrollbar = tk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=1, takefocus=1)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+        self.canvas.bind('<Button-1>', self._on_click)
+        if selectmode == tk.EXTENDED:
+            self.canvas.bind('<Control-Button-1>', lambda e: self._on_click(e, toggle=True))
+            self.canvas.bind('<Shift-Button-1>', lambda e: self._on_click(e, extend=True))
+            self.canvas.bind('<Control-a>', lambda e: self._select_all())
+        self.canvas.bind('<MouseWheel>', self._on_mousewheel)
+        self.canvas.bind('<Button-4>', lambda e: self.yview("scroll", -3, "units"))
+        self.canvas.bind('<Button-5>', lambda e: self.yview("scroll", 3, "units"))
+        self.canvas.bind('<Up>', lambda e: self._move_selection(-1))
+        self.canvas.bind('<Down>', lambda e: self._move_selection(1))
+        self.canvas.bind('<Prior>', lambda e: self.yview("scroll", -1, "pages"))
+        self.canvas.bind('<Next>', lambda e: self.yview("scroll", 1, "pages"))
+    
+    def visible_rows(self) -> int:
+        """Number of rows that fit in the viewport"""
+        return max(1, self.canvas.winfo_height() // self.row_height)
+    
+    def set_count(self, count: int):
+        """Set the number of rows and redraw"""
+        self.count = count
+        self.selected = {row for row in self.selected if row < count}
+        if self.anchor is not None and self.anchor >= count:
+            self.anchor = None
+        self.top = max(0, min(self.top, count - self.visible_rows()))
+        self.redraw()
+    
+    @profiling.timed("gui.redraw")
+    def redraw(self):
+        """Draw the rows currently in the viewport"""
+        width = self.canvas.winfo_width()
+        visible = self.visible_rows() + 1
+        while len(self._rows) < visible:
+            highlight = self.canvas.create_rectangle(0, 0, 0, 0, fill="#3399FF", width=0, state=tk.HIDDEN)
+            self._rows.append((highlight, self.canvas.create_text(4, 0, anchor=tk.W, font=self.font)))
+        
+        for slot, (highlight, item) in enumerate(self._rows):
+            index = self.top + slot
+            if slot >= visible or index >= self.count:
+                self.canvas.itemconfigure(highlight, state=tk.HIDDEN)
+                self.canvas.itemconfigure(item, state=tk.HIDDEN)
+                continue
+            text, color = self.row_provider(index)
+            y = slot * self.row_height
+            if index in self.selected:
+                color = "white"
+                self.canvas.coords(highlight, 0, y, width, y + self.row_height)
+                self.canvas.itemconfigure(highlight, state=tk.NORMAL)
+            else:
+                self.canvas.itemconfigure(highlight, state=tk.HIDDEN)
+            self.canvas.coords(item, 4, y + self.row_height // 2)
+            self.canvas.itemconfigure(item, text=text, fill=color, state=tk.NORMAL)
+        
+        self._update_scrollbar()
+    
+    def _update_scrollbar(self):
+        """Sync the scrollbar with the current position"""
+        if self.count:
+            last = self.top + self.visible_rows()
+            self.scrollbar.set(self.top / self.count, min(1.0, last / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def insert_row(self, index: int):
+        """Account for a row inserted at index"""
+        self.count += 1
+        self.selected = {row + 1 if row >= index else row for row in self.selected}
+        if self.anchor is not None and self.anchor >= index:
+            self.anchor += 1
+        if index < self.top:
+            # Keep the same rows in view
+            self.top += 1
+        self._redraw_if_visible(index)
+    
+    def delete_row(self, index: int):
+        """Account for the row at index being removed"""
+        self.count -= 1
+        self.selected = {row - 1 if row > index else row for row in self.selected if row != index}
+        if self.anchor == index:
+            self.anchor = None
+        elif self.anchor is not None and self.anchor > index:
+            self.anchor -= 1
+        if index < self.top:
+            self.top -= 1
+        self.top = max(0, min(self.top, self.count - self.visible_rows()))
+        self._redraw_if_visible(index)
+    
+    def update_row(self, index: int):
+        """Redraw the row at index if it is on screen"""
+        self._redraw_if_visible(index)
+    
+    def _redraw_if_visible(self, index: int):
+        """Redraw when a change at index touches the viewport"""
+        if index <= self.top + self.visible_rows():
+            self.redraw()
+        else:
+            self._update_scrollbar()
+    
+    def yview(self, *args):
+        """Scrollbar callback ("moveto" fraction or "scroll" n units/pages)"""
+        page = self.visible_rows()
+        if args[0] == "moveto":
+            top = int(float(args[1]) * self.count)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            top = self.top + (step * page if args[2] == "pages" else step)
+        else:
+            return
+        self.top = max(0, min(top, self.count - page))
+        self.redraw()
+    
+    def see(self, index: int):
+        """Scroll so that the row at index is visible"""
+        page = self.visible_rows()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + page:
+            self.top = index - page + 1
+        self.redraw()
+    
+    def curselection(self) -> tuple:
+        """Get the selected row indexes in order, like tk.Listbox"""
+        return tuple(sorted(self.selected))
+    
+    def selection_set(self, first: int, last: Optional[int] = None):
+        """Select the row at first, or the rows first..last inclusive"""
+        if self.selectmode != tk.EXTENDED:
+            self.selected = set()
+        self.selected.update(range(first, (first if last is None else last) + 1))
+        self.anchor = first
+        self.redraw()
+    
+    def selection_clear(self, first=0, last=None):
+        """Clear the selection"""
+        self.selected = set()
+        self.anchor = None
+        self.redraw()
+    
+    def _on_click(self, event, toggle: bool = False, extend: bool = False):
+        """Select the clicked row; Ctrl toggles it and Shift extends to it"""
+        self.canvas.focus_set()
+        index = self.top + event.y // self.row_height
+        if index >= self.count:
+            return
+        if toggle:
+            self.selected ^= {index}
+            self.anchor = index
+            self.redraw()
+        elif extend and self.anchor is not None:
+            self.selected = set(range(min(self.anchor, index), max(self.anchor, index) + 1))
+            self.redraw()
+        else:
+            self.selected = set()
+            self.selection_set(index)
+        self.event_generate('<<ListboxSelect>>')
+    
+    def _select_all(self):
+        """Select every row"""
+        self.selected = set(range(self.count))
+        self.redraw()
+        self.event_generate('<<ListboxSelect>>')
+        return "break"
+    
+    def _on_mousewheel(self, event):
+        """Scroll on Windows/macOS mouse wheel events"""
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.yview("scroll", -3 * delta, "units")
+    
+    def _move_selection(self, step: int):
+        """Move the selection with the arrow keys"""
+        if not self.count:
+            return
+        index = 0 if self.anchor is None else max(0, min(self.anchor + step, self.count - 1))
+        self.selected = {index}
+        self.anchor = index
+        self.see(index)
+        self.event_generate('<<ListboxSelect>>')
+
+
+class DebugPanel:
+    """Window showing the profiling report, updated every second
+
+    Opened with Ctrl+Shift+D. Opening it turns profiling on for the rest
+    of the session if TODO_PROFILE did not.
+    """
+    def __init__(self, master):
+        profiling.enable()
+        self.window = tk.Toplevel(master)
+        self.window.title("Debug: latencies")
+        self.text = tk.Text(self.window, font=("Courier", 9), width=110, height=24, wrap=tk.NONE)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.job = None
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.update()
+    
+    def update(self):
+        """Show the current report and schedule the next update"""
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, profiling.format_report())
+        self.text.config(state=tk.DISABLED)
+        self.job = self.window.after(DEBUG_PANEL_REFRESH_MS, self.update)
+    
+    def close(self):
+        """Stop updating and close the window"""
+        if self.job is not None:
+            self.window.after_cancel(self.job)
+        self.window.destroy()
+
+
+class HistoryWindow:
+    """Window paging through the archived tasks, newest first
+
+    Each page is read from the archive when it is shown, decompressing
+    only the part of the archive file that holds it.
+    """
+    def __init__(self, master, archive: TaskArchive):
+        self.archive = archive
+        self.page = 0
+        self.window = tk.Toplevel(master)
+        self.window.title("Task History")
+        self.window.geometry("700x500")
+        
+        self.listbox = tk.Listbox(self.window, font=("Arial", 10), fg="gray")
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+        
+        nav_frame = tk.Frame(self.window)
+        nav_frame.pack(fill=tk.X, padx=10, pady=10)
+        self.prev_btn = tk.Button(nav_frame, text="< Newer", font=("Arial", 10), padx=10,
+                                  command=lambda: self.show_page(self.page - 1))
+        self.prev_btn.pack(side=tk.LEFT)
+        self.next_btn = tk.Button(nav_frame, text="Older >", font=("Arial", 10), padx=10,
+                                  command=lambda: self.show_page(self.page + 1))
+        self.next_btn.pack(side=tk.RIGHT)
+        self.page_label = tk.Label(nav_frame, text="", font=("Arial", 10))
+        self.page_label.pack()
+        
+        self.show_page(0)
+    
+    def show_page(self, page: int):
+        """Read and list one page of the archive"""
+        try:
+            pages = self.archive.page_count()
+            self.page = max(0, min(page, pages - 1))
+            tasks = self.archive.read_page(self.page)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Error", f"Failed to read the task history: {error}", parent=self.window)
+            return
+        self.listbox.delete(0, tk.END)
+        for task in tasks:
+            priority_icon = "🔴" if task.priority == "High" else "🟢"
+            self.listbox.insert(
+                tk.END,
+                f"✓ {priority_icon} {task.name} | {task.category} | Completed: {task.completed_at or 'unknown'}"
+            )
+        self.page_label.config(text=f"Page {self.page + 1} of {pages} ({self.archive.count()} archived tasks)")
+        self.prev_btn.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_btn.config(state=tk.NORMAL if self.page < pages - 1 else tk.DISABLED)
+
+
+class TodoApp:
+    """Main To-Do List Application"""
+    def __init__(self, username: str):
+        self.username = username
+        self.task_manager = TaskManager(username, background=True, load=False)
+        # Id of the task being edited; stays valid while the list changes
+        self.selected_id = None
+        self.loading = False
+        self.view: Optional[List[int]] = None
+        self.view_query: Dict = {}
+        self.search_job = None
+        self.debug_panel: Optional[DebugPanel] = None
+        # Set while the worker thread writes old completed tasks to the archive
+        self.archive_results: Optional[queue.Queue] = None
+        self.reminders = ReminderScheduler(
+            self.task_manager, self.show_reminders,
+            call_later=lambda delay, func: self.root.after(int(delay * 1000), func),
+            cancel=lambda job: self.root.after_cancel(job)
+        )
+        
+        # Create main window
+        self.root = tk.Tk()
+        self.root.title(f"To-Do List - {username}")
+        self.root.geometry("900x700")
+        self.root.resizable(True, True)
+        
+        # Center the window
+        self.center_window()
+        
+        # Create UI
+        self.create_widgets()
+        
+        # Undo and redo the task manager's changes from anywhere in the window
+        self.root.bind('<Control-z>', lambda e: self.undo())
+        self.root.bind('<Control-y>', lambda e: self.redo())
+        self.root.bind('<Control-Shift-Z>', lambda e: self.redo())
+        # Hidden debug panel with live latency percentiles
+        self.root.bind('<Control-Shift-D>', lambda e: self.show_debug_panel())
+        
+        # Follow individual changes, then load tasks in the background
+        self.task_manager.add_listener(self.on_tasks_changed)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.load_tasks()
+        self.root.after(CHANGE_POLL_MS, self.poll_changes)
+    
+    def center_window(self):
+        """Center the window on screen"""
+        self.root.update_idletasks()
+        width = self.root.winfo_width()
+        height = self.root.winfo_height()
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f'{width}x{height}+{x}+{y}')
+    
+    def create_widgets(self):
+        """Create main application UI"""
+        # Header
+        header_frame = tk.Frame(self.root, bg="#2196F3", height=60)
+        header_frame.pack(fill=tk.X)
+        header_frame.pack_propagate(False)
+        
+        title_label = tk.Label(
+            header_frame,
+            text=f"Welcome, {self.username}!",
+            font=("Arial", 16, "bold"),
+            bg="#2196F3",
+            fg="white"
+        )
+        title_label.pack(side=tk.LEFT, padx=15, pady=15)
+        
+        # Counts from TaskManager.get_stats, updated on every change
+        self.summary_label = tk.Label(
+            header_frame,
+            text="",
+            font=("Arial", 10),
+            bg="#2196F3",
+            fg="white"
+        )
+        self.summary_label.pack(side=tk.RIGHT, padx=15, pady=15)
+        
+        # Errors of the background storage writes
+        self.status_label = tk.Label(self.root, text="", font=("Arial", 10), fg="red")
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        # Main container
+        main_container = tk.Frame(self.root)
+        main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Left panel - Task input
+        left_panel = tk.Frame(main_container, width=350)
+        left_panel.pack(side=tk.LEFT, fill=tk.BOTH, padx=(0, 10))
+        left_panel.pack_propagate(False)
+        
+        # Task input form
+        input_frame = tk.LabelFrame(left_panel, text="Add/Edit Task", font=("Arial", 12, "bold"), padx=10, pady=10)
+        input_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Task Name
+        tk.Label(input_frame, text="Task Name:", font=("Arial", 10)).grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.task_name_entry = tk.Entry(input_frame, font=("Arial", 10), width=25)
+        self.task_name_entry.grid(row=0, column=1, pady=5, padx=5)
+        
+        # Priority
+        tk.Label(input_frame, text="Priority:", font=("Arial", 10)).grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.priority_var = tk.StringVar(value="Low")
+        priority_combo = ttk.Combobox(input_frame, textvariable=self.priority_var, values=["High", "Low"], state="readonly", width=22)
+        priority_combo.grid(row=1, column=1, pady=5, padx=5)
+        
+        # Due Date
+        tk.Label(input_frame, text="Due Date:", font=("Arial", 10)).grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.due_date_entry = tk.Entry(input_frame, font=("Arial", 10), width=25)
+        self.due_date_entry.grid(row=2, column=1, pady=5, padx=5)
+        tk.Label(input_frame, text="(YYYY-MM-DD)", font=("Arial", 8), fg="gray").grid(row=3, column=1, sticky=tk.W, padx=5)
+        
+        # Category
+        tk.Label(input_frame, text="Category:", font=("Arial", 10)).grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.category_var = tk.StringVar(value="Personal")
+        category_combo = ttk.Combobox(
+            input_frame,
+            textvariable=self.category_var,
+            values=CATEGORIES,
+            state="readonly",
+            width=22
+        )
+        category_combo.grid(row=4, column=1, pady=5, padx=5)
+        
+        # Buttons frame
+        button_frame = tk.Frame(input_frame)
+        button_frame.grid(row=5, column=0, columnspan=2, pady=15)
+        
+        self.add_btn = tk.Button(
+            button_frame,
+            text="Add Task",
+            font=("Arial", 10, "bold"),
+            bg="#4CAF50",
+            fg="white",
+            padx=15,
+            pady=5,
+            command=self.add_task
+        )
+        self.add_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.update_btn = tk.Button(
+            button_frame,
+            text="Update Task",
+            font=("Arial", 10, "bold"),
+            bg="#FF9800",
+            fg="white",
+            padx=15,
+            pady=5,
+            command=self.update_task,
+            state=tk.DISABLED
+        )
+        self.update_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.clear_btn = tk.Button(
+            button_frame,
+            text="Clear",
+            font=("Arial", 10),
+            bg="#9E9E9E",
+            fg="white",
+            padx=15,
+            pady=5,
+            command=self.clear_form
+        )
+        self.clear_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Right panel - Task list
+        right_panel = tk.Frame(main_container)
+        right_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Task list frame
+        self.list_frame = tk.LabelFrame(right_panel, text="Task List", font=("Arial", 12, "bold"), padx=10, pady=10)
+        self.list_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Search box, filtering the list as the user types
+        search_frame = tk.Frame(self.list_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+        tk.Label(search_frame, text="Search:", font=("Arial", 9)).pack(side=tk.LEFT, padx=(0, 2))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=("Arial", 10))
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind('<Escape>', lambda e: self.search_var.set(""))
+        
+        # Filter and sort controls, answered by TaskManager.query_tasks
+        filter_frame = tk.Frame(self.list_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        self.filter_status_var = tk.StringVar(value="All")
+        self.filter_priority_var = tk.StringVar(value="All")
+        self.filter_category_var = tk.StringVar(value="All")
+        self.sort_var = tk.StringVar(value="List order")
+        filters = [
+            ("Status:", self.filter_status_var, ["All", "Pending", "Completed"], 10),
+            ("Priority:", self.filter_priority_var, ["All", "High", "Low"], 6),
+            ("Category:", self.filter_category_var, ["All"] + CATEGORIES, 9),
+            ("Sort:", self.sort_var, list(SORT_OPTIONS), 10),
+        ]
+        for label, variable, values, width in filters:
+            tk.Label(filter_frame, text=label, font=("Arial", 9)).pack(side=tk.LEFT, padx=(0, 2))
+            combo = ttk.Combobox(filter_frame, textvariable=variable, values=values, state="readonly", width=width)
+            combo.pack(side=tk.LEFT, padx=(0, 8))
+            combo.bind('<<ComboboxSelected>>', lambda e: self.apply_filters())
+        
+        # Virtualized task list: only visible rows are drawn. Several rows
+        # can be selected for Mark Completed and Delete.
+        self.task_listbox = VirtualListbox(
+            self.list_frame, self.format_task_row, font=("Arial", 10), selectmode=tk.EXTENDED
+        )
+        self.task_listbox.pack(fill=tk.BOTH, expand=True)
+        self.task_listbox.bind('<<ListboxSelect>>', self.on_task_select)
+        
+        # Action buttons frame
+        action_frame = tk.Frame(right_panel)
+        action_frame.pack(fill=tk.X, pady=10)
+        
+        self.complete_btn = tk.Button(
+            action_frame,
+            text="Mark Completed",
+            font=("Arial", 10, "bold"),
+            bg="#2196F3",
+            fg="white",
+            padx=15,
+            pady=5,
+            command=self.mark_completed
+        )
+        self.complete_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.delete_btn = tk.Button(
+            action_frame,
+            text="Delete Task",
+            font=("Arial", 10, "bold"),
+            bg="#F44336",
+            fg="white",
+            padx=15,
+            pady=5,
+            command=self.delete_task
+        )
+        self.delete_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.refresh_btn = tk.Button(
+            action_frame,
+            text="Refresh",
+            font=("Arial", 10),
+            bg="#607D8B",
+            fg="white",
+            padx=15,
+            pady=5,
+            command=self.sync_tasks
+        )
+        self.refresh_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.undo_btn = tk.Button(
+            action_frame,
+            text="Undo",
+            font=("Arial", 10),
+            padx=10,
+            pady=5,
+            state=tk.DISABLED,
+            command=self.undo
+        )
+        self.undo_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.redo_btn = tk.Button(
+            action_frame,
+            text="Redo",
+            font=("Arial", 10),
+            padx=10,
+            pady=5,
+            state=tk.DISABLED,
+            command=self.redo
+        )
+        self.redo_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.history_btn = tk.Button(
+            action_frame,
+            text="History",
+            font=("Arial", 10),
+            padx=10,
+            pady=5,
+            command=self.show_history
+        )
+        self.history_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Due and overdue reminders; click to dismiss
+        self.reminder_label = tk.Label(
+            right_panel, text="", font=("Arial", 10, "bold"), fg="#F44336",
+            anchor=tk.W, justify=tk.LEFT, wraplength=500
+        )
+        self.reminder_label.pack(fill=tk.X)
+        self.reminder_label.bind("<Button-1>", lambda event: self.reminder_label.config(text=""))
+    
+    def validate_date(self, date_string: str) -> bool:
+        """Validate date format (YYYY-MM-DD)"""
+        return parse_due_date(date_string) is not None
+    
+    def clear_form(self):
+        """Clear the input form"""
+        self.task_name_entry.delete(0, tk.END)
+        self.priority_var.set("Low")
+        self.due_date_entry.delete(0, tk.END)
+        self.category_var.set("Personal")
+        self.selected_id = None
+        self.update_btn.config(state=tk.DISABLED)
+        self.add_btn.config(state=tk.DISABLED if self.loading else tk.NORMAL)
+        self.task_listbox.selection_clear(0, tk.END)
+        self.update_list_title()
+    
+    def update_list_title(self):
+        """Show the loading state or the number of selected tasks in the list title"""
+        selected = len(self.task_listbox.curselection())
+        if self.loading:
+            self.list_frame.config(text="Task List (loading...)")
+        elif selected > 1:
+            self.list_frame.config(text=f"Task List ({selected} selected)")
+        else:
+            self.list_frame.config(text="Task List")
+    
+    def add_task(self):
+        """Add a new task"""
+        name = self.task_name_entry.get().strip()
+        priority = self.priority_var.get()
+        due_date = self.due_date_entry.get().strip()
+        category = self.category_var.get()
+        
+        # Validation
+        if not name:
+            messagebox.showerror("Error", "Please enter a task name!")
+            return
+        
+        if due_date and not self.validate_date(due_date):
+            messagebox.showerror("Error", "Invalid date format! Please use YYYY-MM-DD")
+            return
+        
+        # Create and add task
+        task = Task(name, priority, due_date, category, "Pending")
+        self.task_manager.add_task(task)
+        
+        messagebox.showinfo("Success", "Task added successfully!")
+        self.clear_form()
+    
+    def on_task_select(self, event):
+        """Handle task selection from listbox"""
+        selection = self.task_listbox.curselection()
+        if len(selection) > 1:
+            # Several tasks: only the bulk actions apply
+            self.selected_id = None
+            self.update_btn.config(state=tk.DISABLED)
+            self.add_btn.config(state=tk.DISABLED)
+            self.update_list_title()
+            return
+        self.update_list_title()
+        if selection:
+            task = self.task_manager.tasks[self.task_index(selection[0])]
+            self.selected_id = task.id
+            
+            # Populate form with selected task
+            self.task_name_entry.delete(0, tk.END)
+            self.task_name_entry.insert(0, task.name)
+            self.priority_var.set(task.priority)
+            self.due_date_entry.delete(0, tk.END)
+            self.due_date_entry.insert(0, task.due_date)
+            self.category_var.set(task.category)
+            
+            # Enable update button
+            self.update_btn.config(state=tk.NORMAL)
+            self.add_btn.config(state=tk.DISABLED)
+    
+    def update_task(self):
+        """Update selected task"""
+        if self.selected_id is None:
+            messagebox.showerror("Error", "Please select a task to update!")
+            return
+        
+        name = self.task_name_entry.get().strip()
+        priority = self.priority_var.get()
+        due_date = self.due_date_entry.get().strip()
+        category = self.category_var.get()
+        
+        # Validation
+        if not name:
+            messagebox.showerror("Error", "Please enter a task name!")
+            return
+        
+        if due_date and not self.validate_date(due_date):
+            messagebox.showerror("Error", "Invalid date format! Please use YYYY-MM-DD")
+            return
+        
+        # Get original status
+        original_task = self.task_manager.get_task(self.selected_id)
+        if original_task is None:
+            messagebox.showerror("Error", "The selected task no longer exists!")
+            self.clear_form()
+            return
+        status = original_task.status
+        
+        # Create updated task
+        updated_task = Task(name, priority, due_date, category, status, original_task.id)
+        
+        if self.task_manager.update_task_by_id(self.selected_id, updated_task):
+            messagebox.showinfo("Success", "Task updated successfully!")
+            self.clear_form()
+        else:
+            messagebox.showerror("Error", "Failed to update task!")
+    
+    def delete_task(self):
+        """Delete the selected tasks"""
+        selection = self.task_listbox.curselection()
+        if not selection:
+            messagebox.showerror("Error", "Please select a task to delete!")
+            return
+        
+        indexes = [self.task_index(row) for row in selection]
+        
+        # Confirm deletion, once for the whole selection
+        if len(indexes) == 1:
+            question = f"Are you sure you want to delete '{self.task_manager.tasks[indexes[0]].name}'?"
+        else:
+            question = f"Are you sure you want to delete {len(indexes)} tasks?"
+        if messagebox.askyesno("Confirm Delete", question):
+            if len(indexes) == 1:
+                deleted = self.task_manager.delete_task(indexes[0])
+            else:
+                deleted = self.task_manager.delete_tasks(indexes)
+            if deleted:
+                messagebox.showinfo("Success", "Task deleted successfully!" if len(indexes) == 1
+                                    else f"{deleted} tasks deleted successfully!")
+                self.clear_form()
+            else:
+                messagebox.showerror("Error", "Failed to delete task!")
+    
+    def mark_completed(self):
+        """Mark the selected tasks as completed"""
+        selection = self.task_listbox.curselection()
+        if not selection:
+            messagebox.showerror("Error", "Please select a task to mark as completed!")
+            return
+        
+        indexes = [
+            index for index in (self.task_index(row) for row in selection)
+            if self.task_manager.tasks[index].status != "Completed"
+        ]
+        
+        if not indexes:
+            messagebox.showinfo("Info", "Task is already completed!" if len(selection) == 1
+                                else "Selected tasks are already completed!")
+            return
+        
+        if len(indexes) == 1:
+            completed = self.task_manager.mark_completed(indexes[0])
+        else:
+            completed = self.task_manager.complete_tasks(indexes)
+        if completed:
+            messagebox.showinfo("Success", "Task marked as completed!" if len(indexes) == 1
+                                else f"{completed} tasks marked as completed!")
+            self.clear_form()
+        else:
+            messagebox.showerror("Error", "Failed to update task status!")
+    
+    def format_task_row(self, row: int):
+        """Format the task shown at a row of the task list"""
+        task = self.task_manager.tasks[self.task_index(row)]
+        status_icon = "✓" if task.status == "Completed" else "○"
+        priority_icon = "🔴" if task.priority == "High" else "🟢"
+        
+        task_display = f"{status_icon} {priority_icon} {task.name} | {task.category} | Due: {task.due_date if task.due_date else 'No date'}"
+        
+        # Color completed tasks differently
+        color = "gray" if task.status == "Completed" else "black"
+        return task_display, color
+    
+    @profiling.timed("gui.on_tasks_changed")
+    def on_tasks_changed(self, kind: str, index: Optional[int], tasks: Optional[List[Task]]):
+        """Apply a TaskManager change event to the task list"""
+        if self.view is not None:
+            # Rows of a filtered view do not line up with task indexes. While
+            # loading, the view is queried once finish_loading reloads
+            if kind != "extend" or not self.loading:
+                self.refresh_task_list()
+        elif kind == "insert":
+            self.task_listbox.insert_row(index)
+        elif kind == "update":
+            self.task_listbox.update_row(index)
+        elif kind == "delete":
+            self.task_listbox.delete_row(index)
+        else:
+            self.refresh_task_list()
+        self.update_summary()
+        self.update_history_buttons()
+    
+    def undo(self):
+        """Revert the latest change (Ctrl+Z)"""
+        if not self.loading and self.task_manager.undo() is not None:
+            self.reselect_after_changes()
+        self.update_history_buttons()
+    
+    def redo(self):
+        """Apply the latest undone change again (Ctrl+Y)"""
+        if not self.loading and self.task_manager.redo() is not None:
+            self.reselect_after_changes()
+        self.update_history_buttons()
+    
+    def update_history_buttons(self):
+        """Enable Undo and Redo when there is something to undo or redo"""
+        history = self.task_manager.history
+        self.undo_btn.config(state=tk.NORMAL if history.can_undo() else tk.DISABLED)
+        self.redo_btn.config(state=tk.NORMAL if history.can_redo() else tk.DISABLED)
+    
+    def show_history(self):
+        """Open a window browsing the archived tasks"""
+        HistoryWindow(self.root, self.task_manager.archive)
+    
+    def show_debug_panel(self):
+        """Open the debug panel, or raise it if it is already open"""
+        if self.debug_panel is not None and self.debug_panel.window.winfo_exists():
+            self.debug_panel.window.deiconify()
+            self.debug_panel.window.lift()
+            return
+        self.debug_panel = DebugPanel(self.root)
+    
+    def archive_old_tasks(self):
+        """Move tasks completed more than ARCHIVE_AFTER_DAYS ago to the archive
+
+        The archive is written on the worker thread; poll_archive deletes
+        the tasks once it has been.
+        """
+        self.archive_results = self.task_manager.archive_completed_async(ARCHIVE_AFTER_DAYS)
+        if self.archive_results is not None:
+            self.root.after(LOAD_POLL_MS, self.poll_archive)
+    
+    def poll_archive(self):
+        """Delete the archived tasks once the worker thread has written them"""
+        if self.archive_results is None:
+            # Applied by on_close
+            return
+        try:
+            result = self.archive_results.get_nowait()
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self.poll_archive)
+            return
+        self.apply_archived(result)
+    
+    def apply_archived(self, result):
+        """Delete the tasks archive_old_tasks archived, or warn that it failed"""
+        self.archive_results = None
+        try:
+            self.task_manager.apply_archive(result)
+        except OSError as error:
+            messagebox.showwarning("Warning", f"Old completed tasks could not be archived: {error}")
+    
+    def update_summary(self):
+        """Show the pending, overdue and completed counts in the header"""
+        counts = self.task_manager.get_stats().summary()
+        self.summary_label.config(
+            text=f"{counts['pending']} pending · {counts['high_pending']} high · "
+                 f"{counts['due_today']} due today · {counts['overdue']} overdue · "
+                 f"{counts['completed']} completed"
+        )
+    
+    @profiling.timed("gui.refresh_task_list")
+    def refresh_task_list(self):
+        """Refresh the task list display"""
+        if self.view is not None:
+            self.view = self.task_manager.query_tasks(**self.view_query)
+            self.task_listbox.set_count(len(self.view))
+        else:
+            self.task_listbox.set_count(len(self.task_manager.get_all_tasks()))
+    
+    def sync_tasks(self):
+        """Load changes saved by other instances, or just redraw the list if there are none"""
+        if self.loading:
+            return
+        if not self.start_refresh():
+            self.refresh_task_list()
+    
+    def poll_changes(self):
+        """Check for changes saved by other instances every CHANGE_POLL_MS
+
+        Also shows the last failed background write in the status line.
+        """
+        if not self.loading:
+            self.start_refresh()
+        error = self.task_manager.storage_error
+        self.status_label.config(text="" if error is None else f"Could not read or write the tasks: {error}")
+        self.root.after(CHANGE_POLL_MS, self.poll_changes)
+    
+    def start_refresh(self) -> bool:
+        """Read changes saved by other instances on the worker thread, if there are any
+
+        Only a stat of the task files runs here, so the window does not wait
+        for pending writes or for another instance's compaction.
+        """
+        results = self.task_manager.refresh_async()
+        if results is None:
+            return False
+        self.root.after(LOAD_POLL_MS, self.poll_refresh, results)
+        return True
+    
+    def poll_refresh(self, results: queue.Queue):
+        """Apply the result of start_refresh once the worker thread delivers it"""
+        try:
+            result = results.get_nowait()
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self.poll_refresh, results)
+            return
+        if self.task_manager.apply_refresh(result):
+            self.reselect_after_changes()
+    
+    def reselect_after_changes(self):
+        """Keep the task being edited selected after the list was reloaded"""
+        self.task_listbox.selection_clear()
+        index = None if self.selected_id is None else self.task_manager.index_of_id(self.selected_id)
+        if index is None:
+            if self.selected_id is not None:
+                # Deleted by another instance
+                self.clear_form()
+            self.update_list_title()
+            return
+        if self.view is None:
+            row = index
+        else:
+            row = self.view.index(index) if index in self.view else None
+        if row is not None:
+            self.task_listbox.selection_set(row)
+            self.task_listbox.see(row)
+        self.update_list_title()
+    
+    def show_reminders(self, events):
+        """Show the tasks that just became due or overdue"""
+        lines = []
+        for kind, label in (("reminder", "Due today"), ("overdue", "Overdue")):
+            names = [task.name for event_kind, task in events if event_kind == kind]
+            if not names:
+                continue
+            text = ", ".join(names[:REMINDER_NAMES_SHOWN])
+            if len(names) > REMINDER_NAMES_SHOWN:
+                text += f" and {len(names) - REMINDER_NAMES_SHOWN} more"
+            lines.append(f"{label}: {text}")
+        self.reminder_label.config(text="\n".join(lines))
+        # Due today and overdue counts change when the date does
+        self.update_summary()
+        self.root.bell()
+    
+    def task_index(self, row: int) -> int:
+        """Map a row of the task list to an index in TaskManager.tasks"""
+        return self.view[row] if self.view is not None else row
+    
+    def schedule_search(self):
+        """Filter by the search box once typing pauses for SEARCH_DELAY_MS"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.run_search)
+    
+    @profiling.timed("gui.run_search")
+    def run_search(self):
+        """Apply the search text without clearing the task form"""
+        self.search_job = None
+        self.build_view_query()
+        self.task_listbox.selection_clear()
+        self.update_list_title()
+        self.refresh_task_list()
+    
+    def build_view_query(self):
+        """Collect the search, filter and sort controls into view_query"""
+        query = {
+            "status": self.filter_status_var.get(),
+            "priority": self.filter_priority_var.get(),
+            "category": self.filter_category_var.get(),
+        }
+        self.view_query = {field: value for field, value in query.items() if value != "All"}
+        if self.search_var.get().strip():
+            self.view_query["text"] = self.search_var.get()
+        self.view_query["order_by"] = SORT_OPTIONS[self.sort_var.get()]
+        if len(self.view_query) == 1 and self.view_query["order_by"] is None:
+            self.view = None
+        else:
+            self.view = []
+    
+    def apply_filters(self):
+        """Show the tasks matching the filter and sort controls"""
+        self.build_view_query()
+        self.clear_form()
+        self.refresh_task_list()
+    
+    def load_tasks(self):
+        """Load tasks on the worker thread, showing them as they arrive
+
+        Storage that loads lazily (the binary backend) is opened at once
+        instead: only the rows on screen are decoded, and finish_loading
+        finds the tasks to archive and to remind of from the file's columns,
+        so the rest are decoded only when an edit or a filter needs them.
+        """
+        # New tasks would be appended before the ones still loading
+        self.loading = True
+        self.add_btn.config(state=tk.DISABLED)
+        self.update_list_title()
+        if self.task_manager.storage.lazy:
+            try:
+                self.task_manager.load_tasks()
+            except ValueError as error:
+                self.load_failed(error)
+                return
+            self.root.after(LOAD_POLL_MS, self.finish_loading)
+            return
+        self.load_results = self.task_manager.load_tasks_async()
+        self.root.after(LOAD_POLL_MS, self.poll_loaded_tasks)
+    
+    def poll_loaded_tasks(self):
+        """Move one loaded chunk into the task list per event loop turn"""
+        try:
+            chunk = self.load_results.get_nowait()
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self.poll_loaded_tasks)
+            return
+        if chunk is None:
+            self.finish_loading()
+            return
+        if isinstance(chunk, Exception):
+            self.load_failed(chunk)
+            return
+        self.task_manager.extend_loaded(chunk)
+        self.root.after(1, self.poll_loaded_tasks)
+    
+    def finish_loading(self):
+        """Archive old tasks, start the reminders and allow adding tasks once all are loaded"""
+        self.loading = False
+        self.task_manager.finish_loading()
+        if ARCHIVE_AFTER_DAYS >= 0:
+            self.archive_old_tasks()
+        # Started once loaded, so the chunks do not each rebuild its heap
+        self.reminders.start()
+        self.update_list_title()
+        if self.selected_id is None:
+            self.add_btn.config(state=tk.NORMAL)
+    
+    def load_failed(self, error: Exception):
+        """Report a task file that cannot be read and close without saving over it"""
+        messagebox.showerror(
+            "Error", f"Could not load your tasks: {error}\n\nThe task file was left unchanged."
+        )
+        self.reminders.stop()
+        self.task_manager.close()
+        self.root.destroy()
+    
+    def on_close(self):
+        """Write any pending changes before closing the window"""
+        self.reminders.stop()
+        if self.archive_results is not None:
+            # Otherwise the tasks already archived would be archived again
+            self.task_manager.flush()
+            self.apply_archived(self.archive_results.get())
+        if not self.task_manager.close():
+            messagebox.showerror(
+                "Error", f"Some changes could not be saved: {self.task_manager.storage_error or 'timed out'}"
+            )
+        self.root.destroy()
+    
+    def run(self):
+        """Run the application"""
+        self.root.mainloop()
+
+
+def main():
+    """Main entry point"""
+    # Show login window
+    login = LoginWindow()
+    username = login.run()
+    
+    if username:
+        # Start main application
+        app = TodoApp(username)
+        app.run()
+    else:
+        print("Login cancelled.")
@@ -0,0 +1,135 @@
+"""Undo and redo history of TaskManager changes"""
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from todo.models import Task
+
+
+# Approximate memory the history of one TaskManager may use, in bytes
+UNDO_MEMORY_BUDGET = int(os.environ.get("TODO_UNDO_MEMORY", str(8 * 1024 * 1024)))
+
+# Rough sizes used to charge operations against the budget
+OPERATION_BYTES = 200
+TASK_BYTES = 300
+CHANGE_BYTES = 150
+
+
+class Operation:
+    """One undoable change to the task list
+
+    ``kind`` says what was done: "add" and "delete" hold the Task objects
+    added or removed, "update" holds (task id, fields before, fields after)
+    triples with only the fields that changed. Undoing applies the opposite
+    and redoing applies it again, both by task id.
+    """
+    __slots__ = ("kind", "label", "payload", "size")
+    
+    def __init__(self, kind: str, label: str, payload: List):
+        self.kind = kind
+        self.label = label
+        self.payload = payload
+        self.size = operation_size(kind, payload)
+
+
+def operation_size(kind: str, payload: List) -> int:
+    """Estimate the memory an operation keeps alive"""
+    if kind in ("add", "delete"):
+        return OPERATION_BYTES + sum(TASK_BYTES + len(task.name) for task in payload)
+    size = OPERATION_BYTES
+    for _, before, after in payload:
+        size += CHANGE_BYTES + sum(len(str(value)) for value in before.values())
+        size += sum(len(str(value)) for value in after.values())
+    return size
+
+
+def changed_fields(old: Task, new: Task) -> Tuple[Dict, Dict]:
+    """The fields that differ between two versions of a task, as (before, after)"""
+    before = {}
+    after = {}
+    for field in Task.__slots__:
+        if field != "id" and getattr(old, field) != getattr(new, field):
+            before[field] = getattr(old, field)
+            after[field] = getattr(new, field)
+    return before, after
+
+
+def describe(verb: str, count: int) -> str:
+    """Label such as "Delete task" or "Delete 3 tasks\""""
+    return f"{verb} task" if count == 1 else f"{verb} {count} tasks"
+
+
+class UndoHistory:
+    """Bounded undo and redo stacks of Operations
+
+    Operations record only what is needed to reverse them, never a copy of
+    the list, so undoing or redoing costs the size of the operation. The
+    estimated sizes of both stacks together stay within ``budget`` bytes:
+    the oldest operations are dropped first, and an operation too large
+    for the budget on its own empties the history, so that undo never
+    skips a change. Recording a new operation empties the redo stack.
+    """
+    def __init__(self, budget: int = UNDO_MEMORY_BUDGET):
+        self.budget = budget
+        self.undo_stack: Deque[Operation] = deque()
+        self.redo_stack: List[Operation] = []
+        self.size = 0
+        # TaskManager turns this off while it undoes or redoes
+        self.recording = True
+    
+    def record(self, kind: str, label: str, payload: List):
+        """Remember a change that was just made"""
+        if not self.recording or not payload:
+            return
+        operation = Operation(kind, label, payload)
+        for redone in self.redo_stack:
+            self.size -= redone.size
+        self.redo_stack.clear()
+        if operation.size > self.budget:
+            self.clear()
+            return
+        self.undo_stack.append(operation)
+        self.size += operation.size
+        self.trim()
+    
+    def set_payload(self, operation: Operation, payload: List):
+        """Replace an operation's payload and charge its new size
+
+        Call ``trim`` once the operation is back on a stack.
+        """
+        self.size -= operation.size
+        operation.payload = payload
+        operation.size = operation_size(operation.kind, payload)
+        self.size += operation.size
+    
+    def trim(self):
+        """Drop the oldest operations until the history fits the budget again
+
+        If the redo stack alone is over budget, everything is forgotten.
+        """
+        while self.size > self.budget and self.undo_stack:
+            self.size -= self.undo_stack.popleft().size
+        if self.size > self.budget:
+            self.clear()
+    
+    def clear(self):
+        """Forget every operation"""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+    
+    def can_undo(self) -> bool:
+        """Whether there is an operation to undo"""
+        return bool(self.undo_stack)
+    
+    def can_redo(self) -> bool:
+        """Whether there is an undone operation to redo"""
+        return bool(self.redo_stack)
+    
+    def undo_label(self) -> Optional[str]:
+        """Label of the operation undo would revert"""
+        return self.undo_stack[-1].label if self.undo_stack else None
+    
+    def redo_label(self) -> Optional[str]:
+        """Label of the operation redo would apply"""
+        return self.redo_stack[-1].label if self.redo_stack else None
@@ -0,0 +1,216 @@
+"""In-memory secondary indexes over a task list"""
+import bisect
+from typing import List, Dict, Optional
+
+from todo.models import PRIORITY_RANK, Task, parse_due_date
+from todo.search import TextIndex
+from todo.stats import TaskStats
+
+
+# Fields with an equality index in TaskIndex
+INDEXED_FIELDS = ("status", "priority", "category")
+
+
+class TaskIndex:
+    """Secondary indexes over TaskManager's task list
+
+    Keeps the set of tasks for every status, priority and category value and
+    a sorted list of (due ordinal, seq, task) for tasks with a valid due
+    date. Each task gets a sequence number that grows with its position in
+    the list, so a task's index is found by binary search over ``seqs``
+    even after earlier tasks were deleted. ``by_id`` maps task ids to
+    tasks, so a task is found by id in O(1) and its index in O(log N).
+    Removing a task from ``seqs`` and a due date from ``due``, like the
+    manager's own ``list.pop``, moves the later entries up, which is O(N)
+    but only a memory move of one pointer per entry; benchmarks/bench_ids.py
+    measures about a millisecond at most per deletion at one million tasks.
+
+    ``tasks`` is the manager's list itself; the manager changes it and then
+    tells the index through append/replace/remove.
+
+    The word index used for text search is only built by the first search,
+    so loading does not pay for it; from then on it is kept up to date.
+    ``stats`` keeps the aggregate counts (see TaskStats).
+    """
+    def __init__(self, tasks: List[Task]):
+        self.tasks = tasks
+        self.values: Dict[str, Dict[str, set]] = {field: {} for field in INDEXED_FIELDS}
+        self.due: List[tuple] = []
+        self.seqs: List[int] = []
+        self.seq_of: Dict[Task, int] = {}
+        self.by_id: Dict[str, Task] = {}
+        self.text: Optional[TextIndex] = None
+        self.stats = TaskStats()
+        self.next_seq = 0
+        for task in tasks:
+            self.append(task)
+    
+    def _add_fields(self, task: Task):
+        """Index the task's field values"""
+        for field in INDEXED_FIELDS:
+            self.values[field].setdefault(getattr(task, field), set()).add(task)
+        self.stats.add(task)
+        if self.text is not None:
+            self.text.add(task)
+        ordinal = parse_due_date(task.due_date)
+        if ordinal is not None:
+            bisect.insort(self.due, (ordinal, self.seq_of[task], task))
+    
+    def _remove_fields(self, task: Task, due: bool = True):
+        """Drop the task's field values from the indexes"""
+        for field in INDEXED_FIELDS:
+            bucket = self.values[field].get(getattr(task, field))
+            if bucket is not None:
+                bucket.discard(task)
+                if not bucket:
+                    del self.values[field][getattr(task, field)]
+        self.stats.remove(task)
+        if self.text is not None:
+            self.text.remove(task)
+        if not due:
+            return
+        ordinal = parse_due_date(task.due_date)
+        if ordinal is not None:
+            position = bisect.bisect_left(self.due, (ordinal, self.seq_of[task]))
+            if position < len(self.due) and self.due[position][2] is task:
+                self.due.pop(position)
+    
+    def append(self, task: Task):
+        """Index a task appended to the list"""
+        self.seq_of[task] = self.next_seq
+        self.seqs.append(self.next_seq)
+        self.next_seq += 1
+        self.by_id[task.id] = task
+        self._add_fields(task)
+    
+    def replace(self, old: Task, new: Task):
+        """Index a task that took the place of another"""
+        self._remove_fields(old)
+        self.seq_of[new] = self.seq_of.pop(old)
+        self.by_id.pop(old.id, None)
+        self.by_id[new.id] = new
+        self._add_fields(new)
+    
+    def remove(self, index: int, task: Task):
+        """Forget the task deleted from position index (O(N) list move, see above)"""
+        self._remove_fields(task)
+        del self.seq_of[task]
+        self.by_id.pop(task.id, None)
+        self.seqs.pop(index)
+    
+    def remove_many(self, indexes: List[int]):
+        """Forget the tasks at the given positions
+
+        Call before the tasks are deleted from the list. The due list and
+        positions are rebuilt once instead of once per task.
+        """
+        doomed = set(indexes)
+        removed = set()
+        for index in doomed:
+            task = self.tasks[index]
+            self._remove_fields(task, due=False)
+            del self.seq_of[task]
+            self.by_id.pop(task.id, None)
+            removed.add(task)
+        self.due = [entry for entry in self.due if entry[2] not in removed]
+        self.seqs = [seq for index, seq in enumerate(self.seqs) if index not in doomed]
+    
+    def before_change(self, task: Task):
+        """Call before modifying an indexed field of task in place"""
+        self._remove_fields(task)
+    
+    def after_change(self, task: Task):
+        """Call after modifying an indexed field of task in place"""
+        self._add_fields(task)
+    
+    def text_index(self) -> TextIndex:
+        """The word index, built on first use"""
+        if self.text is None:
+            self.text = TextIndex(self.tasks)
+        return self.text
+    
+    def position(self, task: Task) -> int:
+        """Current list index of task"""
+        return bisect.bisect_left(self.seqs, self.seq_of[task])
+    
+    def position_of_id(self, task_id: str) -> Optional[int]:
+        """Current list index of the task with an id, or None"""
+        task = self.by_id.get(task_id)
+        return None if task is None else self.position(task)
+    
+    def query(self, status: Optional[str] = None, priority: Optional[str] = None,
+              category: Optional[str] = None, due_from: Optional[str] = None,
+              due_to: Optional[str] = None, order_by: Optional[str] = None,
+              descending: bool = False, limit: Optional[int] = None,
+              offset: int = 0, text: Optional[str] = None) -> List[Task]:
+        """Find tasks matching all given filters
+
+        Candidates come from the smallest matching index (an equality set,
+        the due-date range or the text search), so the cost depends on the
+        size of that set rather than on the whole list. order_by is None
+        (list order), "due_date" (undated tasks last) or "priority". text
+        matches tasks whose name or category has a word starting with each
+        word of text.
+        """
+        if order_by not in (None, "due_date", "priority"):
+            raise ValueError(f"Cannot order by {order_by}")
+        filters = {"status": status, "priority": priority, "category": category}
+        candidates = []
+        for field, value in filters.items():
+            if value is not None:
+                candidates.append(self.values[field].get(value, set()))
+        if text:
+            found = self.text_index().search(text)
+            if found is not None:
+                candidates.append(found)
+        
+        ranged = due_from is not None or due_to is not None
+        if ranged:
+            low = parse_due_date(due_from) if due_from is not None else None
+            high = parse_due_date(due_to) if due_to is not None else None
+            start = 0 if low is None else bisect.bisect_left(self.due, (low,))
+            end = len(self.due) if high is None else bisect.bisect_left(self.due, (high + 1,))
+            # Slice of the due list, already in due date order
+            candidates.append(self.due[start:end])
+        
+        if candidates:
+            smallest = min(candidates, key=len)
+            if isinstance(smallest, list):
+                matches = [entry[2] for entry in smallest]
+            else:
+                matches = list(smallest)
+            others = [c for c in candidates if c is not smallest and isinstance(c, set)]
+            matches = [task for task in matches if all(task in other for other in others)]
+            if ranged and not isinstance(smallest, list):
+                matches = [
+                    task for task in matches
+                    if parse_due_date(task.due_date) is not None
+                    and (low is None or parse_due_date(task.due_date) >= low)
+                    and (high is None or parse_due_date(task.due_date) <= high)
+                ]
+        elif order_by == "due_date" and not descending and limit is not None:
+            # Walk the due list in order and stop as soon as the page is full
+            matches = [entry[2] for entry in self.due[:offset + limit]]
+            if len(matches) < offset + limit:
+                dated = set(matches)
+                for task in self.tasks:
+                    if len(matches) >= offset + limit:
+                        break
+                    if task not in dated:
+                        matches.append(task)
+            return matches[offset:]
+        else:
+            matches = list(self.tasks)
+        
+        seq_of = self.seq_of
+        if order_by == "due_date":
+            undated = float("inf")
+            matches.sort(key=lambda task: (parse_due_date(task.due_date) or undated, seq_of[task]))
+        elif order_by == "priority":
+            matches.sort(key=lambda task: (PRIORITY_RANK.get(task.priority, len(PRIORITY_RANK)), seq_of[task]))
+        elif candidates:
+            matches.sort(key=seq_of.__getitem__)
+        if descending:
+            matches.reverse()
+        end = None if limit is None else offset + limit
+        return matches[offset:end]
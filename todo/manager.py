@@ -0,0 +1,771 @@
+"""TaskManager: the in-memory task list and its persistence"""
+import queue
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from todo.archive import ARCHIVE_AFTER_DAYS, TaskArchive
+from todo.binary import LazyTaskList
+from todo.history import UndoHistory, changed_fields, describe
+from todo.index import TaskIndex
+from todo.models import Task, new_task_id
+from todo.profiling import timed
+from todo.stats import TaskStats
+from todo.storage import StorageWorker, TaskStorage, create_storage
+
+
+# Tasks handed to the GUI per step of a background load; the first chunk is
+# about one screenful so the list appears before the rest is parsed
+LOAD_FIRST_CHUNK_SIZE = 100
+LOAD_CHUNK_SIZE = 2000
+
+
+def stamp_completion(task: Task, old: Optional[Task] = None):
+    """Set a task's completed_at to match its status
+
+    Pending tasks have none. A completed task keeps its own date, or else
+    that of the version it replaces if that was completed too, or else
+    gets today's.
+    """
+    if task.status != "Completed":
+        task.completed_at = ""
+    elif not task.completed_at:
+        if old is not None and old.status == "Completed" and old.completed_at:
+            task.completed_at = old.completed_at
+        else:
+            task.completed_at = date.today().isoformat()
+
+
+class TaskManager:
+    """Manages tasks storage and retrieval
+
+    Tasks are addressed by list index or, through the ``*_by_id`` methods,
+    by their persistent id, which stays valid while the list changes. With
+    ``background=True`` storage writes are handed to a StorageWorker thread,
+    so mutations return as soon as the in-memory list is updated.
+    ``refresh`` picks up changes saved by other processes using the same
+    storage, and ``refresh_async`` does the same on the worker thread. Every
+    change is recorded in ``history`` and can be reverted with ``undo`` and
+    applied again with ``redo``. Completed tasks get a ``completed_at``
+    date, and ``archive_completed`` moves old ones out of the list into the
+    user's compressed ``archive``; ``archive_completed_async`` writes the
+    archive on the worker thread.
+
+    Storage backends that load lazily (see BinaryTaskStorage) give a
+    LazyTaskList; the TaskIndex over it is then only built, decoding every
+    task, when a change, a filtered query or a lookup of a position
+    needs it. Until then reading tasks by position, unfiltered queries,
+    ``get_stats``, ``get_task``, ``summaries``, ``delete_tasks`` and
+    ``archive_completed`` only decode the tasks they return or remove.
+    """
+    def __init__(self, username: str, storage: Optional[TaskStorage] = None,
+                 background: bool = False, load: bool = True):
+        self.username = username
+        self.storage = storage if storage is not None else create_storage(username)
+        self.worker = StorageWorker(self.storage) if background else None
+        self.tasks: List[Task] = []
+        self._index: Optional[TaskIndex] = TaskIndex(self.tasks)
+        self.listeners = []
+        self.unsaved_changes = 0
+        # Bumped by every change to the list, so refresh_async can tell
+        # whether its result is out of date
+        self.edits = 0
+        self._refreshing = False
+        self._reload_wanted = False
+        self._storage_error: Optional[str] = None
+        self.history = UndoHistory()
+        self.archive = TaskArchive(username)
+        if load:
+            self.load_tasks()
+    
+    @property
+    def index(self) -> TaskIndex:
+        """The indexes over the task list, built on first use after a lazy load"""
+        if self._index is None:
+            self._index = TaskIndex(self.tasks)
+        return self._index
+    
+    @index.setter
+    def index(self, index: TaskIndex):
+        self._index = index
+    
+    def _unindexed_lazy(self) -> bool:
+        """Whether the list is a LazyTaskList still read from its file, with no TaskIndex yet"""
+        return self._index is None and isinstance(self.tasks, LazyTaskList) and not self.tasks.decoded
+    
+    def add_listener(self, callback):
+        """Register callback(kind, index, tasks) for task list changes
+
+        kind is "insert", "update" or "delete" for the single task in tasks
+        at index; "extend" when tasks were appended, the first at index;
+        "change" (index None) when the tasks in tasks were added, replaced
+        or deleted by one operation, those still in the list being the new
+        versions; or "reload" (index and tasks None) when the whole list
+        was replaced.
+        """
+        self.listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        """Unregister a change callback"""
+        self.listeners.remove(callback)
+    
+    def notify(self, kind: str, index: Optional[int] = None, tasks: Optional[List[Task]] = None):
+        """Send a change event to all listeners"""
+        for callback in self.listeners:
+            callback(kind, index, tasks)
+    
+    @timed("manager.load_tasks")
+    def load_tasks(self):
+        """Load tasks from the storage backend"""
+        if self.worker is not None:
+            self.worker.flush()
+        self.edits += 1
+        self.tasks = self.storage.load()
+        self._index = None if isinstance(self.tasks, LazyTaskList) else TaskIndex(self.tasks)
+        self.unsaved_changes = getattr(self.storage, "journal_entries", 0)
+        self.notify("reload")
+    
+    def load_tasks_async(self) -> queue.Queue:
+        """Load tasks on the worker thread
+
+        Returns a queue that receives lists of up to LOAD_CHUNK_SIZE tasks
+        followed by None, or by the exception loading raised (e.g. the
+        ValueError of a damaged task file) instead of None. Tasks are streamed from ``storage.iter_load``,
+        so the first LOAD_FIRST_CHUNK_SIZE arrive before the rest of the
+        file is parsed. The caller appends each chunk with
+        ``extend_loaded`` from its own thread and calls ``finish_loading``
+        after the last one.
+        """
+        results = queue.Queue()
+        self.edits += 1
+        self.tasks = []
+        self.index = TaskIndex(self.tasks)
+        self.notify("reload")
+        
+        @timed("manager.load_tasks_async")
+        def load():
+            chunk = []
+            chunk_size = LOAD_FIRST_CHUNK_SIZE
+            try:
+                for task in self.storage.iter_load():
+                    chunk.append(task)
+                    if len(chunk) >= chunk_size:
+                        results.put(chunk)
+                        chunk = []
+                        chunk_size = LOAD_CHUNK_SIZE
+            except Exception as error:
+                results.put(error)
+                raise
+            if chunk:
+                results.put(chunk)
+            results.put(None)
+        
+        if self.worker is not None:
+            self.worker.submit(load)
+        else:
+            load()
+        return results
+    
+    def extend_loaded(self, tasks: List[Task]):
+        """Append a chunk of tasks delivered by load_tasks_async
+
+        Listeners get an "extend" event with just the chunk, so loading
+        stays linear in the number of tasks.
+        """
+        self.edits += 1
+        start = len(self.tasks)
+        self.tasks.extend(tasks)
+        for task in tasks:
+            self.index.append(task)
+        self.unsaved_changes = getattr(self.storage, "journal_entries", 0)
+        self.notify("extend", start, tasks)
+    
+    def finish_loading(self):
+        """Tell listeners that load_tasks_async delivered its last chunk, with one "reload" event"""
+        self.notify("reload")
+    
+    def _write(self, method, *args, changes: int = 1):
+        """Persist changes to one or more tasks, directly or through the worker thread"""
+        if self.worker is not None:
+            self.worker.submit(method, *args)
+        else:
+            method(*args)
+        self.edits += 1
+        self.unsaved_changes += changes
+        if self.storage.needs_compaction(self.unsaved_changes, len(self.tasks)):
+            self.save_tasks()
+    
+    @timed("manager.save_tasks")
+    def save_tasks(self):
+        """Rewrite all tasks to the storage backend
+
+        Changes saved by other processes in the meantime are kept (see
+        TaskStorage.compact); ``refresh`` brings them into the list.
+        """
+        self.unsaved_changes = 0
+        if self.worker is not None:
+            # Copy so later edits are not folded into this snapshot twice
+            self.worker.submit(self.storage.compact, list(self.tasks))
+            return True
+        return self.storage.compact(self.tasks)
+    
+    @timed("manager.refresh")
+    def refresh(self) -> bool:
+        """Bring the list up to date with changes saved by other processes
+
+        Returns False, leaving the list alone, if nothing changed; the check
+        is cheap enough to run on a timer. When the backend can tell which
+        tasks changed only those are applied, otherwise everything is
+        loaded again. Listeners get a single "reload" event.
+        """
+        if self.worker is not None:
+            self.worker.flush()
+        if not self.storage.changed():
+            return False
+        changes = self.storage.read_changes()
+        if changes is None:
+            self.load_tasks()
+            return True
+        return self._apply_changes(changes)
+    
+    def refresh_async(self) -> Optional[queue.Queue]:
+        """Start a refresh on the worker thread
+
+        Only the cheap ``storage.changed`` check runs on the caller's
+        thread; reading the changes, or loading everything again, waits
+        behind the queued writes on the worker. Returns None if nothing
+        changed or a refresh is already running, otherwise a queue that
+        receives one result for the caller to pass to ``apply_refresh``
+        from its own thread.
+        """
+        if self._refreshing or not (self._reload_wanted or self.storage.changed()):
+            return None
+        reload = self._reload_wanted
+        self._reload_wanted = False
+        self._refreshing = True
+        edits = self.edits
+        results = queue.Queue()
+        
+        @timed("manager.refresh_async")
+        def read():
+            try:
+                changes = None if reload else self.storage.read_changes()
+                if changes is not None:
+                    results.put((edits, "changes", changes))
+                    return
+                tasks = self.storage.load()
+                index = None if isinstance(tasks, LazyTaskList) else TaskIndex(tasks)
+                results.put((edits, "reload", (tasks, index, getattr(self.storage, "journal_entries", 0))))
+            except Exception:
+                results.put((edits, "failed", None))
+                raise
+        
+        if self.worker is not None:
+            self.worker.submit(read)
+        else:
+            read()
+        return results
+    
+    def apply_refresh(self, result) -> bool:
+        """Apply a refresh_async result; returns whether the list changed
+
+        A result read while the list was being changed here lacks those
+        changes, so it is dropped and the next refresh_async loads
+        everything again.
+        """
+        self._refreshing = False
+        edits, kind, payload = result
+        if edits != self.edits or kind == "failed":
+            self._reload_wanted = True
+            return False
+        if kind == "changes":
+            return self._apply_changes(payload)
+        self.tasks, self._index, self.unsaved_changes = payload
+        self.notify("reload")
+        return True
+    
+    def _apply_changes(self, changes) -> bool:
+        """Apply read_changes pairs to the list without writing them back"""
+        applied = []
+        for kind, value in changes:
+            if kind == "delete":
+                index = self.index.position_of_id(value)
+                if index is not None:
+                    task = self.tasks[index]
+                    self.index.remove(index, task)
+                    self.tasks.pop(index)
+                    applied.append(task)
+                continue
+            index = self.index.position_of_id(value.id)
+            if index is None:
+                if kind == "add":
+                    self.tasks.append(value)
+                    self.index.append(value)
+                    applied.append(value)
+            elif self.tasks[index].to_dict() != value.to_dict():
+                self.index.replace(self.tasks[index], value)
+                self.tasks[index] = value
+                applied.append(value)
+        if applied:
+            self.notify("change", None, applied)
+        return bool(applied)
+    
+    @property
+    def storage_error(self) -> Optional[str]:
+        """Message of the last background storage call that failed, or None"""
+        if self.worker is not None:
+            return self.worker.last_error
+        return self._storage_error
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all changes have been written
+
+        Returns False if that timed out or a background write failed since
+        the last flush (see ``storage_error``).
+        """
+        if self.worker is not None:
+            return self.worker.flush(timeout)
+        return self.storage.flush()
+    
+    def close(self) -> bool:
+        """Flush pending writes and close the storage backend
+
+        Returns False if a background write failed since the last flush.
+        """
+        written = True
+        if self.worker is not None:
+            written = self.worker.stop()
+            self._storage_error = self.worker.last_error
+            self.worker = None
+        self.storage.close()
+        self.archive.close()
+        return written
+    
+    def add_task(self, task: Task):
+        """Add a new task"""
+        if task.id in self.index.by_id:
+            # e.g. the same Task object added twice
+            task.id = new_task_id()
+        stamp_completion(task)
+        self.tasks.append(task)
+        self.index.append(task)
+        self._write(self.storage.insert, task)
+        self.history.record("add", "Add task", [task])
+        self.notify("insert", len(self.tasks) - 1, [task])
+    
+    def add_tasks(self, tasks: List[Task]) -> int:
+        """Add several tasks with a single storage write; returns the number added"""
+        tasks = list(tasks)
+        if not tasks:
+            return 0
+        for task in tasks:
+            if task.id in self.index.by_id:
+                task.id = new_task_id()
+            stamp_completion(task)
+            self.tasks.append(task)
+            self.index.append(task)
+        self._write(self.storage.insert_many, tasks, changes=len(tasks))
+        self.history.record("add", describe("Add", len(tasks)), tasks)
+        if len(tasks) == 1:
+            self.notify("insert", len(self.tasks) - 1, tasks)
+        else:
+            self.notify("extend", len(self.tasks) - len(tasks), tasks)
+        return len(tasks)
+    
+    def update_task(self, index: int, task: Task):
+        """Update an existing task; the new task keeps the old one's id"""
+        if 0 <= index < len(self.tasks):
+            old = self.tasks[index]
+            task.id = old.id
+            stamp_completion(task, old)
+            self.index.replace(old, task)
+            self.tasks[index] = task
+            self._write(self.storage.update, index, task)
+            before, after = changed_fields(old, task)
+            if before:
+                self.history.record("update", "Edit task", [(task.id, before, after)])
+            self.notify("update", index, [task])
+            return True
+        return False
+    
+    def delete_task(self, index: int):
+        """Delete a task
+
+        Finding the task is O(1) and the index update O(log N); closing the
+        gap in the list is an O(N) pointer move (see TaskIndex).
+        """
+        if 0 <= index < len(self.tasks):
+            task = self.tasks[index]
+            # Before the list changes, in case the index is still to be built
+            self.index.remove(index, task)
+            self.tasks.pop(index)
+            self._write(self.storage.delete, index, task.id)
+            self.history.record("delete", "Delete task", [task])
+            self.notify("delete", index, [task])
+            return True
+        return False
+    
+    def mark_completed(self, index: int):
+        """Mark a task as completed"""
+        if 0 <= index < len(self.tasks):
+            task = self.tasks[index]
+            if task.status != "Completed":
+                completed_at = date.today().isoformat()
+                self.history.record("update", "Complete task", [(
+                    task.id,
+                    {"status": task.status, "completed_at": task.completed_at},
+                    {"status": "Completed", "completed_at": completed_at},
+                )])
+                self.index.before_change(task)
+                task.status = "Completed"
+                task.completed_at = completed_at
+                self.index.after_change(task)
+            self._write(self.storage.update, index, task)
+            self.notify("update", index, [task])
+            return True
+        return False
+    
+    def update_tasks(self, indexes: Iterable[int], **changes) -> int:
+        """Set the given fields on many tasks with a single storage write
+
+        Indexes can come from query_tasks, e.g.
+        ``update_tasks(query_tasks(category="Work"), priority="High")``.
+        Invalid and duplicate indexes are ignored. Returns the number of
+        tasks changed.
+        """
+        for field in changes:
+            if field not in Task.__slots__ or field == "id":
+                raise ValueError(f"Unknown task field: {field}")
+        updates = []
+        undo = []
+        for index in sorted(set(indexes)):
+            if not 0 <= index < len(self.tasks):
+                continue
+            task = self.tasks[index]
+            if all(getattr(task, field) == value for field, value in changes.items()):
+                continue
+            updated = Task.from_dict(dict(task.to_dict(), **changes))
+            stamp_completion(updated, task)
+            self.index.replace(task, updated)
+            self.tasks[index] = updated
+            updates.append((index, updated))
+            undo.append((task.id, *changed_fields(task, updated)))
+        if updates:
+            self._write(self.storage.update_many, updates, changes=len(updates))
+            verb = "Complete" if changes == {"status": "Completed"} else "Edit"
+            self.history.record("update", describe(verb, len(updates)), undo)
+            self.notify("change", None, [task for _, task in updates])
+        return len(updates)
+    
+    def complete_tasks(self, indexes: Iterable[int]) -> int:
+        """Mark many tasks as completed with a single storage write"""
+        return self.update_tasks(indexes, status="Completed")
+    
+    def delete_tasks(self, indexes: Iterable[int]) -> int:
+        """Delete many tasks with a single storage write
+
+        Indexes refer to positions before any of the deletions. Returns the
+        number of tasks deleted.
+        """
+        doomed = sorted({index for index in indexes if 0 <= index < len(self.tasks)})
+        if not doomed:
+            return 0
+        removed_tasks = [self.tasks[index] for index in doomed]
+        task_ids = [task.id for task in removed_tasks]
+        if self._unindexed_lazy():
+            self.tasks.delete_many(doomed)
+        else:
+            self.index.remove_many(doomed)
+            removed = set(doomed)
+            # In place: the index holds a reference to this list
+            self.tasks[:] = [task for index, task in enumerate(self.tasks) if index not in removed]
+        self._write(self.storage.delete_many, doomed, task_ids, changes=len(doomed))
+        self.history.record("delete", describe("Delete", len(doomed)), removed_tasks)
+        self.notify("change", None, removed_tasks)
+        return len(doomed)
+    
+    @timed("manager.archive_completed")
+    def archive_completed(self, days: int = ARCHIVE_AFTER_DAYS) -> int:
+        """Move tasks completed more than days ago to the archive
+
+        Only the completed tasks are looked at, through the status index,
+        or for a lazily loaded list through ``summaries``, so that only the
+        tasks archived are decoded. Completed tasks without a date, saved
+        before tasks had one, are dated today and so archived days from
+        now. The archived tasks are appended to ``archive`` before they are
+        deleted, which is not recorded for undo, and the task file is saved
+        without them; a lazily loaded list leaves the deletions in the
+        journal instead of decoding every task to save them. Returns the
+        number of tasks archived; raises OSError if the archive cannot be
+        written, in which case no task is deleted.
+        """
+        indexes = self._old_completed(days)
+        if not indexes:
+            return 0
+        self.archive.append([self.tasks[index] for index in indexes])
+        return self._delete_archived(indexes)
+    
+    def archive_completed_async(self, days: int = ARCHIVE_AFTER_DAYS) -> Optional[queue.Queue]:
+        """Like archive_completed, but write the archive on the worker thread
+
+        The tasks are picked and undated ones dated right away. Returns
+        None if there is nothing to archive, else a queue that receives
+        the result once the archive was written (or the OSError that
+        prevented it); pass it to ``apply_archive`` from the caller's
+        thread to delete the archived tasks.
+        """
+        indexes = self._old_completed(days)
+        if not indexes:
+            return None
+        tasks = [self.tasks[index] for index in indexes]
+        edits = self.edits
+        results = queue.Queue()
+        
+        @timed("manager.archive_completed_async")
+        def append():
+            try:
+                self.archive.append(tasks)
+            except Exception as error:
+                results.put(error)
+                if not isinstance(error, OSError):
+                    raise
+                return
+            results.put((edits, indexes, tasks))
+        
+        if self.worker is not None:
+            self.worker.submit(append)
+        else:
+            append()
+        return results
+    
+    def apply_archive(self, result) -> int:
+        """Delete the tasks archive_completed_async archived; returns how many
+
+        Raises the OSError if the archive could not be written. Tasks that
+        were edited or deleted in the meantime are left alone.
+        """
+        if isinstance(result, Exception):
+            raise result
+        edits, indexes, tasks = result
+        if edits != self.edits:
+            archived = {id(task) for task in tasks}
+            positions = self._indexes_of_ids(task.id for task in tasks)
+            indexes = [index for index in positions if id(self.tasks[index]) in archived]
+        return self._delete_archived(indexes)
+    
+    def _old_completed(self, days: int) -> List[int]:
+        """Sorted indexes of the tasks completed more than days ago, dating undated ones today"""
+        cutoff = (date.today() - timedelta(days=days)).isoformat()
+        undated = []
+        indexes = []
+        if self._unindexed_lazy():
+            for index, (task_id, status, _, completed_at) in enumerate(self.tasks.summaries()):
+                if status != "Completed":
+                    continue
+                if not completed_at:
+                    undated.append(task_id)
+                elif completed_at < cutoff:
+                    indexes.append(index)
+        else:
+            old = []
+            for task in self.index.values["status"].get("Completed", ()):
+                if not task.completed_at:
+                    undated.append(task.id)
+                elif task.completed_at < cutoff:
+                    old.append(task)
+            indexes = sorted(self.index.position(task) for task in old)
+        if undated:
+            # Dating them only replaces tasks, so the indexes stay valid
+            today = date.today().isoformat()
+            self._set_fields([(task_id, {"completed_at": today}) for task_id in undated])
+        return indexes
+    
+    def _delete_archived(self, indexes: List[int]) -> int:
+        """Delete archived tasks without recording it for undo, and save the task file"""
+        self.history.recording = False
+        try:
+            deleted = self.delete_tasks(indexes)
+        finally:
+            self.history.recording = True
+        if deleted and not self._unindexed_lazy():
+            self.save_tasks()
+        return deleted
+    
+    def undo(self) -> Optional[str]:
+        """Revert the latest change; returns its label, or None if there is nothing to undo
+
+        Tasks that were deleted come back at the end of the list. Parts of
+        the change that concern tasks no longer in the list are skipped.
+        """
+        if not self.history.can_undo():
+            return None
+        operation = self.history.undo_stack.pop()
+        self._apply_operation(operation, reverse=True)
+        self.history.redo_stack.append(operation)
+        self.history.trim()
+        return operation.label
+    
+    def redo(self) -> Optional[str]:
+        """Apply the latest undone change again; returns its label, or None"""
+        if not self.history.can_redo():
+            return None
+        operation = self.history.redo_stack.pop()
+        self._apply_operation(operation, reverse=False)
+        self.history.undo_stack.append(operation)
+        self.history.trim()
+        return operation.label
+    
+    def _apply_operation(self, operation, reverse: bool):
+        """Undo (reverse) or redo an Operation without recording it"""
+        self.history.recording = False
+        try:
+            if operation.kind == "update":
+                self._set_fields([
+                    (task_id, before if reverse else after) for task_id, before, after in operation.payload
+                ])
+            elif (operation.kind == "add") == reverse:
+                # Keep the tasks as they are now, for adding them back later
+                self.history.set_payload(operation, self._remove_ids([task.id for task in operation.payload]))
+            else:
+                self.add_tasks(operation.payload)
+        finally:
+            self.history.recording = True
+    
+    def _set_fields(self, items: List):
+        """Set fields given as (task id, {field: value}) pairs with a single storage write"""
+        updates = []
+        for task_id, fields in items:
+            index = self.index.position_of_id(task_id)
+            if index is None:
+                continue
+            task = self.tasks[index]
+            updated = Task.from_dict(dict(task.to_dict(), **fields))
+            self.index.replace(task, updated)
+            self.tasks[index] = updated
+            updates.append((index, updated))
+        if len(updates) == 1:
+            self._write(self.storage.update, *updates[0])
+            self.notify("update", updates[0][0], [updates[0][1]])
+        elif updates:
+            self._write(self.storage.update_many, updates, changes=len(updates))
+            self.notify("change", None, [task for _, task in updates])
+    
+    def _remove_ids(self, task_ids: List[str]) -> List[Task]:
+        """Delete the tasks with the given ids; returns the tasks deleted"""
+        indexes = self._indexes_of_ids(task_ids)
+        removed = [self.tasks[index] for index in sorted(indexes)]
+        if len(indexes) == 1:
+            self.delete_task(indexes[0])
+        elif indexes:
+            self.delete_tasks(indexes)
+        return removed
+    
+    def get_task(self, task_id: str) -> Optional[Task]:
+        """Get the task with an id, or None"""
+        if self._unindexed_lazy():
+            return self.tasks.find(task_id)
+        return self.index.by_id.get(task_id)
+    
+    def summaries(self) -> Iterator[Tuple[str, str, str, str]]:
+        """Yield the (id, status, due date, completion date) of every task in order
+
+        A lazily loaded list answers from its file's columns, without
+        decoding the tasks (see LazyTaskList.summaries).
+        """
+        if isinstance(self.tasks, LazyTaskList):
+            return self.tasks.summaries()
+        return ((task.id, task.status, task.due_date, task.completed_at) for task in self.tasks)
+    
+    def index_of_id(self, task_id: str) -> Optional[int]:
+        """Get the current list index of the task with an id, or None"""
+        return self.index.position_of_id(task_id)
+    
+    def _indexes_of_ids(self, task_ids: Iterable[str]) -> List[int]:
+        """Map ids to current indexes, skipping unknown ids"""
+        positions = (self.index.position_of_id(task_id) for task_id in task_ids)
+        return [index for index in positions if index is not None]
+    
+    def update_task_by_id(self, task_id: str, task: Task) -> bool:
+        """Replace the task with an id"""
+        index = self.index_of_id(task_id)
+        return index is not None and self.update_task(index, task)
+    
+    def delete_task_by_id(self, task_id: str) -> bool:
+        """Delete the task with an id"""
+        index = self.index_of_id(task_id)
+        return index is not None and self.delete_task(index)
+    
+    def mark_completed_by_id(self, task_id: str) -> bool:
+        """Mark the task with an id as completed"""
+        index = self.index_of_id(task_id)
+        return index is not None and self.mark_completed(index)
+    
+    def update_tasks_by_id(self, task_ids: Iterable[str], **changes) -> int:
+        """update_tasks for the tasks with the given ids"""
+        return self.update_tasks(self._indexes_of_ids(task_ids), **changes)
+    
+    def complete_tasks_by_id(self, task_ids: Iterable[str]) -> int:
+        """complete_tasks for the tasks with the given ids"""
+        return self.complete_tasks(self._indexes_of_ids(task_ids))
+    
+    def delete_tasks_by_id(self, task_ids: Iterable[str]) -> int:
+        """delete_tasks for the tasks with the given ids"""
+        return self.delete_tasks(self._indexes_of_ids(task_ids))
+    
+    @timed("manager.query_tasks")
+    def query_tasks(self, status: Optional[str] = None, priority: Optional[str] = None,
+                    category: Optional[str] = None, due_from: Optional[str] = None,
+                    due_to: Optional[str] = None, order_by: Optional[str] = None,
+                    descending: bool = False, limit: Optional[int] = None,
+                    offset: int = 0, text: Optional[str] = None) -> List[int]:
+        """Get indexes of tasks matching the given filters
+
+        Filters on status, priority and category alone go to the storage
+        backend's own indexes where it has them (SQLite); everything else
+        is answered from the in-memory TaskIndex; see TaskIndex.query for
+        the ordering and paging options. Without filters or ordering the
+        positions are known without either.
+        """
+        if order_by is None and not text and due_from is None and due_to is None:
+            if status is None and priority is None and category is None:
+                positions = range(len(self.tasks))
+            else:
+                positions = self._query_storage(status, priority, category)
+            if positions is not None:
+                if descending:
+                    positions = positions[::-1]
+                return list(positions[offset:None if limit is None else offset + limit])
+        tasks = self.index.query(status, priority, category, due_from, due_to,
+                                 order_by, descending, limit, offset, text)
+        return [self.index.position(task) for task in tasks]
+    
+    def _query_storage(self, status: Optional[str], priority: Optional[str],
+                       category: Optional[str]) -> Optional[List[int]]:
+        """storage.query, or None if the backend cannot answer for the list as it is
+
+        Its positions only match the list once every write has run and
+        while no changes from other processes are waiting to be applied.
+        """
+        if self._refreshing or self._reload_wanted or (self.worker is not None and not self.worker.idle()):
+            return None
+        positions = self.storage.query(status, priority, category)
+        if positions is None or self.storage.changed():
+            return None
+        return positions
+    
+    def get_stats(self) -> TaskStats:
+        """Task counts by status, priority, category and due date, kept up to date
+
+        A lazily loaded list answers from the counts saved with it, without
+        building the index.
+        """
+        if self._index is None and isinstance(self.tasks, LazyTaskList):
+            return self.tasks.stats()
+        return self.index.stats
+    
+    def index_of(self, task: Task) -> int:
+        """Get the current list index of a task"""
+        return self.index.position(task)
+    
+    def get_all_tasks(self) -> List[Task]:
+        """Get all tasks"""
+        return self.tasks
@@ -0,0 +1,93 @@
+"""Task data model and field helpers"""
+import os
+import sys
+import functools
+from datetime import date, datetime
+from typing import Dict, Optional
+
+
+class Task:
+    """Represents a single task in the to-do list
+
+    Uses __slots__ instead of a per-instance __dict__, and interns the
+    priority, due date, category and status strings so that every task with
+    the same value shares one string object. Every task has a persistent
+    unique ``id``; a new one is generated when none is given.
+    ``completed_at`` is the YYYY-MM-DD date a completed task was completed
+    on, set by TaskManager, and empty for pending tasks.
+    """
+    __slots__ = ("id", "name", "priority", "due_date", "category", "status", "completed_at")
+    
+    def __init__(self, name: str, priority: str, due_date: str, category: str, status: str = "Pending",
+                 id: Optional[str] = None, completed_at: str = ""):
+        self.id = id or new_task_id()
+        self.name = name
+        self.priority = sys.intern(priority)
+        self.due_date = sys.intern(due_date)
+        self.category = sys.intern(category)
+        self.status = sys.intern(status)
+        self.completed_at = sys.intern(completed_at)
+    
+    def to_dict(self) -> Dict:
+        """Convert task to dictionary for JSON storage
+
+        ``completed_at`` is left out while empty, so files of tasks without
+        it stay as they were.
+        """
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "priority": self.priority,
+            "due_date": self.due_date,
+            "category": self.category,
+            "status": self.status
+        }
+        if self.completed_at:
+            data["completed_at"] = self.completed_at
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Task':
+        """Create task from dictionary"""
+        return cls(
+            name=data.get("name", ""),
+            priority=data.get("priority") or "Low",
+            due_date=data.get("due_date") or "",
+            category=data.get("category") or "Personal",
+            status=data.get("status") or "Pending",
+            id=data.get("id"),
+            completed_at=data.get("completed_at") or ""
+        )
+
+
+def new_task_id() -> str:
+    """Generate a random 128-bit task id as 32 hex digits"""
+    return os.urandom(16).hex()
+
+
+# Task categories offered in the GUI
+CATEGORIES = ["Work", "Personal", "Study", "Shopping", "Health", "Other"]
+
+# Sort order of priorities when ordering by priority
+PRIORITY_RANK = {"High": 0, "Low": 1}
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_due_date(due_date: str) -> Optional[int]:
+    """Parse a YYYY-MM-DD due date to a date ordinal (None if empty or invalid)
+
+    Zero-padded dates take a fast path; anything else falls back to
+    strptime so the accepted formats match TodoApp.validate_date. The
+    fast path checks for ASCII digits itself, since int() would also take
+    signs, spaces and other scripts' digits that strptime rejects.
+    """
+    if not due_date:
+        return None
+    try:
+        if (len(due_date) == 10 and due_date[4] == '-' and due_date[7] == '-'
+                and due_date.isascii() and due_date[:4].isdigit()
+                and due_date[5:7].isdigit() and due_date[8:].isdigit()):
+            return date(int(due_date[:4]), int(due_date[5:7]), int(due_date[8:])).toordinal()
+        return datetime.strptime(due_date, "%Y-%m-%d").toordinal()
+    except ValueError:
+        return None
@@ -0,0 +1,240 @@
+"""Optional timers and counters around the slow paths, and their report
+
+Profiling is off unless the environment variable TODO_PROFILE is set (or
+the command line gets --profile). Functions decorated with ``timed`` then
+record how long each call takes in a LatencyHistogram under a name, and
+``count`` adds to named counters; a report of both is written to stderr
+when the process exits, and every TODO_PROFILE_INTERVAL seconds if set.
+While off, a decorated call costs one extra function call and a flag test.
+TODO_PROFILE_DUMP names a file for a cProfile dump of the main thread.
+"""
+import atexit
+import functools
+import math
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+# Any value except "" and "0" turns profiling on
+PROFILE = os.environ.get("TODO_PROFILE", "") not in ("", "0")
+
+# File the cProfile statistics of the main thread are written to at exit
+PROFILE_DUMP = os.environ.get("TODO_PROFILE_DUMP", "")
+
+# Seconds between reports while running; 0 reports only at exit
+PROFILE_INTERVAL = float(os.environ.get("TODO_PROFILE_INTERVAL", "0"))
+
+# Histogram buckets: four per power of two of nanoseconds, up to 2**64 ns
+BUCKETS = 256
+
+# Percentiles shown in reports
+REPORT_PERCENTILES = (0.5, 0.9, 0.99)
+
+enabled = False
+histograms: Dict[str, "LatencyHistogram"] = {}
+counters: Dict[str, int] = {}
+_lock = threading.Lock()
+_profiler = None
+_dump_filename = ""
+_exit_hook_registered = False
+_reporter: Optional[threading.Thread] = None
+
+
+def bucket_of(ns: int) -> int:
+    """Histogram bucket of a duration in nanoseconds
+
+    Below 8 ns every value has its own bucket; above, the bucket is given
+    by the position of the highest bit and the two bits after it.
+    """
+    if ns < 8:
+        return max(ns, 0)
+    shift = ns.bit_length() - 3
+    return (shift << 2) + (ns >> shift)
+
+
+def bucket_bounds(bucket: int) -> tuple:
+    """The durations (lowest, highest + 1) that fall into a bucket"""
+    if bucket < 8:
+        return bucket, bucket + 1
+    shift = (bucket >> 2) - 1
+    mantissa = bucket - (shift << 2)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """Durations counted in log-scale buckets
+
+    Recording is O(1) and the memory is fixed whatever the number of
+    calls. Percentiles are read from the buckets as the middle of the
+    bucket holding the wanted rank, which is within 12.5% of the exact
+    value, and never below the minimum or above the maximum seen.
+    """
+    __slots__ = ("buckets", "count", "total", "min", "max")
+    
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+    
+    def record(self, ns: int):
+        """Count one duration in nanoseconds"""
+        self.buckets[bucket_of(ns)] += 1
+        if not self.count or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        self.count += 1
+        self.total += ns
+    
+    def percentile(self, fraction: float) -> int:
+        """Approximate duration in nanoseconds below which fraction of the calls fall"""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket, number in enumerate(self.buckets):
+            seen += number
+            if seen >= rank:
+                low, high = bucket_bounds(bucket)
+                return min(max((low + high) // 2, self.min), self.max)
+        return self.max
+    
+    def summary(self) -> Dict:
+        """Call count and latencies in milliseconds"""
+        result = {
+            "calls": self.count,
+            "total_ms": round(self.total / 1e6, 3),
+            "mean_ms": round(self.total / self.count / 1e6, 3) if self.count else 0.0,
+        }
+        for fraction in REPORT_PERCENTILES:
+            result[f"p{round(fraction * 100)}_ms"] = round(self.percentile(fraction) / 1e6, 3)
+        result["max_ms"] = round(self.max / 1e6, 3)
+        return result
+
+
+def record(name: str, ns: int):
+    """Add a duration in nanoseconds to the histogram called name"""
+    with _lock:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = LatencyHistogram()
+        histogram.record(ns)
+
+
+def count(name: str, amount: int = 1):
+    """Add to the counter called name while profiling is on"""
+    if not enabled:
+        return
+    with _lock:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def timed(name: str):
+    """Decorator recording the latency of every call under name while profiling is on"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter_ns() - start)
+        return wrapper
+    return decorate
+
+
+def enable(dump: Optional[str] = None, interval: float = 0):
+    """Start recording; the report is written to stderr at exit
+
+    With dump, the main thread also runs under cProfile and its
+    statistics are written to that file at exit (view them with
+    ``python -m pstats FILE``). With interval, a report is also written
+    every interval seconds.
+    """
+    global enabled, _profiler, _dump_filename, _exit_hook_registered, _reporter
+    enabled = True
+    if not _exit_hook_registered:
+        atexit.register(_at_exit)
+        _exit_hook_registered = True
+    if dump and _profiler is None:
+        import cProfile
+        _dump_filename = dump
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if interval > 0 and _reporter is None:
+        _reporter = threading.Thread(target=_report_every, args=(interval,), name="profile-report", daemon=True)
+        _reporter.start()
+
+
+def disable():
+    """Stop recording; what was recorded is kept"""
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Forget every recorded latency and count"""
+    with _lock:
+        histograms.clear()
+        counters.clear()
+
+
+def snapshot() -> Dict:
+    """Summaries of every histogram and the counters"""
+    with _lock:
+        return {
+            "timers": {name: histogram.summary() for name, histogram in histograms.items()},
+            "counters": dict(counters),
+        }
+
+
+def format_report() -> str:
+    """The recorded latencies as a table, slowest total first, then the counters"""
+    data = snapshot()
+    columns = ["calls", "total_ms", "mean_ms"] + [f"p{round(f * 100)}_ms" for f in REPORT_PERCENTILES] + ["max_ms"]
+    width = max([len(name) for name in data["timers"]] + [len("timer")])
+    lines: List[str] = ["timer".ljust(width) + "".join(column.rjust(11) for column in columns)]
+    timers = sorted(data["timers"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    for name, summary in timers:
+        lines.append(name.ljust(width) + "".join(str(summary[column]).rjust(11) for column in columns))
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
+
+
+def write_report(stream=None):
+    """Write the report to stream (default stderr)"""
+    stream = stream if stream is not None else sys.stderr
+    stream.write(f"--- todo profile ---\n{format_report()}\n")
+    stream.flush()
+
+
+def _report_every(interval: float):
+    """Reporter thread: write the report every interval seconds"""
+    while True:
+        time.sleep(interval)
+        write_report()
+
+
+def _at_exit():
+    """Write the report and the cProfile dump when the process exits"""
+    if _profiler is not None:
+        _profiler.disable()
+        try:
+            _profiler.dump_stats(_dump_filename)
+            sys.stderr.write(f"cProfile statistics written to {_dump_filename}\n")
+        except OSError as error:
+            sys.stderr.write(f"Could not write cProfile statistics: {error}\n")
+    if histograms or counters:
+        write_report()
+
+
+if PROFILE or PROFILE_DUMP:
+    enable(PROFILE_DUMP or None, PROFILE_INTERVAL)
@@ -0,0 +1,232 @@
+"""Due-date reminders driven by a heap of upcoming events"""
+import functools
+import heapq
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from todo.manager import TaskManager
+from todo.models import Task, parse_due_date
+
+
+# Event kinds in the order they fire for a task: when its due date begins
+# (less remind_before seconds) and when the due date has passed
+EVENT_KINDS = ("reminder", "overdue")
+DONE = len(EVENT_KINDS)
+
+# Longest single sleep; with events further away the scheduler wakes this
+# often just to re-arm, so a changed clock or a suspended machine is noticed
+MAX_SLEEP_SECONDS = 3600
+
+# Rebuild the heap when it holds this many times more entries than tasks
+# still waiting for an event, e.g. after many due dates were edited
+HEAP_SLACK = 2
+
+
+@functools.lru_cache(maxsize=8192)
+def day_start(ordinal: int) -> float:
+    """Local time at which the day with a date ordinal begins"""
+    return time.mktime(date.fromordinal(ordinal).timetuple())
+
+
+def start_thread_timer(delay: float, func: Callable) -> threading.Timer:
+    """Call func on a daemon thread after delay seconds"""
+    timer = threading.Timer(delay, func)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+class ReminderScheduler:
+    """Fires reminder and overdue events for the pending tasks of a TaskManager
+
+    Every pending task with a valid due date has one entry in a heap of
+    (time, task id, due ordinal, stage), where stage indexes EVENT_KINDS.
+    Due dates are parsed once when a task is scheduled, and the scheduler
+    sleeps until the earliest entry is due (at most MAX_SLEEP_SECONDS)
+    instead of polling, so it costs nothing while idle.
+
+    The scheduler listens to the manager: added and edited tasks are
+    scheduled individually, also when a bulk edit, an import or an undo
+    changes many at once, so such changes cost O(k log N) for k tasks. Only
+    "reload" events, when the whole list was replaced, rebuild the heap in
+    O(N). Deleted or completed tasks leave their entry behind, and it is
+    skipped when it comes up. ``scheduled`` maps task ids to the (due ordinal, next
+    stage) each task is waiting for, so events that already fired are not
+    repeated after a reload.
+
+    ``callback(events)`` receives a list of (kind, task) pairs for all the
+    events that came due at one wake-up. By default the wake-ups run on
+    threading.Timer threads; pass ``call_later(delay, func)`` and
+    ``cancel(handle)``, e.g. from Tk's ``after``/``after_cancel``, to run
+    them on an event loop instead.
+    """
+    def __init__(self, task_manager: TaskManager, callback: Callable[[List[Tuple[str, Task]]], None],
+                 remind_before: float = 0, call_later: Optional[Callable] = None,
+                 cancel: Optional[Callable] = None, clock: Callable[[], float] = time.time):
+        self.task_manager = task_manager
+        self.callback = callback
+        self.remind_before = remind_before
+        self.call_later = call_later or start_thread_timer
+        self.cancel = cancel or (lambda timer: timer.cancel())
+        self.clock = clock
+        self.heap: List[Tuple[float, str, int, int]] = []
+        self.scheduled: Dict[str, Tuple[int, int]] = {}
+        self.lock = threading.RLock()
+        self.timer = None
+        self.wake_at: Optional[float] = None
+        # Wake-ups armed before the latest one are ignored if they still run
+        self.generation = 0
+        self.running = False
+    
+    def start(self):
+        """Schedule the current tasks and follow the manager's changes
+
+        Tasks already due or overdue are reported at the first wake-up,
+        which is armed immediately.
+        """
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.task_manager.add_listener(self.on_tasks_changed)
+            now = self.clock()
+            self._rebuild(now)
+            self._arm(now)
+    
+    def stop(self):
+        """Stop firing events and following the manager"""
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            self.task_manager.remove_listener(self.on_tasks_changed)
+            self._disarm()
+    
+    def event_time(self, ordinal: int, stage: int) -> float:
+        """When the event of a stage fires for a due date ordinal"""
+        if stage == 0:
+            return day_start(ordinal) - self.remind_before
+        return day_start(ordinal + 1)
+    
+    def _first_stage(self, ordinal: int, now: float) -> int:
+        """Stage a newly scheduled task starts at; overdue tasks skip the reminder"""
+        stage = 0
+        while stage < DONE - 1 and self.event_time(ordinal, stage + 1) <= now:
+            stage += 1
+        return stage
+    
+    def _schedule(self, task: Task, now: float):
+        """Schedule a task that was added or edited"""
+        ordinal = parse_due_date(task.due_date) if task.status != "Completed" else None
+        if ordinal is None:
+            self.scheduled.pop(task.id, None)
+            return
+        current = self.scheduled.get(task.id)
+        if current is not None and current[0] == ordinal:
+            return
+        stage = self._first_stage(ordinal, now)
+        self.scheduled[task.id] = (ordinal, stage)
+        heapq.heappush(self.heap, (self.event_time(ordinal, stage), task.id, ordinal, stage))
+        if len(self.heap) > HEAP_SLACK * len(self.scheduled) + 1024:
+            self._compact()
+    
+    def _rebuild(self, now: float):
+        """Schedule every task again, keeping the stage of unchanged ones"""
+        scheduled = {}
+        heap = []
+        # Read without building the tasks of a lazily loaded list
+        for task_id, status, due_date, _ in self.task_manager.summaries():
+            if status == "Completed":
+                continue
+            ordinal = parse_due_date(due_date)
+            if ordinal is None:
+                continue
+            current = self.scheduled.get(task_id)
+            if current is not None and current[0] == ordinal:
+                stage = current[1]
+            else:
+                stage = self._first_stage(ordinal, now)
+            scheduled[task_id] = (ordinal, stage)
+            if stage < DONE:
+                heap.append((self.event_time(ordinal, stage), task_id, ordinal, stage))
+        heapq.heapify(heap)
+        self.scheduled = scheduled
+        self.heap = heap
+    
+    def _compact(self):
+        """Drop heap entries that no longer match a scheduled task"""
+        self.heap = [
+            (self.event_time(ordinal, stage), task_id, ordinal, stage)
+            for task_id, (ordinal, stage) in self.scheduled.items() if stage < DONE
+        ]
+        heapq.heapify(self.heap)
+    
+    def _arm(self, now: float):
+        """Make sure a wake-up is set for the earliest entry"""
+        if not self.running or not self.heap:
+            return
+        wake_at = min(self.heap[0][0], now + MAX_SLEEP_SECONDS)
+        if self.timer is not None and self.wake_at <= wake_at:
+            return
+        self._disarm()
+        self.wake_at = wake_at
+        self.timer = self.call_later(max(0.0, wake_at - now), functools.partial(self._wake, self.generation))
+    
+    def _disarm(self):
+        """Cancel the pending wake-up"""
+        self.generation += 1
+        if self.timer is not None:
+            self.cancel(self.timer)
+        self.timer = None
+        self.wake_at = None
+    
+    def _wake(self, generation: int):
+        """Fire the events that came due and arm the next wake-up"""
+        with self.lock:
+            if generation != self.generation or not self.running:
+                return
+            self.timer = None
+            self.wake_at = None
+            now = self.clock()
+            events = self.pop_due(now)
+            self._arm(now)
+        if events:
+            self.callback(events)
+    
+    def pop_due(self, now: float) -> List[Tuple[str, Task]]:
+        """Take the events due by now off the heap and schedule each task's next one"""
+        events = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, task_id, ordinal, stage = heapq.heappop(self.heap)
+                if self.scheduled.get(task_id) != (ordinal, stage):
+                    continue
+                task = self.task_manager.get_task(task_id)
+                if task is None:
+                    # Deleted since it was scheduled
+                    del self.scheduled[task_id]
+                    continue
+                # Report only the latest event if several passed, e.g. while suspended
+                while stage < DONE - 1 and self.event_time(ordinal, stage + 1) <= now:
+                    stage += 1
+                events.append((EVENT_KINDS[stage], task))
+                self.scheduled[task_id] = (ordinal, stage + 1)
+                if stage + 1 < DONE:
+                    heapq.heappush(self.heap, (self.event_time(ordinal, stage + 1), task_id, ordinal, stage + 1))
+        return events
+    
+    def on_tasks_changed(self, kind: str, index: Optional[int], tasks: Optional[List[Task]]):
+        """TaskManager listener that keeps the heap up to date"""
+        with self.lock:
+            now = self.clock()
+            if kind == "reload":
+                self._rebuild(now)
+            elif kind != "delete":
+                for task in tasks:
+                    # Tasks a "change" deleted are skipped like single deletions
+                    if kind != "change" or self.task_manager.get_task(task.id) is task:
+                        self._schedule(task, now)
+            self._arm(now)
+
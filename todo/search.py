@@ -0,0 +1,104 @@
+"""Inverted word index for searching task names and categories"""
+import bisect
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from todo.models import Task
+
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words"""
+    return _WORD.findall(text.casefold())
+
+
+def task_words(task: Task) -> Set[str]:
+    """Distinct words of a task's name and category"""
+    return set(tokenize(task.name)) | set(tokenize(task.category))
+
+
+class TextIndex:
+    """Word and prefix index over task names and categories
+
+    ``postings`` maps each word to the tasks containing it and ``words`` is
+    the sorted vocabulary, so the words starting with a prefix form one
+    contiguous range found by binary search. Every query word is matched as
+    a prefix, which suits filtering as the user types.
+    """
+    def __init__(self, tasks: Iterable[Task] = ()):
+        self.postings: Dict[str, Set[Task]] = {}
+        self.words: List[str] = []
+        for task in tasks:
+            for word in task_words(task):
+                self.postings.setdefault(word, set()).add(task)
+        self.words = sorted(self.postings)
+    
+    def add(self, task: Task):
+        """Index a task's words"""
+        for word in task_words(task):
+            bucket = self.postings.get(word)
+            if bucket is None:
+                self.postings[word] = bucket = set()
+                bisect.insort(self.words, word)
+            bucket.add(task)
+    
+    def remove(self, task: Task):
+        """Drop a task's words"""
+        for word in task_words(task):
+            bucket = self.postings.get(word)
+            if bucket is None:
+                continue
+            bucket.discard(task)
+            if not bucket:
+                del self.postings[word]
+                position = bisect.bisect_left(self.words, word)
+                if position < len(self.words) and self.words[position] == word:
+                    self.words.pop(position)
+    
+    def _prefix_words(self, prefix: str) -> List[str]:
+        """Vocabulary words starting with prefix"""
+        start = bisect.bisect_left(self.words, prefix)
+        # "\U0010ffff" sorts after every character that can follow the prefix
+        end = bisect.bisect_left(self.words, prefix + "\U0010ffff", start)
+        return self.words[start:end]
+    
+    def _union(self, words: List[str]) -> Set[Task]:
+        """Tasks containing any of words; the posting set itself for one word"""
+        if len(words) == 1:
+            return self.postings[words[0]]
+        tasks: Set[Task] = set()
+        for word in words:
+            tasks.update(self.postings[word])
+        return tasks
+    
+    def search(self, text: str) -> Optional[Set[Task]]:
+        """Tasks containing a word starting with each word of text
+
+        Returns None when text contains no words. The rarest query word is
+        looked up first; the others narrow that candidate set.
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return None
+        ranges = []
+        for term in terms:
+            words = self._prefix_words(term)
+            ranges.append((sum(len(self.postings[word]) for word in words), term, words))
+        ranges.sort()
+        
+        matches = self._union(ranges[0][2])
+        for size, term, words in ranges[1:]:
+            if not matches:
+                break
+            if len(words) == 1 or size <= len(matches):
+                # Set intersection iterates the smaller operand
+                matches = matches & self._union(words)
+            else:
+                matches = {
+                    task for task in matches
+                    if any(word.startswith(term) for word in task_words(task))
+                }
+        # Never hand out a posting set the caller could modify
+        return set(matches) if len(ranges) == 1 and len(ranges[0][2]) == 1 else matches
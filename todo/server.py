@@ -0,0 +1,502 @@
+"""Local HTTP/JSON API over TaskManager and UserManager
+
+Start it with ``python -m todo serve``; it listens on 127.0.0.1:8765 by
+default. Connections are kept alive between requests (HTTP/1.1), each
+user's tasks stay loaded in a TaskManager between requests, and storage
+writes run on the managers' StorageWorker threads, so the event loop only
+ever touches memory. Loading a user's tasks and hashing passwords run on a
+thread pool.
+
+Endpoints (request and response bodies are JSON):
+
+    POST   /register              {"username": ..., "password": ...}
+    POST   /login                 {"username": ..., "password": ...} -> {"token": ...}
+    POST   /logout
+    GET    /tasks                 ?status=&priority=&category=&due_from=&due_to=
+                                  &text=&order_by=&descending=&limit=&offset=
+    POST   /tasks                 {"name": ..., "priority": ..., ...} -> the new task
+    POST   /tasks/bulk            {"action": "complete" | "delete" | "update",
+                                   "ids": [...], "changes": {...}}
+    GET    /tasks/<id>
+    PATCH  /tasks/<id>            the fields to change
+    DELETE /tasks/<id>
+    POST   /tasks/<id>/complete
+    GET    /stats                 counts by status, priority, category and due date
+    POST   /undo, POST /redo      revert or reapply the user's latest change
+
+Everything but /register and /login needs an ``Authorization: Bearer
+<token>`` header with a token from /login, and only sees the tasks of the
+token's user. Errors are returned as ``{"error": message}``.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from todo import profiling
+from todo.manager import TaskManager
+from todo.models import CATEGORIES, PRIORITY_RANK, Task, parse_due_date
+from todo.users import UserManager, canonical_username, valid_username
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("TODO_SERVER_PORT", "8765"))
+
+# Users whose tasks stay loaded; the least recently used is closed beyond this
+MAX_CACHED_USERS = int(os.environ.get("TODO_SERVER_USERS", "64"))
+
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 30.0
+
+# Limits on incoming requests
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_HEADERS = 100
+
+# Seconds between checks for changes saved by the GUI or CLI
+CHANGE_POLL_SECONDS = 2.0
+
+TASK_FIELDS = ("name", "priority", "due_date", "category", "status")
+STATUSES = ("Pending", "Completed")
+QUERY_PARAMETERS = ("status", "priority", "category", "due_from", "due_to", "text",
+                    "order_by", "descending", "limit", "offset")
+
+
+class HttpError(Exception):
+    """An error answered with an HTTP status and a message"""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def validate_task_fields(data, partial: bool) -> Dict[str, str]:
+    """Check task fields from a request body and return them
+
+    Unless partial, a name is required. Raises HttpError(400) on unknown
+    fields or invalid values.
+    """
+    if not isinstance(data, dict):
+        raise HttpError(400, "Expected a JSON object")
+    fields = {}
+    for field, value in data.items():
+        if field not in TASK_FIELDS:
+            raise HttpError(400, f"Unknown task field: {field}")
+        if not isinstance(value, str):
+            raise HttpError(400, f"{field} must be a string")
+        fields[field] = value.strip()
+    if "name" in fields and not fields["name"]:
+        raise HttpError(400, "Please enter a task name!")
+    if not partial and "name" not in fields:
+        raise HttpError(400, "Please enter a task name!")
+    if fields.get("due_date") and parse_due_date(fields["due_date"]) is None:
+        raise HttpError(400, "Invalid date format! Please use YYYY-MM-DD")
+    for field, allowed in (("priority", PRIORITY_RANK), ("category", CATEGORIES), ("status", STATUSES)):
+        if field in fields and fields[field] not in allowed:
+            raise HttpError(400, f"Invalid {field}: {fields[field]}")
+    return fields
+
+
+async def read_line(reader: asyncio.StreamReader) -> bytes:
+    """Read one request or header line"""
+    try:
+        return await reader.readline()
+    except ValueError:
+        # Longer than the stream's buffer limit
+        raise HttpError(431, "Request line or header too long")
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """Read one request from a connection
+
+    Returns (method, target, headers, body, keep_alive), or None once the
+    client has closed the connection. Raises HttpError for requests that
+    cannot be answered; the connection is closed after the error response.
+    """
+    line = await read_line(reader)
+    if not line.endswith(b"\n"):
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await read_line(reader)
+        if not line.endswith(b"\n"):
+            return None
+        if not line.strip():
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(431, "Too many headers")
+        name, separator, value = line.decode('latin-1').partition(":")
+        if not separator:
+            raise HttpError(400, "Malformed header")
+        headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+        raise HttpError(501, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), target, headers, body, keep_alive
+
+
+def encode_response(status: int, payload, keep_alive: bool) -> bytes:
+    """Encode a JSON response"""
+    body = json.dumps(payload, separators=(",", ":")).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode('latin-1') + body
+
+
+class TaskServer:
+    """Serves the API for every user from one process
+
+    ``managers`` holds a TaskManager with a background writer for each
+    recently active user, least recently used first. Requests for one
+    user are serialized by that user's asyncio lock, which is also held
+    while the tasks load and while changes saved by other processes are
+    picked up, so the event loop never sees a half-loaded list.
+    """
+    def __init__(self, user_manager: Optional[UserManager] = None, max_users: Optional[int] = None):
+        self.user_manager = user_manager if user_manager is not None else UserManager()
+        self.max_users = max_users or MAX_CACHED_USERS
+        self.managers: "OrderedDict[str, TaskManager]" = OrderedDict()
+        self.locks: Dict[str, asyncio.Lock] = {}
+        # Managers being closed after eviction, by username
+        self.closing: Dict[str, asyncio.Future] = {}
+        self.server = None
+        self.poller = None
+    
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """Start listening; returns the asyncio server"""
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        self.poller = asyncio.ensure_future(self.poll_changes())
+        return self.server
+    
+    async def close(self):
+        """Stop listening and write out every user's changes"""
+        if self.poller is not None:
+            self.poller.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        managers = list(self.managers.values())
+        self.managers.clear()
+        for manager in managers:
+            await self.run_blocking(manager.close)
+        if self.closing:
+            await asyncio.gather(*self.closing.values())
+        self.user_manager.close()
+    
+    async def run_blocking(self, func, *args):
+        """Run a blocking call on the default thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    
+    def lock_for(self, username: str) -> asyncio.Lock:
+        """The lock serializing a user's requests"""
+        lock = self.locks.get(username)
+        if lock is None:
+            lock = self.locks[username] = asyncio.Lock()
+        return lock
+    
+    async def manager_for(self, username: str) -> TaskManager:
+        """Get the user's TaskManager, loading it if needed; hold lock_for(username)
+
+        username must be canonical. Names that are not valid_username, from
+        accounts registered before names were checked, are refused rather
+        than used in a file name.
+        """
+        if not valid_username(username):
+            raise HttpError(403, "This username cannot be used with the API")
+        manager = self.managers.get(username)
+        if manager is not None:
+            self.managers.move_to_end(username)
+            return manager
+        if username in self.closing:
+            # Its last writes must be on disk before loading again
+            await self.closing[username]
+        manager = TaskManager(username, background=True, load=False)
+        try:
+            await self.run_blocking(manager.load_tasks)
+        except ValueError:
+            await self.run_blocking(manager.close)
+            raise HttpError(500, "The task file cannot be read")
+        self.managers[username] = manager
+        self.evict()
+        return manager
+    
+    def evict(self):
+        """Close the least recently used managers beyond max_users"""
+        for username in list(self.managers):
+            if len(self.managers) <= self.max_users:
+                break
+            lock = self.locks.get(username)
+            if lock is not None and lock.locked():
+                continue
+            manager = self.managers.pop(username)
+            self.locks.pop(username, None)
+            closed = asyncio.ensure_future(self.run_blocking(manager.close))
+            self.closing[username] = closed
+            closed.add_done_callback(lambda future, username=username: self.closing.pop(username, None))
+    
+    async def poll_changes(self):
+        """Pick up changes the GUI or CLI saved for loaded users"""
+        while True:
+            await asyncio.sleep(CHANGE_POLL_SECONDS)
+            for username, manager in list(self.managers.items()):
+                lock = self.lock_for(username)
+                if lock.locked():
+                    # Busy; look again next time
+                    continue
+                async with lock:
+                    if self.managers.get(username) is manager:
+                        try:
+                            await self.run_blocking(manager.refresh)
+                        except ValueError:
+                            # Damaged by another process; keep the tasks in memory
+                            pass
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer requests on one connection until either side closes it"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as error:
+                    writer.write(encode_response(error.status, {"error": error.message}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body, keep_alive = request
+                started = time.perf_counter_ns()
+                try:
+                    status, payload = await self.dispatch(method, target, headers, body)
+                except HttpError as error:
+                    status, payload = error.status, {"error": error.message}
+                except Exception:
+                    traceback.print_exc()
+                    status, payload = 500, {"error": "Internal server error"}
+                if profiling.enabled:
+                    profiling.record("server.request", time.perf_counter_ns() - started)
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Shutting down with the connection idle; a re-raise would only be logged
+            pass
+        finally:
+            writer.close()
+    
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        """Route a request; returns (status, payload)"""
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        try:
+            data = json.loads(body.decode('utf-8')) if body else None
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON")
+        
+        if parts in (["register"], ["login"]):
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            username, password = self.credentials(data)
+            if parts[0] == "register":
+                return await self.register(username, password)
+            return await self.login(username, password)
+        
+        token, username = self.authenticate(headers)
+        if parts == ["logout"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            self.user_manager.end_session(token)
+            return 200, {"logged_out": username}
+        if parts == ["stats"]:
+            if method != "GET":
+                raise HttpError(405, "Use GET")
+        elif parts in (["undo"], ["redo"]):
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+        elif not parts or parts[0] != "tasks":
+            raise HttpError(404, "Not found")
+        async with self.lock_for(username):
+            manager = await self.manager_for(username)
+            if parts == ["stats"]:
+                return 200, manager.get_stats().to_dict()
+            if parts == ["undo"]:
+                label = manager.undo()
+                if label is None:
+                    raise HttpError(409, "Nothing to undo")
+                return 200, {"undone": label}
+            if parts == ["redo"]:
+                label = manager.redo()
+                if label is None:
+                    raise HttpError(409, "Nothing to redo")
+                return 200, {"redone": label}
+            return self.task_request(manager, method, parts[1:], url.query, data)
+    
+    def credentials(self, data) -> Tuple[str, str]:
+        """Canonical username and password from a /register or /login body"""
+        if not isinstance(data, dict):
+            raise HttpError(400, "Expected a JSON object")
+        username, password = data.get("username"), data.get("password")
+        if not isinstance(username, str) or not username.strip():
+            raise HttpError(400, "Please enter a username!")
+        if not isinstance(password, str) or not password:
+            raise HttpError(400, "Please enter a password!")
+        return canonical_username(username), password
+    
+    async def register(self, username: str, password: str):
+        """Create an account"""
+        if not valid_username(username):
+            raise HttpError(400, "Usernames may only contain letters, digits, '.', '_' and '-', "
+                                 "must not start with '.' and are at most 64 characters long")
+        if len(password) < 4:
+            raise HttpError(400, "Password must be at least 4 characters long!")
+        if not await self.run_blocking(self.user_manager.register_user, username, password):
+            raise HttpError(409, "Username already exists!")
+        return 201, {"username": username}
+    
+    async def login(self, username: str, password: str):
+        """Check credentials and start a session"""
+        token = await self.run_blocking(self.user_manager.create_session, username, password)
+        if token is None:
+            raise HttpError(401, "Invalid username or password!")
+        return 200, {"token": token, "expires_in": self.user_manager.session_ttl}
+    
+    def authenticate(self, headers: Dict[str, str]) -> Tuple[str, str]:
+        """The session token and username of a request"""
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        username = self.user_manager.check_session(token.strip()) if scheme.lower() == "bearer" else None
+        if username is None:
+            raise HttpError(401, "Log in first")
+        return token.strip(), username
+    
+    def task_request(self, manager: TaskManager, method: str, parts: List[str], query: str, data):
+        """Answer a request under /tasks; returns (status, payload)"""
+        if not parts:
+            if method == "GET":
+                return 200, {"tasks": self.query(manager, query)}
+            if method == "POST":
+                fields = validate_task_fields(data, partial=False)
+                task = Task(fields["name"], fields.get("priority", "Low"), fields.get("due_date", ""),
+                            fields.get("category", "Personal"), fields.get("status", "Pending"))
+                manager.add_task(task)
+                return 201, task.to_dict()
+            raise HttpError(405, "Use GET or POST")
+        if parts == ["bulk"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            return 200, {"changed": self.bulk(manager, data)}
+        
+        task_id = parts[0]
+        task = manager.get_task(task_id)
+        if task is None:
+            raise HttpError(404, "No such task")
+        if len(parts) == 1:
+            if method == "GET":
+                return 200, task.to_dict()
+            if method == "PATCH":
+                fields = validate_task_fields(data, partial=True)
+                updated = Task.from_dict(dict(task.to_dict(), **fields))
+                manager.update_task_by_id(task_id, updated)
+                return 200, updated.to_dict()
+            if method == "DELETE":
+                manager.delete_task_by_id(task_id)
+                return 200, {"deleted": task_id}
+            raise HttpError(405, "Use GET, PATCH or DELETE")
+        if parts[1:] == ["complete"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            manager.mark_completed_by_id(task_id)
+            return 200, task.to_dict()
+        raise HttpError(404, "Not found")
+    
+    def query(self, manager: TaskManager, query: str) -> List[Dict]:
+        """Run GET /tasks query parameters through TaskManager.query_tasks"""
+        params = dict(parse_qsl(query))
+        for name in params:
+            if name not in QUERY_PARAMETERS:
+                raise HttpError(400, f"Unknown query parameter: {name}")
+        try:
+            limit = int(params["limit"]) if "limit" in params else None
+            offset = int(params.get("offset", "0"))
+        except ValueError:
+            raise HttpError(400, "limit and offset must be whole numbers")
+        try:
+            indexes = manager.query_tasks(
+                status=params.get("status"), priority=params.get("priority"),
+                category=params.get("category"), due_from=params.get("due_from"),
+                due_to=params.get("due_to"), order_by=params.get("order_by"),
+                descending=params.get("descending", "").lower() in ("1", "true", "yes"),
+                limit=limit, offset=offset, text=params.get("text")
+            )
+        except ValueError as error:
+            raise HttpError(400, str(error))
+        tasks = manager.tasks
+        return [tasks[index].to_dict() for index in indexes]
+    
+    def bulk(self, manager: TaskManager, data) -> int:
+        """Apply a /tasks/bulk action; returns the number of tasks changed"""
+        if not isinstance(data, dict):
+            raise HttpError(400, "Expected a JSON object")
+        ids = data.get("ids")
+        if not isinstance(ids, list) or not all(isinstance(task_id, str) for task_id in ids):
+            raise HttpError(400, "ids must be a list of task ids")
+        action = data.get("action")
+        if action == "complete":
+            return manager.complete_tasks_by_id(ids)
+        if action == "delete":
+            return manager.delete_tasks_by_id(ids)
+        if action == "update":
+            changes = validate_task_fields(data.get("changes"), partial=True)
+            if not changes:
+                raise HttpError(400, "changes must name at least one field")
+            return manager.update_tasks_by_id(ids, **changes)
+        raise HttpError(400, "action must be complete, delete or update")
+
+
+def run_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> int:
+    """Serve until interrupted; returns the exit status"""
+    async def serve():
+        task_server = TaskServer()
+        server = await task_server.start(host, port)
+        address = server.sockets[0].getsockname()
+        print(f"Serving the to-do API on http://{address[0]}:{address[1]}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await task_server.close()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    except OSError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
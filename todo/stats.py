@@ -0,0 +1,123 @@
+"""Task counts kept up to date as tasks change"""
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from todo.models import Task, parse_due_date
+
+
+# Fields counted by TaskStats, in the order of its combination keys
+COUNTED_FIELDS = ("status", "priority", "category")
+
+
+class TaskStats:
+    """Counts of tasks by status, priority and category, and of due dates
+
+    ``counts`` holds the number of tasks for every (status, priority,
+    category) combination that occurs, so any count filtered on those
+    fields is a sum over a few dozen keys however many tasks there are.
+    ``pending_due`` counts the pending tasks due on each date, and
+    ``overdue`` the pending tasks due before ``today``; it is brought up to
+    date once when the date changes. ``add`` and ``remove`` are O(1).
+    """
+    def __init__(self, tasks: Iterable[Task] = ()):
+        self.counts: Counter = Counter()
+        self.pending_due: Counter = Counter()
+        self.today = date.today().toordinal()
+        self.overdue = 0
+        for task in tasks:
+            self.add(task)
+    
+    @classmethod
+    def from_counts(cls, counts: Dict[tuple, int], pending_due: Dict[int, int]) -> 'TaskStats':
+        """Stats starting from saved ``counts`` and ``pending_due`` instead of tasks"""
+        stats = cls()
+        stats.counts.update(counts)
+        stats.pending_due.update(pending_due)
+        stats.overdue = sum(count for ordinal, count in stats.pending_due.items() if ordinal < stats.today)
+        return stats
+    
+    def add(self, task: Task):
+        """Count a task"""
+        self.counts[(task.status, task.priority, task.category)] += 1
+        if task.status != "Completed":
+            ordinal = parse_due_date(task.due_date)
+            if ordinal is not None:
+                self.pending_due[ordinal] += 1
+                if ordinal < self.today:
+                    self.overdue += 1
+    
+    def remove(self, task: Task):
+        """Stop counting a task"""
+        key = (task.status, task.priority, task.category)
+        self.counts[key] -= 1
+        if not self.counts[key]:
+            del self.counts[key]
+        if task.status != "Completed":
+            ordinal = parse_due_date(task.due_date)
+            if ordinal is not None:
+                self.pending_due[ordinal] -= 1
+                if not self.pending_due[ordinal]:
+                    del self.pending_due[ordinal]
+                if ordinal < self.today:
+                    self.overdue -= 1
+    
+    def set_today(self, today: Optional[int] = None):
+        """Move the overdue cutoff to a date ordinal (default: today)"""
+        today = date.today().toordinal() if today is None else today
+        if today != self.today:
+            self.today = today
+            self.overdue = sum(count for ordinal, count in self.pending_due.items() if ordinal < today)
+    
+    def count(self, status: Optional[str] = None, priority: Optional[str] = None,
+              category: Optional[str] = None) -> int:
+        """Number of tasks matching the given field values"""
+        wanted = (status, priority, category)
+        return sum(
+            number for key, number in self.counts.items()
+            if all(value is None or value == field for value, field in zip(wanted, key))
+        )
+    
+    def count_by(self, field: str, status: Optional[str] = None, priority: Optional[str] = None,
+                 category: Optional[str] = None) -> Dict[str, int]:
+        """Numbers of matching tasks per value of field
+
+        e.g. ``count_by("category", status="Pending", priority="High")``.
+        """
+        position = COUNTED_FIELDS.index(field)
+        wanted = (status, priority, category)
+        totals: Dict[str, int] = {}
+        for key, number in self.counts.items():
+            if all(value is None or value == part for value, part in zip(wanted, key)):
+                totals[key[position]] = totals.get(key[position], 0) + number
+        return totals
+    
+    def overdue_count(self) -> int:
+        """Pending tasks due before today"""
+        self.set_today()
+        return self.overdue
+    
+    def due_today_count(self) -> int:
+        """Pending tasks due today"""
+        self.set_today()
+        return self.pending_due.get(self.today, 0)
+    
+    def summary(self) -> Dict[str, int]:
+        """The headline counts shown in the GUI"""
+        pending = self.count(status="Pending")
+        return {
+            "total": sum(self.counts.values()),
+            "pending": pending,
+            "completed": self.count(status="Completed"),
+            "high_pending": self.count(status="Pending", priority="High"),
+            "overdue": self.overdue_count(),
+            "due_today": self.due_today_count(),
+        }
+    
+    def to_dict(self) -> Dict:
+        """summary() plus the counts per status, priority and category"""
+        result: Dict = self.summary()
+        for field in COUNTED_FIELDS:
+            result[f"by_{field}"] = self.count_by(field)
+        result["pending_by_category"] = self.count_by("category", status="Pending")
+        return result
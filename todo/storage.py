@@ -0,0 +1,1212 @@
+"""Task storage backends and the background storage writer"""
+import json
+import os
+import hashlib
+import sqlite3
+import bisect
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from todo import profiling
+from todo.binary import BinaryTaskFile, LazyTaskList, encode_binary, stored_digest
+from todo.files import DURABILITY, DURABILITY_NONE, SQLITE_SYNCHRONOUS, FileLock, atomic_write, file_signature
+from todo.formats import encode_ndjson, iter_json_array, iter_ndjson
+from todo.models import Task
+
+
+# Number of journal records tolerated before folding them into a new snapshot.
+# Compaction also waits for as many records as the snapshot holds tasks, so
+# its O(N) cost is amortised to O(1) per mutation.
+JOURNAL_COMPACT_MIN = 500
+
+# Default storage backend for TaskManager ("json", "ndjson", "binary" or "sqlite")
+STORAGE_BACKEND = os.environ.get("TODO_STORAGE", "json")
+
+# Rows kept in SQLite's change log, which is trimmed every
+# CHANGE_LOG_TRIM_EVERY changes. Processes that fall further behind than
+# that load everything again.
+CHANGE_LOG_SIZE = 10000
+CHANGE_LOG_TRIM_EVERY = 1000
+
+# Most rows fetched by one "IN (...)" query
+SQLITE_MAX_PARAMS = 500
+
+# Seconds the background writer waits for more edits before writing a burst
+WRITE_DELAY = 0.2
+
+
+class TaskStorage:
+    """Interface for task storage backends
+
+    Tasks are addressed by their position in the list returned by ``load``,
+    matching the indexes used by TaskManager. Tasks stored before tasks had
+    ids get new ids when loaded, and backends persist them right away so
+    that the ids stay the same from one load to the next. While
+    ``autoflush`` is true every write is made durable immediately; otherwise
+    writes are buffered until ``flush`` (used by StorageWorker to batch
+    bursts of edits). Backends with ``lazy`` set return from ``load`` a
+    list that decodes tasks as they are used, so loading takes about the
+    same time however many tasks there are.
+
+    Other processes may change the stored tasks too. ``changed`` cheaply
+    tells whether they did, and ``read_changes`` returns what they changed
+    as ("add", task), ("update", task) and ("delete", task_id) pairs, in
+    the order the changes were made. "update" replaces the task with the
+    same id if it still exists and "add" inserts or replaces it. The pairs
+    may repeat this process's own writes, which are harmless to apply
+    again.
+    """
+    autoflush = True
+    lazy = False
+    
+    def load(self) -> List[Task]:
+        """Load all tasks in display order"""
+        raise NotImplementedError
+    
+    def iter_load(self, save_ids: bool = True) -> Iterator[Task]:
+        """Yield all tasks in display order, reading as little as possible ahead
+
+        Leaves the backend in the same state as ``load`` once exhausted.
+        Backends that cannot stream fall back to ``load``. With save_ids
+        False the files are only read, even if tasks saved without ids
+        were given new ones (e.g. for an export).
+        """
+        yield from self.load()
+    
+    def insert(self, task: Task) -> bool:
+        """Append a task"""
+        raise NotImplementedError
+    
+    def update(self, index: int, task: Task) -> bool:
+        """Replace the task at index"""
+        raise NotImplementedError
+    
+    def insert_many(self, tasks: List[Task]) -> bool:
+        """Append several tasks"""
+        return all([self.insert(task) for task in tasks])
+    
+    def delete(self, index: int, task_id: Optional[str] = None) -> bool:
+        """Delete the task at index, whose id is task_id"""
+        raise NotImplementedError
+    
+    def update_many(self, updates: List[Tuple[int, Task]]) -> bool:
+        """Replace several tasks given as (index, task) pairs"""
+        return all([self.update(index, task) for index, task in updates])
+    
+    def delete_many(self, indexes: List[int], task_ids: Optional[List[str]] = None) -> bool:
+        """Delete the tasks at several indexes, given as positions before any deletion
+
+        task_ids, if given, are the ids of those tasks in the same order.
+        """
+        ids = dict(zip(indexes, task_ids or []))
+        return all([self.delete(index, ids.get(index)) for index in sorted(indexes, reverse=True)])
+    
+    def query(self, status: Optional[str] = None, priority: Optional[str] = None,
+              category: Optional[str] = None) -> Optional[List[int]]:
+        """Return indexes of tasks with all the given field values, in list order
+
+        The indexes are positions in the list as this backend last loaded
+        and wrote it. Backends without their own indexes return None.
+        """
+        return None
+    
+    def save_all(self, tasks: List[Task]) -> bool:
+        """Replace the stored tasks with the given list"""
+        raise NotImplementedError
+    
+    def compact(self, tasks: List[Task]) -> bool:
+        """Rewrite everything from tasks, which reflects every write so far
+
+        Unlike save_all this keeps changes other processes saved in the
+        meantime, where the backend can tell what they are.
+        """
+        return self.save_all(tasks)
+    
+    def changed(self) -> bool:
+        """Whether another process changed the stored tasks since this one last read them"""
+        return False
+    
+    def read_changes(self) -> Optional[List[Tuple[str, object]]]:
+        """Changes made by other processes since the last load or read_changes
+
+        Returns None when the backend cannot tell, in which case the tasks
+        have to be loaded again.
+        """
+        return None
+    
+    def needs_compaction(self, unsaved: int, count: int) -> bool:
+        """Whether TaskManager should rewrite everything with save_all"""
+        return False
+    
+    def flush(self) -> bool:
+        """Make buffered writes durable"""
+        return True
+    
+    def close(self):
+        """Release any open files or connections"""
+
+
+class JsonTaskStorage(TaskStorage):
+    """JSON snapshot plus append-only journal
+
+    Tasks are persisted as a JSON snapshot (``<user>_tasks.json``) plus an
+    append-only journal (``<user>_tasks.journal``). Each mutation appends one
+    record to the journal, ``load`` replays the journal on top of the
+    snapshot and ``save_all`` folds it back into a fresh snapshot. With the
+    journal disabled every change rewrites the snapshot.
+
+    Several processes can use the same files. Reads and writes hold an
+    advisory lock on ``<user>_tasks.lock``, and journal records name their
+    tasks by id, so records appended by different processes combine task
+    by task when replayed. Each process remembers the size, identity and
+    modification time of both files, which is enough to tell whether
+    anyone else wrote to them and which journal records are new.
+    """
+    def __init__(self, filename: str, journal: bool = True, durability: Optional[str] = None):
+        self.filename = filename
+        self.journal_filename = os.path.splitext(filename)[0] + ".journal"
+        self.journal_enabled = journal
+        self.durability = durability or DURABILITY
+        self.journal_entries = 0
+        self.snapshot_count = 0
+        self._journal = None
+        self._journal_stale = True
+        self._pending: List[bytes] = []
+        self._snapshot_digest = hashlib.sha256(b"").hexdigest()
+        self._ids_assigned = False
+        self._lock = FileLock(os.path.splitext(filename)[0] + ".lock")
+        # File signatures after this process last read or wrote the files,
+        # and how much of the journal the caller's task list reflects
+        self._known: Optional[Tuple] = None
+        self._journal_offset = 0
+        self._reload_needed = False
+    
+    def _task_from_dict(self, data: Dict) -> Task:
+        """Build a task, noting records saved before tasks had ids"""
+        if not data.get("id"):
+            self._ids_assigned = True
+        return Task.from_dict(data)
+    
+    def _decode_snapshot(self, raw: bytes) -> List[Task]:
+        """Parse a whole snapshot file"""
+        return [self._task_from_dict(task_data) for task_data in json.loads(raw.decode('utf-8'))]
+    
+    def _encode_snapshot(self, data: List[Dict]) -> bytes:
+        """Serialize task dictionaries to snapshot file contents"""
+        return json.dumps(data, indent=2).encode('utf-8')
+    
+    def _iter_snapshot(self, f, digest) -> Iterator[Dict]:
+        """Stream task dictionaries from an open snapshot file"""
+        return iter_json_array(f, digest)
+    
+    def _digest(self, raw: bytes) -> str:
+        """Digest of snapshot file contents, which ties the journal to the snapshot"""
+        return hashlib.sha256(raw).hexdigest()
+    
+    def _signature(self) -> Tuple:
+        """Signatures of the snapshot and journal files"""
+        return file_signature(self.filename), file_signature(self.journal_filename)
+    
+    def _synced(self):
+        """Note that the caller's task list now matches the files"""
+        self._known = self._signature()
+        self._journal_offset = self._known[1][1] if self._known[1] is not None else 0
+        self._reload_needed = False
+    
+    def load(self, save_ids: bool = True) -> List[Task]:
+        """Load tasks from the JSON snapshot and replay the journal
+
+        Tasks saved before tasks had ids get new ones, which are written
+        back unless save_ids is False. A malformed snapshot raises
+        ValueError rather than loading as an empty list, which the next
+        save would write over the file.
+        """
+        with self._lock:
+            tasks = self._read_tasks()
+            if self._ids_assigned and save_ids:
+                # Persist the new ids
+                self.save_all(tasks)
+            self._synced()
+        return tasks
+    
+    def _read_tasks(self) -> List[Task]:
+        """Read the snapshot and replay the journal; the caller holds the lock"""
+        self.close()
+        self._ids_assigned = False
+        raw = b""
+        tasks = []
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'rb') as f:
+                    raw = f.read()
+            except IOError:
+                raw = b""
+            if raw.strip():
+                try:
+                    tasks = self._decode_snapshot(raw)
+                except ValueError as error:
+                    raise ValueError(f"{self.filename} is damaged: {error}") from error
+        self._snapshot_digest = self._digest(raw)
+        self.snapshot_count = len(tasks)
+        self.journal_entries = 0
+        self._journal_stale = True
+        if self.journal_enabled:
+            journal = self._read_journal()
+            if journal is not None and journal[0] == self._snapshot_digest:
+                tasks = self._replay(tasks, journal[1])
+                self.journal_entries = sum(self._record_size(record) for record in journal[1])
+                self._journal_stale = False
+        return tasks
+    
+    def iter_load(self, save_ids: bool = True) -> Iterator[Task]:
+        """Stream the snapshot, then the tasks added by the journal
+
+        Journals that update or delete tasks need the whole list in memory
+        to be replayed, so in that case this falls back to ``load``. Tasks
+        saved without ids, wherever they are in the file, get new ones
+        that are written back with the rest of the list once it has been
+        streamed, as ``load`` does. A malformed snapshot raises ValueError
+        where it stops parsing, so callers must not use the tasks already
+        yielded. The file lock is held until the last task is yielded.
+        """
+        with self._lock:
+            journal = self._read_journal() if self.journal_enabled else None
+            if journal is not None and any(
+                record.get("op") != "add" or not record["task"].get("id") for record in journal[1]
+            ):
+                yield from self.load(save_ids)
+                return
+            self.close()
+            self._ids_assigned = False
+            # Kept in case new ids have to be saved
+            tasks = []
+            digest = hashlib.sha256()
+            if os.path.exists(self.filename):
+                try:
+                    with open(self.filename, 'rb') as f:
+                        try:
+                            for task_data in self._iter_snapshot(f, digest):
+                                task = self._task_from_dict(task_data)
+                                tasks.append(task)
+                                yield task
+                        except ValueError as error:
+                            raise ValueError(f"{self.filename} is damaged: {error}") from error
+                except IOError:
+                    pass
+            self._snapshot_digest = digest.hexdigest()
+            self.snapshot_count = len(tasks)
+            self.journal_entries = 0
+            self._journal_stale = True
+            if journal is not None and journal[0] == self._snapshot_digest:
+                for record in journal[1]:
+                    task = self._task_from_dict(record["task"])
+                    tasks.append(task)
+                    yield task
+                self.journal_entries = len(journal[1])
+                self._journal_stale = False
+            if self._ids_assigned and save_ids:
+                # Persist the new ids
+                self.save_all(tasks)
+            self._synced()
+    
+    def _read_journal(self) -> Optional[Tuple[str, List[Dict]]]:
+        """Read the journal's snapshot digest and its complete records
+
+        Returns None if there is no readable journal. Records only apply if
+        the digest matches the current snapshot; otherwise the snapshot was
+        rewritten after the journal was started (e.g. a crash during
+        compaction), so every record is already part of it.
+        """
+        if not os.path.exists(self.journal_filename):
+            return None
+        records = []
+        try:
+            with open(self.journal_filename, 'rb+') as f:
+                try:
+                    header = json.loads(f.readline().decode('utf-8'))
+                except ValueError:
+                    return None
+                valid_end = f.tell()
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete record")
+                        record = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        # Torn write from a crash: drop it so that later
+                        # appends start on a clean line.
+                        f.truncate(valid_end)
+                        break
+                    records.append(record)
+                    valid_end += len(line)
+        except IOError:
+            return None
+        return header.get("snapshot"), records
+    
+    def _replay(self, tasks: List[Task], records: List[Dict]) -> List[Task]:
+        """Apply journal records to the snapshot's tasks
+
+        Records are applied by task id, so that records appended by several
+        processes combine: an update of a task another process deleted is
+        dropped. Journals written before every record carried ids are
+        replayed by index.
+        """
+        changes = [self._record_changes(record) for record in records]
+        if any(change is None for change in changes):
+            for record in records:
+                self._apply_record(tasks, record)
+            return tasks
+        by_id = {task.id: task for task in tasks}
+        for record_changes in changes:
+            for kind, value in record_changes:
+                if kind == "delete":
+                    by_id.pop(value, None)
+                elif kind == "add" or value.id in by_id:
+                    by_id[value.id] = value
+        return list(by_id.values())
+    
+    def _record_changes(self, record: Dict) -> Optional[List[Tuple[str, object]]]:
+        """Translate a journal record into read_changes changes
+
+        Returns None for records that do not name their tasks by id.
+        """
+        op = record.get("op")
+        if op in ("add", "update") and record["task"].get("id"):
+            return [(op, self._task_from_dict(record["task"]))]
+        if op == "add_many" and all(task_data.get("id") for task_data in record.get("tasks", [])):
+            return [("add", self._task_from_dict(task_data)) for task_data in record.get("tasks", [])]
+        if op == "update_many" and all(task_data.get("id") for _, task_data in record.get("updates", [])):
+            return [("update", self._task_from_dict(task_data)) for _, task_data in record.get("updates", [])]
+        if op == "delete" and record.get("id"):
+            return [("delete", record["id"])]
+        if op == "delete_many" and "ids" in record:
+            return [("delete", task_id) for task_id in record["ids"]]
+        return None
+    
+    def _apply_record(self, tasks: List[Task], record: Dict):
+        """Apply a single journal record to a task list by index"""
+        op = record.get("op")
+        index = record.get("index", -1)
+        if op == "add":
+            tasks.append(self._task_from_dict(record["task"]))
+        elif op == "add_many":
+            tasks.extend(self._task_from_dict(task_data) for task_data in record.get("tasks", []))
+        elif op == "update" and 0 <= index < len(tasks):
+            tasks[index] = self._task_from_dict(record["task"])
+        elif op == "delete" and 0 <= index < len(tasks):
+            tasks.pop(index)
+        elif op == "complete" and 0 <= index < len(tasks):
+            tasks[index].status = "Completed"
+        elif op == "update_many":
+            for index, task_data in record.get("updates", []):
+                if 0 <= index < len(tasks):
+                    tasks[index] = self._task_from_dict(task_data)
+        elif op == "delete_many":
+            for index in sorted(record.get("indexes", []), reverse=True):
+                if 0 <= index < len(tasks):
+                    tasks.pop(index)
+    
+    def _record_size(self, record: Dict) -> int:
+        """Number of task changes in a journal record"""
+        if record.get("op") == "update_many":
+            return len(record.get("updates", []))
+        if record.get("op") == "add_many":
+            return len(record.get("tasks", []))
+        if record.get("op") == "delete_many":
+            return len(record.get("indexes", []))
+        return 1
+    
+    def _append_journal(self, record: Dict) -> bool:
+        """Append one mutation record to the journal"""
+        if not self.journal_enabled:
+            # TaskManager rewrites the snapshot instead (see needs_compaction)
+            return True
+        self._pending.append((json.dumps(record, separators=(",", ":")) + "\n").encode('utf-8'))
+        self.journal_entries += self._record_size(record)
+        if self.autoflush:
+            return self._write_pending()
+        return True
+    
+    def _write_pending(self) -> bool:
+        """Append the buffered records to the journal under the file lock
+
+        If another process wrote to the files since this one last did, the
+        records go after its records, or into its new journal if it
+        rewrote the snapshot; ``changed`` then reports its changes.
+        """
+        try:
+            with self._lock:
+                if self._signature() != self._known:
+                    self._adopt_files()
+                if self._journal is None:
+                    self._open_journal()
+                size = os.fstat(self._journal.fileno()).st_size
+                caught_up = not self._reload_needed and self._journal_offset == size
+                self._journal.write(b"".join(self._pending))
+                self._pending = []
+                self._sync_journal()
+                self._known = self._signature()
+                if caught_up and self._known[1] is not None:
+                    self._journal_offset = self._known[1][1]
+        except (IOError, OSError):
+            return False
+        return True
+    
+    def _adopt_files(self):
+        """Continue from files changed by another process; the caller holds the lock
+
+        Records it appended to the journal are picked up by read_changes.
+        If it replaced the files, new records are bound to its snapshot and
+        the caller has to load everything again.
+        """
+        current = self._signature()
+        known = self._known or (None, None)
+        if (current[0] == known[0] and current[1] is not None and known[1] is not None
+                and current[1][0] == known[1][0] and current[1][1] >= known[1][1]):
+            # Only records appended to the same journal
+            return
+        self._reload_needed = True
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if current[0] != known[0]:
+            try:
+                with open(self.filename, 'rb') as f:
+                    self._snapshot_digest = self._digest(f.read())
+            except IOError:
+                self._snapshot_digest = self._digest(b"")
+        try:
+            with open(self.journal_filename, 'rb') as f:
+                header = json.loads(f.readline().decode('utf-8'))
+            self._journal_stale = header.get("snapshot") != self._snapshot_digest
+        except (IOError, ValueError):
+            self._journal_stale = True
+    
+    def _open_journal(self):
+        """Open the journal for appending, starting a new one if needed"""
+        if self._journal_stale:
+            self._reset_journal()
+        self._journal = open(self.journal_filename, 'ab')
+    
+    def _reset_journal(self):
+        """Replace the journal with an empty one bound to the current snapshot"""
+        header = (json.dumps({"snapshot": self._snapshot_digest}) + "\n").encode('utf-8')
+        atomic_write(self.journal_filename, header, self.durability)
+        self.journal_entries = 0
+        self._journal_offset = len(header)
+        self._journal_stale = False
+    
+    def insert(self, task: Task) -> bool:
+        """Journal an appended task"""
+        return self._append_journal({"op": "add", "task": task.to_dict()})
+    
+    def insert_many(self, tasks: List[Task]) -> bool:
+        """Journal several appended tasks as one record"""
+        return self._append_journal({"op": "add_many", "tasks": [task.to_dict() for task in tasks]})
+    
+    def update(self, index: int, task: Task) -> bool:
+        """Journal a replaced task"""
+        return self._append_journal({"op": "update", "index": index, "task": task.to_dict()})
+    
+    def delete(self, index: int, task_id: Optional[str] = None) -> bool:
+        """Journal a deleted task"""
+        record = {"op": "delete", "index": index}
+        if task_id is not None:
+            record["id"] = task_id
+        return self._append_journal(record)
+    
+    def update_many(self, updates: List[Tuple[int, Task]]) -> bool:
+        """Journal several replaced tasks as one record"""
+        return self._append_journal(
+            {"op": "update_many", "updates": [[index, task.to_dict()] for index, task in updates]}
+        )
+    
+    def delete_many(self, indexes: List[int], task_ids: Optional[List[str]] = None) -> bool:
+        """Journal several deleted tasks as one record"""
+        record = {"op": "delete_many", "indexes": list(indexes)}
+        if task_ids is not None:
+            record["ids"] = list(task_ids)
+        return self._append_journal(record)
+    
+    def needs_compaction(self, unsaved: int, count: int) -> bool:
+        """Compact once the journal has as many records as the snapshot has tasks"""
+        if not self.journal_enabled:
+            return unsaved > 0
+        return unsaved >= max(JOURNAL_COMPACT_MIN, self.snapshot_count)
+    
+    def save_all(self, tasks: List[Task]) -> bool:
+        """Write a fresh snapshot of the given tasks and empty the journal"""
+        try:
+            data = [task.to_dict() for task in tasks]
+            raw = self._encode_snapshot(data)
+            with self._lock:
+                # Buffered records are part of tasks already
+                self._pending = []
+                self.close()
+                atomic_write(self.filename, raw, self.durability)
+                self._snapshot_digest = self._digest(raw)
+                self.snapshot_count = len(data)
+                self._journal_stale = True
+                if self.journal_enabled:
+                    self._reset_journal()
+                self._synced()
+            return True
+        except (IOError, OSError):
+            return False
+    
+    def compact(self, tasks: List[Task]) -> bool:
+        """Fold the journal into a new snapshot without losing other processes' changes
+
+        If nobody else wrote to the files since this process last read
+        them, tasks holds every change and is written out. Otherwise the
+        snapshot is rebuilt from the files themselves, which also hold
+        this process's records, and ``changed`` reports a reload.
+        """
+        if not self.journal_enabled:
+            # Nothing to merge from: the last writer wins
+            return self.save_all(tasks)
+        with self._lock:
+            if not self.changed():
+                return self.save_all(tasks)
+            if self._pending and not self._write_pending():
+                return False
+            saved = self.save_all(self._read_tasks())
+            self._reload_needed = True
+            return saved
+    
+    def changed(self) -> bool:
+        """Whether the files hold changes the caller's task list lacks
+
+        Costs two stat calls.
+        """
+        if self._reload_needed:
+            return True
+        signature = self._signature()
+        if signature != self._known:
+            return True
+        return signature[1] is not None and signature[1][1] != self._journal_offset
+    
+    def read_changes(self) -> Optional[List[Tuple[str, object]]]:
+        """Changes in the journal records the caller's task list lacks
+
+        Returns None, so the tasks are loaded again, if another process
+        rewrote the snapshot or the journal holds records without ids.
+        """
+        with self._lock:
+            if self._pending and not self._write_pending():
+                return None
+            signature = self._signature()
+            known = self._known or (None, None)
+            if (self._reload_needed or not self.journal_enabled or signature[0] != known[0]
+                    or signature[1] is None or known[1] is None or signature[1][0] != known[1][0]):
+                return None
+            tail = self._read_journal_tail()
+            if tail is None:
+                return None
+            records, end = tail
+            changes = []
+            for record in records:
+                record_changes = self._record_changes(record)
+                if record_changes is None:
+                    return None
+                changes.extend(record_changes)
+            self._journal_offset = end
+            self._known = signature
+            return changes
+    
+    def _read_journal_tail(self) -> Optional[Tuple[List[Dict], int]]:
+        """Complete records after _journal_offset and the offset after them
+
+        Returns None if the journal no longer belongs to the snapshot.
+        """
+        records = []
+        end = self._journal_offset
+        try:
+            with open(self.journal_filename, 'rb') as f:
+                try:
+                    header = json.loads(f.readline().decode('utf-8'))
+                except ValueError:
+                    return None
+                if header.get("snapshot") != self._snapshot_digest:
+                    return None
+                f.seek(end)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        records.append(json.loads(line.decode('utf-8')))
+                    except ValueError:
+                        break
+                    end += len(line)
+        except IOError:
+            return None
+        return records, end
+    
+    def flush(self) -> bool:
+        """Write buffered journal records to the file"""
+        if self._pending:
+            return self._write_pending()
+        return True
+    
+    def _sync_journal(self):
+        """Push journal writes to the OS, and to disk unless durability is none"""
+        self._journal.flush()
+        if self.durability != DURABILITY_NONE:
+            os.fsync(self._journal.fileno())
+    
+    def close(self):
+        """Write buffered records and close the journal and lock files"""
+        if self._pending:
+            self._write_pending()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._lock.close()
+
+
+class NdjsonTaskStorage(JsonTaskStorage):
+    """Like JsonTaskStorage, but the snapshot holds one task per line
+
+    Line-delimited snapshots (``<user>_tasks.ndjson``) can be parsed one
+    task at a time, so ``iter_load`` never holds more than one line of the
+    file in memory. Uses the same journal format.
+    """
+    def _decode_snapshot(self, raw: bytes) -> List[Task]:
+        """Parse every non-blank line of the snapshot"""
+        return [self._task_from_dict(json.loads(line)) for line in raw.decode('utf-8').splitlines() if line.strip()]
+    
+    def _encode_snapshot(self, data: List[Dict]) -> bytes:
+        """Write one compact JSON object per line"""
+        return b"".join(encode_ndjson(data))
+    
+    def _iter_snapshot(self, f, digest) -> Iterator[Dict]:
+        """Stream the snapshot line by line"""
+        return iter_ndjson(f, digest)
+
+
+class BinaryTaskStorage(JsonTaskStorage):
+    """Like JsonTaskStorage, but the snapshot is a binary task file
+
+    ``load`` maps ``<user>_tasks.tdb`` (see todo.binary) and returns a
+    LazyTaskList without decoding any task, applying the journal through
+    the file's id directory, so it takes about the same time however many
+    tasks there are. Snapshots with tasks whose ids are not 32 hex digits,
+    and journals written before records carried ids, are decoded in full
+    as JsonTaskStorage does. The journal digest is the one stored in the
+    file's header, so it is not computed over the file on load.
+    """
+    lazy = True
+    
+    def _decode_snapshot(self, raw: bytes) -> List[Task]:
+        """Decode every task of the snapshot"""
+        snapshot = BinaryTaskFile(raw)
+        if snapshot.regular_ids:
+            return list(snapshot.iter_tasks())
+        return [self._task_from_dict(record) for record in snapshot.iter_records()]
+    
+    def _encode_snapshot(self, data: List[Dict]) -> bytes:
+        """Encode task dictionaries as a binary task file"""
+        return encode_binary(data)
+    
+    def _digest(self, raw: bytes) -> str:
+        """The digest in the header, or that of the whole file if it has none"""
+        return stored_digest(raw) or super()._digest(raw)
+    
+    def load(self, save_ids: bool = True) -> List[Task]:
+        """Map the snapshot and apply the journal without decoding the tasks"""
+        with self._lock:
+            self.close()
+            try:
+                snapshot = BinaryTaskFile.open(self.filename)
+            except (ValueError, OSError):
+                # Missing or damaged: the full load treats it as empty or raises
+                return super().load(save_ids)
+            journal = self._read_journal() if self.journal_enabled else None
+            current = journal is not None and journal[0] == snapshot.digest
+            changes = [self._record_changes(record) for record in journal[1]] if current else []
+            if not snapshot.regular_ids or any(record_changes is None for record_changes in changes):
+                snapshot.close()
+                return super().load(save_ids)
+            self._ids_assigned = False
+            self._snapshot_digest = snapshot.digest
+            self.snapshot_count = len(snapshot)
+            self.journal_entries = sum(self._record_size(record) for record in journal[1]) if current else 0
+            self._journal_stale = not current
+            tasks = self._replay_lazily(snapshot, [change for record_changes in changes for change in record_changes])
+            self._synced()
+        return tasks
+    
+    def _replay_lazily(self, snapshot: BinaryTaskFile, changes: List[Tuple[str, object]]) -> LazyTaskList:
+        """Apply read_changes pairs to the mapped snapshot as _replay applies them to a list"""
+        replaced: Dict[int, Task] = {}
+        deleted = set()
+        tail: Dict[str, Task] = {}
+        for kind, value in changes:
+            task_id = value if kind == "delete" else value.id
+            if task_id in tail:
+                if kind == "delete":
+                    del tail[task_id]
+                else:
+                    tail[task_id] = value
+                continue
+            row = snapshot.row_of_id(task_id)
+            if row is None or row in deleted:
+                if kind == "add":
+                    tail[task_id] = value
+            elif kind == "delete":
+                deleted.add(row)
+                replaced.pop(row, None)
+            else:
+                replaced[row] = value
+        return LazyTaskList(snapshot, replaced, deleted, tail.values())
+    
+    def iter_load(self, save_ids: bool = True) -> Iterator[Task]:
+        """Yield the tasks of load, which has nothing to gain from streaming"""
+        yield from self.load(save_ids)
+
+
+class SqliteTaskStorage(TaskStorage):
+    """SQLite-backed storage shared by all users in one database file
+
+    Each mutation is a single-row statement and filters are answered by
+    indexed queries. Task ids are kept in the ``uid`` column, and updates
+    and deletes find their rows by it, so they stay correct while the
+    caller's positions lag behind changes read from other processes (see
+    TaskManager.refresh_async). Row ids only ever grow, so the ids of a
+    user's tasks in list order are sorted and positions are found by
+    binary search.
+
+    Triggers record the row id of every inserted, updated and deleted row
+    in ``task_changes``, whichever process made the change, so
+    ``read_changes`` re-reads only the rows that changed. ``changed`` uses
+    ``PRAGMA data_version``, which only moves when another connection
+    commits.
+    """
+    def __init__(self, username: str, filename: str = "tasks.db", durability: Optional[str] = None):
+        self.username = username
+        self.filename = filename
+        # Writes may come from the StorageWorker thread
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS[durability or DURABILITY]}")
+        self._ids: List[int] = []
+        self._data_version = None
+        self._last_change = 0
+        self.create_schema()
+    
+    def create_schema(self):
+        """Create the tasks table and its indexes if missing"""
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "username TEXT NOT NULL, "
+                "name TEXT NOT NULL, "
+                "priority TEXT NOT NULL, "
+                "due_date TEXT NOT NULL, "
+                "category TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "uid TEXT, "
+                "completed_at TEXT NOT NULL DEFAULT '')"
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")]
+            if "uid" not in columns:
+                # Databases created before tasks had ids
+                self.conn.execute("ALTER TABLE tasks ADD COLUMN uid TEXT")
+            if "completed_at" not in columns:
+                self.conn.execute("ALTER TABLE tasks ADD COLUMN completed_at TEXT NOT NULL DEFAULT ''")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_uid ON tasks(uid)")
+            self.conn.execute("UPDATE tasks SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL")
+            # task_id NULL marks a save_all that replaced all of a user's tasks
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_changes ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "username TEXT NOT NULL, "
+                "task_id INTEGER, "
+                "uid TEXT)"
+            )
+            for event, row in (("insert", "NEW"), ("update", "NEW"), ("delete", "OLD")):
+                self.conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS tasks_{event}_log AFTER {event.upper()} ON tasks BEGIN "
+                    f"INSERT INTO task_changes (username, task_id, uid) VALUES ({row}.username, {row}.id, {row}.uid); "
+                    "END"
+                )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS task_changes_trim AFTER INSERT ON task_changes "
+                f"WHEN NEW.seq % {CHANGE_LOG_TRIM_EVERY} = 0 BEGIN "
+                f"DELETE FROM task_changes WHERE seq <= NEW.seq - {CHANGE_LOG_SIZE}; "
+                "END"
+            )
+            for column in ("status", "priority", "category", "due_date"):
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_tasks_{column} ON tasks(username, {column})"
+                )
+    
+    def _execute(self, sql: str, params=(), many: bool = False):
+        """Run one write statement, committing unless writes are batched
+
+        With ``many`` the statement is run for each parameter tuple in
+        params, all in the same transaction.
+        """
+        try:
+            if many:
+                cursor = self.conn.executemany(sql, params)
+            else:
+                cursor = self.conn.execute(sql, params)
+            if self.autoflush:
+                self.conn.commit()
+            return cursor
+        except sqlite3.Error:
+            self.conn.rollback()
+            return None
+    
+    def _mark_read(self):
+        """Remember the data version and change log position before reading tasks"""
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self._last_change = self.conn.execute("SELECT coalesce(max(seq), 0) FROM task_changes").fetchone()[0]
+    
+    def load(self) -> List[Task]:
+        """Load the user's tasks in insertion order"""
+        self._mark_read()
+        rows = self.conn.execute(
+            "SELECT id, name, priority, due_date, category, status, uid, completed_at FROM tasks "
+            "WHERE username = ? ORDER BY id",
+            (self.username,)
+        ).fetchall()
+        self._ids = [row[0] for row in rows]
+        return [Task(*row[1:]) for row in rows]
+    
+    def iter_load(self, save_ids: bool = True) -> Iterator[Task]:
+        """Yield the user's tasks as rows are fetched"""
+        self._mark_read()
+        self._ids = []
+        cursor = self.conn.execute(
+            "SELECT id, name, priority, due_date, category, status, uid, completed_at FROM tasks "
+            "WHERE username = ? ORDER BY id",
+            (self.username,)
+        )
+        for row in cursor:
+            self._ids.append(row[0])
+            yield Task(*row[1:])
+    
+    def insert(self, task: Task) -> bool:
+        """Insert one row for the task"""
+        cursor = self._execute(
+            "INSERT INTO tasks (username, name, priority, due_date, category, status, uid, completed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.username, task.name, task.priority, task.due_date, task.category, task.status, task.id,
+             task.completed_at)
+        )
+        if cursor is None:
+            return False
+        self._ids.append(cursor.lastrowid)
+        return True
+    
+    def insert_many(self, tasks: List[Task]) -> bool:
+        """Insert rows for several tasks in one transaction"""
+        try:
+            row_ids = [
+                self.conn.execute(
+                    "INSERT INTO tasks (username, name, priority, due_date, category, status, uid, completed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.username, task.name, task.priority, task.due_date, task.category, task.status,
+                     task.id, task.completed_at)
+                ).lastrowid
+                for task in tasks
+            ]
+            if self.autoflush:
+                self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            return False
+        self._ids.extend(row_ids)
+        return True
+    
+    def _row_ids(self, indexes: List[int], task_ids: Optional[List[str]] = None) -> List[int]:
+        """Row ids of the tasks at indexes, looked up by task id when given
+
+        Tasks another process already deleted have none.
+        """
+        if task_ids is None:
+            return [self._ids[index] for index in indexes]
+        row_ids = []
+        for start in range(0, len(task_ids), SQLITE_MAX_PARAMS):
+            batch = task_ids[start:start + SQLITE_MAX_PARAMS]
+            row_ids.extend(row[0] for row in self.conn.execute(
+                f"SELECT id FROM tasks WHERE username = ? AND uid IN ({', '.join('?' * len(batch))})",
+                [self.username, *batch]
+            ))
+        return row_ids
+    
+    def _forget(self, row_ids: List[int]):
+        """Drop deleted rows from the list positions"""
+        doomed = set(row_ids)
+        if len(doomed) == 1:
+            row_id = doomed.pop()
+            position = bisect.bisect_left(self._ids, row_id)
+            if position < len(self._ids) and self._ids[position] == row_id:
+                self._ids.pop(position)
+        elif doomed:
+            self._ids = [row_id for row_id in self._ids if row_id not in doomed]
+    
+    def update(self, index: int, task: Task) -> bool:
+        """Update the task's row"""
+        return self.update_many([(index, task)])
+    
+    def delete(self, index: int, task_id: Optional[str] = None) -> bool:
+        """Delete the task's row"""
+        return self.delete_many([index], None if task_id is None else [task_id])
+    
+    def update_many(self, updates: List[Tuple[int, Task]]) -> bool:
+        """Update several rows in one transaction"""
+        cursor = self._execute(
+            "UPDATE tasks SET name = ?, priority = ?, due_date = ?, category = ?, status = ?, "
+            "completed_at = ? "
+            "WHERE username = ? AND uid = ?",
+            [(task.name, task.priority, task.due_date, task.category, task.status, task.completed_at,
+              self.username, task.id)
+             for index, task in updates],
+            many=True
+        )
+        return cursor is not None
+    
+    def delete_many(self, indexes: List[int], task_ids: Optional[List[str]] = None) -> bool:
+        """Delete several rows in one transaction"""
+        row_ids = self._row_ids(indexes, task_ids)
+        cursor = self._execute("DELETE FROM tasks WHERE id = ?", [(row_id,) for row_id in row_ids], many=True)
+        if cursor is None:
+            return False
+        self._forget(row_ids)
+        return True
+    
+    def query(self, status: Optional[str] = None, priority: Optional[str] = None,
+              category: Optional[str] = None) -> List[int]:
+        """Run an indexed query and map matching rows to list positions
+
+        Rows another process inserted since the last load or read_changes
+        are left out.
+        """
+        clauses = ["username = ?"]
+        params = [self.username]
+        for column, value in (("status", status), ("priority", priority), ("category", category)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        positions = []
+        for (row_id,) in self.conn.execute(
+            f"SELECT id FROM tasks WHERE {' AND '.join(clauses)} ORDER BY id", params
+        ):
+            position = bisect.bisect_left(self._ids, row_id)
+            if position < len(self._ids) and self._ids[position] == row_id:
+                positions.append(position)
+        return positions
+    
+    def save_all(self, tasks: List[Task]) -> bool:
+        """Replace all of the user's rows in one transaction"""
+        try:
+            with self.conn:
+                self.conn.execute("DELETE FROM tasks WHERE username = ?", (self.username,))
+                self.conn.executemany(
+                    "INSERT INTO tasks (username, name, priority, due_date, category, status, uid, completed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(self.username, task.name, task.priority, task.due_date, task.category, task.status,
+                      task.id, task.completed_at) for task in tasks]
+                )
+                # One marker instead of a change per row
+                self.conn.execute("DELETE FROM task_changes WHERE username = ?", (self.username,))
+                self.conn.execute("INSERT INTO task_changes (username) VALUES (?)", (self.username,))
+        except sqlite3.Error:
+            return False
+        self._mark_read()
+        self._ids = [row[0] for row in self.conn.execute(
+            "SELECT id FROM tasks WHERE username = ? ORDER BY id", (self.username,)
+        )]
+        return True
+    
+    def changed(self) -> bool:
+        """Whether another connection committed since the last load or read_changes"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version
+    
+    def read_changes(self) -> Optional[List[Tuple[str, object]]]:
+        """Re-read the rows the change log lists since the last load or read_changes
+
+        Returns None, so the tasks are loaded again, if the log was trimmed
+        past that point, all of the user's tasks were replaced, or another
+        process inserted tasks before ones inserted here.
+        """
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        first = self.conn.execute("SELECT min(seq) FROM task_changes").fetchone()[0]
+        if first is not None and first > self._last_change + 1:
+            return None
+        # Row id -> task id of the latest change to each of the user's rows
+        latest: Dict[int, str] = {}
+        for seq, username, row_id, uid in self.conn.execute(
+            "SELECT seq, username, task_id, uid FROM task_changes WHERE seq > ? ORDER BY seq",
+            (self._last_change,)
+        ):
+            self._last_change = seq
+            if username == self.username:
+                if row_id is None:
+                    return None
+                latest[row_id] = uid
+        row_ids = sorted(latest)
+        rows = {}
+        for start in range(0, len(row_ids), SQLITE_MAX_PARAMS):
+            batch = row_ids[start:start + SQLITE_MAX_PARAMS]
+            for row in self.conn.execute(
+                "SELECT id, name, priority, due_date, category, status, uid, completed_at FROM tasks "
+                f"WHERE id IN ({', '.join('?' * len(batch))})",
+                batch
+            ):
+                rows[row[0]] = row
+        changes = []
+        for row_id in row_ids:
+            position = bisect.bisect_left(self._ids, row_id)
+            present = position < len(self._ids) and self._ids[position] == row_id
+            row = rows.get(row_id)
+            if row is None:
+                if present:
+                    self._ids.pop(position)
+                    changes.append(("delete", latest[row_id]))
+            elif present:
+                changes.append(("update", Task(*row[1:])))
+            elif position == len(self._ids):
+                self._ids.append(row_id)
+                changes.append(("add", Task(*row[1:])))
+            else:
+                return None
+        return changes
+    
+    def flush(self) -> bool:
+        """Commit batched writes"""
+        try:
+            self.conn.commit()
+        except sqlite3.Error:
+            return False
+        return True
+    
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+def create_storage(username: str, backend: Optional[str] = None) -> TaskStorage:
+    """Create the storage backend for a user"""
+    backend = backend or STORAGE_BACKEND
+    if backend == "sqlite":
+        return SqliteTaskStorage(username)
+    if backend == "json":
+        return JsonTaskStorage(f"{username}_tasks.json")
+    if backend == "ndjson":
+        return NdjsonTaskStorage(f"{username}_tasks.ndjson")
+    if backend == "binary":
+        return BinaryTaskStorage(f"{username}_tasks.tdb")
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+class StorageWorker:
+    """Runs storage calls on a background thread
+
+    Calls are executed in submission order. After the first call of a burst
+    the thread waits ``delay`` seconds for more, runs them all and flushes
+    the storage once, so a burst of edits costs a single write to disk.
+    Writes queued before a compaction still run: when other processes
+    changed the files, ``compact`` rebuilds them from the files and relies
+    on this process's records being there.
+
+    A call that raises or returns False is logged and counted in
+    ``failures``, and its message is kept in ``last_error``; ``flush`` and
+    ``stop`` return False if a call failed since the previous one.
+    """
+    def __init__(self, storage: TaskStorage, delay: float = WRITE_DELAY):
+        self.storage = storage
+        self.storage.autoflush = False
+        self.delay = delay
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        # Failures not yet reported to a flush or stop
+        self._unreported = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="task-storage", daemon=True)
+        self.thread.start()
+    
+    def submit(self, method, *args):
+        """Queue a call to run on the worker thread"""
+        self.queue.put((method, args))
+    
+    def idle(self) -> bool:
+        """Whether every submitted call has run"""
+        return self.queue.unfinished_tasks == 0
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued call has run and been flushed
+
+        Returns False on timeout or if a call failed since the last flush.
+        """
+        done = threading.Event()
+        self.queue.put((None, (done, False)))
+        return done.wait(timeout) and not done.failed
+    
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Flush outstanding writes and stop the thread; False as for flush"""
+        done = threading.Event()
+        self.queue.put((None, (done, True)))
+        finished = done.wait(timeout) and not done.failed
+        self.thread.join(timeout)
+        return finished
+    
+    def _failed(self, message: str):
+        """Record a failed call"""
+        self.failures += 1
+        self._unreported += 1
+        self.last_error = message
+    
+    def _run(self):
+        """Worker loop: collect a burst of calls, run them, flush once"""
+        # Imported here: the command line writes without a worker and
+        # should not pay for it at startup
+        import logging
+        logger = logging.getLogger(__name__)
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.delay
+            while batch[-1][0] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            waiters = []
+            started = time.perf_counter_ns()
+            for method, args in batch:
+                if method is None:
+                    event, stop = args
+                    waiters.append(event)
+                    running = running and not stop
+                else:
+                    name = getattr(method, "__name__", repr(method))
+                    try:
+                        if method(*args) is False:
+                            logger.error("Background %s could not write the tasks", name)
+                            self._failed("Could not write the tasks")
+                    except Exception as error:
+                        logger.exception("Background %s failed", name)
+                        self._failed(str(error) or type(error).__name__)
+            if not self.storage.flush():
+                logger.error("Could not flush the task storage")
+                self._failed("Could not write the tasks")
+            if profiling.enabled:
+                profiling.record("storage.worker_batch", time.perf_counter_ns() - started)
+                profiling.count("storage.worker_calls", len(batch) - len(waiters))
+            for _ in batch:
+                self.queue.task_done()
+            for event in waiters:
+                event.failed = self._unreported > 0
+                event.set()
+            if waiters:
+                self._unreported = 0
@@ -0,0 +1,407 @@
+"""Validated import and export of task files, optionally on several processes
+
+Files are read and written as streams in chunks of TRANSFER_CHUNK_SIZE
+tasks. With ``workers`` above one the chunks are parsed, validated and
+encoded by a pool of processes while this process only splits the input
+and writes the results in order, so converting a large file uses every
+core. Imported rows are checked by ``validate_record``; rejected rows are
+counted and described in the TransferReport instead of stopping the run.
+"""
+import concurrent.futures
+import glob
+import io
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from todo.files import atomic_writer
+from todo.binary import encode_binary
+from todo.formats import (
+    ENCODINGS,
+    FORMAT_BINARY,
+    FORMAT_CSV,
+    FORMAT_ICAL,
+    FORMAT_JSON,
+    FORMAT_NDJSON,
+    FORMATS,
+    READERS,
+    format_of,
+)
+from todo.models import CATEGORIES, Task, parse_due_date
+from todo.storage import BinaryTaskStorage, JsonTaskStorage, NdjsonTaskStorage
+
+
+# Tasks per chunk handed to a worker process
+TRANSFER_CHUNK_SIZE = 5000
+
+# Rejected rows described in a TransferReport; the others are only counted
+MAX_REPORTED_ERRORS = 20
+
+# Accepted spellings of the choice fields, matched case-insensitively
+PRIORITY_NAMES = {"high": "High", "low": "Low"}
+STATUS_NAMES = {"pending": "Pending", "completed": "Completed"}
+CATEGORY_NAMES = {category.lower(): category for category in CATEGORIES}
+
+
+def normalize_id(value) -> Optional[str]:
+    """A task id from an imported value, or None to give the task a new one
+
+    Ids are 32 hex digits; UUIDs written with dashes or in upper case are
+    accepted as the same id.
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.replace("-", "").lower()
+    if len(value) == 32 and all(char in "0123456789abcdef" for char in value):
+        return value
+    return None
+
+
+def _choice(record: Dict, field: str, names: Dict[str, str], default: str) -> str:
+    """The canonical spelling of a choice field, or default when empty"""
+    value = str(record.get(field) or "").strip()
+    if not value:
+        return default
+    canonical = names.get(value.lower())
+    if canonical is None:
+        raise ValueError(f"unknown {field} {value!r}")
+    return canonical
+
+
+def _date(record: Dict, field: str) -> str:
+    """A date field, checked with the rule of TodoApp.validate_date"""
+    value = str(record.get(field) or "").strip()
+    if value and parse_due_date(value) is None:
+        raise ValueError(f"invalid {field} {value!r}, use YYYY-MM-DD")
+    return value
+
+
+def validate_record(record: Dict) -> Dict:
+    """Check an imported task record and return it in canonical form
+
+    The name must not be empty; priority, category and status must be one
+    of the values the GUI offers (in any case) or empty for the default;
+    dates must be empty or valid YYYY-MM-DD dates. Raises ValueError
+    describing the first problem.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("not a task object")
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise ValueError("task name is empty")
+    # Keys in the order of Task.to_dict, so valid files convert unchanged
+    result = {}
+    task_id = normalize_id(record.get("id"))
+    if task_id:
+        result["id"] = task_id
+    result.update({
+        "name": name,
+        "priority": _choice(record, "priority", PRIORITY_NAMES, "Low"),
+        "due_date": _date(record, "due_date"),
+        "category": _choice(record, "category", CATEGORY_NAMES, "Personal"),
+        "status": _choice(record, "status", STATUS_NAMES, "Pending"),
+    })
+    completed_at = _date(record, "completed_at")
+    if completed_at and result["status"] == "Completed":
+        result["completed_at"] = completed_at
+    return result
+
+
+class TransferReport:
+    """Counts and timing of an import, export or conversion"""
+    def __init__(self, source: str, destination: str):
+        self.source = source
+        self.destination = destination
+        self.rows = 0
+        self.rejected = 0
+        self.errors: List[str] = []
+        self.seconds = 0.0
+    
+    def add_chunk(self, rows: int, errors: List[Tuple[int, str]]):
+        """Count a chunk whose errors are (row within the chunk, message) pairs"""
+        for position, message in errors:
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append(f"row {self.rows + position + 1}: {message}")
+        self.rows += rows
+        self.rejected += len(errors)
+    
+    @property
+    def rows_per_second(self) -> float:
+        """Rows read per second"""
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+    
+    def summary(self) -> str:
+        """One line for the command line"""
+        rejected = f" ({self.rejected} rejected)" if self.rejected else ""
+        return (f"{self.rows - self.rejected} tasks{rejected} from {self.source} to {self.destination} "
+                f"in {self.seconds:.2f} s, {self.rows_per_second:,.0f} rows/s")
+    
+    def to_dict(self) -> Dict:
+        """The report as JSON-friendly values"""
+        return {
+            "source": self.source, "destination": self.destination, "rows": self.rows,
+            "rejected": self.rejected, "errors": self.errors, "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second),
+        }
+
+
+def iter_chunks(f, file_format: str, size: int = TRANSFER_CHUNK_SIZE) -> Iterator:
+    """Split a binary task file into chunks of about size tasks
+
+    JSON arrays and binary files are decoded here and give lists of
+    records. The other formats give raw bytes cut between tasks, which
+    workers parse themselves: NDJSON between lines, CSV between rows (a line ends a row
+    when it leaves an even number of quotes; every chunk repeats the
+    header) and iCalendar after END:VTODO lines.
+    """
+    if file_format in (FORMAT_JSON, FORMAT_BINARY):
+        chunk = []
+        for record in READERS[file_format](f):
+            chunk.append(record)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+    header = b""
+    if file_format == FORMAT_CSV:
+        header = f.readline()
+        if header.count(b'"') % 2:
+            raise ValueError("CSV header row is not terminated")
+    lines = [header]
+    rows = 0
+    quotes = 0
+    for line in f:
+        lines.append(line)
+        if file_format == FORMAT_CSV:
+            quotes += line.count(b'"')
+            if quotes % 2:
+                # Inside a quoted field that spans lines
+                continue
+        elif file_format == FORMAT_ICAL and line.strip().upper() != b"END:VTODO":
+            continue
+        rows += 1
+        if rows >= size:
+            yield b"".join(lines)
+            lines = [header]
+            rows = 0
+    if len(lines) > 1:
+        yield b"".join(lines)
+
+
+def _read_chunk(source_format: str, payload) -> Iterator:
+    """Records of a chunk; an NDJSON line that is not JSON gives its error"""
+    if isinstance(payload, list):
+        return iter(payload)
+    if source_format == FORMAT_NDJSON:
+        return (_json_line(line) for line in payload.splitlines() if line.strip())
+    return READERS[source_format](io.BytesIO(payload))
+
+
+def _json_line(line: bytes):
+    """Decode one NDJSON line, or return the error as a ValueError"""
+    try:
+        return json.loads(line.decode('utf-8'))
+    except ValueError as error:
+        return ValueError(f"not valid JSON ({error})")
+
+
+def convert_chunk(source_format: str, payload, destination_format: Optional[str],
+                  validate: bool = True):
+    """Parse, check and encode one chunk; runs in the worker processes
+
+    Returns (output, rows, errors): output is the encoded accepted records
+    joined by the destination's separator, or the records themselves when
+    destination_format is None; errors are (row, message) pairs.
+    """
+    accepted = []
+    errors = []
+    rows = 0
+    for position, record in enumerate(_read_chunk(source_format, payload)):
+        rows += 1
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            accepted.append(validate_record(record) if validate else record)
+        except ValueError as error:
+            errors.append((position, str(error)))
+    if destination_format is None:
+        return accepted, rows, errors
+    encoding = ENCODINGS[destination_format]
+    return encoding.separator.join([encoding.encode(record) for record in accepted]), rows, errors
+
+
+def run_chunks(chunks: Iterable, source_format: str, destination_format: Optional[str],
+               workers: int = 1, validate: bool = True) -> Iterator:
+    """convert_chunk every chunk, in order, on up to workers processes
+
+    At most two chunks per worker are read ahead, so memory stays bounded
+    however large the input is.
+    """
+    if workers <= 1:
+        for payload in chunks:
+            yield convert_chunk(source_format, payload, destination_format, validate)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        running = deque()
+        for payload in chunks:
+            running.append(pool.submit(convert_chunk, source_format, payload, destination_format, validate))
+            if len(running) >= 2 * workers:
+                yield running.popleft().result()
+        while running:
+            yield running.popleft().result()
+
+
+def _encoded_format(file_format: str) -> Optional[str]:
+    """The format workers encode chunks in; binary files are encoded whole by _write_chunks"""
+    return None if file_format == FORMAT_BINARY else file_format
+
+
+def _write_chunks(results: Iterator, f, destination_format: str, report: TransferReport):
+    """Write encoded chunks as one file, counting them in report"""
+    if destination_format == FORMAT_BINARY:
+        def records():
+            for accepted, rows, errors in results:
+                report.add_chunk(rows, errors)
+                yield from accepted
+        f.write(encode_binary(records()))
+        return
+    encoding = ENCODINGS[destination_format]
+    empty = True
+    for output, rows, errors in results:
+        report.add_chunk(rows, errors)
+        if output:
+            f.write(encoding.header if empty else encoding.separator)
+            f.write(output)
+            empty = False
+    f.write(encoding.empty if empty else encoding.footer)
+
+
+def convert_file(source: str, destination: str, workers: int = 1,
+                 durability: Optional[str] = None) -> TransferReport:
+    """Convert a task file to another format, dropping invalid rows
+
+    Raises ValueError for an unknown format or a malformed JSON array and
+    OSError if a file cannot be read or written; the destination is only
+    replaced once the whole file was converted.
+    """
+    source_format = format_of(source)
+    destination_format = format_of(destination)
+    report = TransferReport(source, destination)
+    start = time.perf_counter()
+    with open(source, 'rb') as f, atomic_writer(destination, durability) as out:
+        chunks = iter_chunks(f, source_format)
+        _write_chunks(run_chunks(chunks, source_format, _encoded_format(destination_format), workers), out,
+                      destination_format, report)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def export_records(records: Iterable[Dict], destination: str, workers: int = 1,
+                   durability: Optional[str] = None, source: str = "tasks") -> TransferReport:
+    """Write task records to a file of any format without checking them"""
+    destination_format = format_of(destination)
+    report = TransferReport(source, destination)
+    start = time.perf_counter()
+    
+    def chunks():
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= TRANSFER_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    with atomic_writer(destination, durability) as out:
+        _write_chunks(run_chunks(chunks(), FORMAT_JSON, _encoded_format(destination_format), workers,
+                                 validate=False), out, destination_format, report)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def import_file(task_manager, filename: str, workers: int = 1) -> TransferReport:
+    """Add the valid tasks of a file of any format to a TaskManager
+
+    Tasks are added one chunk per storage write, keeping their ids unless
+    those are taken, and the whole import is undone as one change.
+    """
+    source_format = format_of(filename)
+    report = TransferReport(filename, task_manager.username)
+    start = time.perf_counter()
+    imported = []
+    task_manager.history.recording = False
+    try:
+        with open(filename, 'rb') as f:
+            for records, rows, errors in run_chunks(iter_chunks(f, source_format), source_format, None, workers):
+                report.add_chunk(rows, errors)
+                tasks = [Task.from_dict(record) for record in records]
+                task_manager.add_tasks(tasks)
+                imported.extend(tasks)
+    finally:
+        task_manager.history.recording = True
+        task_manager.history.record("add", f"Import {len(imported)} tasks", imported)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+# Snapshot storage of each task file format a user's tasks can be kept in
+SNAPSHOT_STORAGES = {
+    FORMAT_BINARY: BinaryTaskStorage,
+    FORMAT_NDJSON: NdjsonTaskStorage,
+    FORMAT_JSON: JsonTaskStorage,
+}
+
+
+def user_task_files(directory: str = ".") -> List[str]:
+    """The JSON, NDJSON or binary task file of every user in a directory
+
+    Users whose changes are still only in their journal are included,
+    under the name of the snapshot the journal belongs to.
+    """
+    stems = set()
+    for pattern in ["*_tasks." + file_format for file_format in SNAPSHOT_STORAGES] + ["*_tasks.journal"]:
+        stems.update(os.path.splitext(path)[0] for path in glob.glob(os.path.join(directory, pattern)))
+    files = []
+    for stem in sorted(stems):
+        candidates = [stem + "." + file_format for file_format in SNAPSHOT_STORAGES]
+        files.append(next((path for path in candidates if os.path.exists(path)), candidates[-1]))
+    return files
+
+
+def export_user_file(path: str, destination: str) -> TransferReport:
+    """Export one user's task file, journal included, to destination"""
+    storage = SNAPSHOT_STORAGES[format_of(path)](path)
+    try:
+        records = (task.to_dict() for task in storage.iter_load(save_ids=False))
+        return export_records(records, destination, source=path)
+    finally:
+        storage.close()
+
+
+def batch_export(directory: str, output_directory: str, file_format: str = FORMAT_CSV,
+                 workers: int = 1) -> List[TransferReport]:
+    """Export every user's tasks in directory to output_directory
+
+    Each ``<user>_tasks.json``, ``.ndjson`` or ``.tdb`` becomes
+    ``<user>_tasks.<file_format>`` in output_directory, which must be a
+    different directory. With several workers, users are exported in
+    parallel, one per process at a time.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown task file format: {file_format}")
+    os.makedirs(output_directory, exist_ok=True)
+    if os.path.samefile(directory, output_directory):
+        raise ValueError("The output directory must differ from the directory of the task files")
+    jobs = [
+        (path, os.path.join(output_directory, os.path.splitext(os.path.basename(path))[0] + "." + file_format))
+        for path in user_task_files(directory)
+    ]
+    if workers <= 1:
+        return [export_user_file(path, destination) for path, destination in jobs]
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(export_user_file, *zip(*jobs))) if jobs else []
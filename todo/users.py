@@ -0,0 +1,376 @@
+"""User accounts and authentication"""
+import json
+import os
+import hashlib
+import hmac
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from todo.files import DURABILITY, SQLITE_SYNCHRONOUS, atomic_write
+from todo.profiling import count, timed
+
+# Default user store for UserManager ("sqlite" or "json")
+USER_STORE_BACKEND = os.environ.get("TODO_USER_STORE", "sqlite")
+
+# Seconds to wait for another process holding the user database lock
+SQLITE_TIMEOUT = 10.0
+
+# Stored password hash format and its cost; raising the iteration count
+# rehashes each user's password on their next login
+PASSWORD_SCHEME = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = int(os.environ.get("TODO_PASSWORD_ITERATIONS", "600000"))
+SALT_BYTES = 16
+
+# Seconds a successful login is remembered for repeated verification
+SESSION_TTL = float(os.environ.get("TODO_SESSION_TTL", "300"))
+
+# Seconds a command-line login stays valid for later commands (0 turns it off)
+CLI_SESSION_TTL = float(os.environ.get("TODO_CLI_SESSION_TTL", "300"))
+
+# Usernames that can be registered; they also name the user's task files,
+# so they must not contain path separators or start with a dot
+USERNAME_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+
+def canonical_username(username: str) -> str:
+    """The form of a username accounts, sessions and task files use"""
+    return username.strip().lower()
+
+
+def valid_username(username: str) -> bool:
+    """Whether a canonical username is safe to use in file names"""
+    return USERNAME_PATTERN.fullmatch(username) is not None and not username.startswith(".")
+
+
+def cli_session_filename(username: str) -> str:
+    """File holding a user's command-line session token"""
+    return f"{username}_cli.session"
+
+
+class UserStore:
+    """Interface for user record storage keyed by normalized username"""
+    def get(self, username: str) -> Optional[Dict]:
+        """Get a user's record, or None if there is no such user"""
+        raise NotImplementedError
+    
+    def add(self, username: str, record: Dict) -> bool:
+        """Add a user; False if the username is taken or the write failed"""
+        raise NotImplementedError
+    
+    def update(self, username: str, record: Dict) -> bool:
+        """Replace an existing user's record"""
+        raise NotImplementedError
+    
+    def close(self):
+        """Release any open files or connections"""
+
+
+class JsonUserStore(UserStore):
+    """All users in one JSON file, rewritten on every change (legacy format)"""
+    def __init__(self, filename: str = "users.json", durability: Optional[str] = None):
+        self.filename = filename
+        self.durability = durability
+        self.users = self.load_users()
+    
+    def load_users(self) -> Dict:
+        """Load users from JSON file"""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                return {}
+        return {}
+    
+    def save_users(self):
+        """Save users to JSON file"""
+        try:
+            data = json.dumps(self.users, indent=2).encode('utf-8')
+            atomic_write(self.filename, data, self.durability)
+            return True
+        except (IOError, OSError):
+            return False
+    
+    def get(self, username: str) -> Optional[Dict]:
+        """Look the user up in the loaded file"""
+        return self.users.get(username)
+    
+    def add(self, username: str, record: Dict) -> bool:
+        """Add the user and rewrite the file"""
+        if username in self.users:
+            return False
+        self.users[username] = record
+        return self.save_users()
+    
+    def update(self, username: str, record: Dict) -> bool:
+        """Replace the user's record and rewrite the file"""
+        self.users[username] = record
+        return self.save_users()
+
+
+class SqliteUserStore(UserStore):
+    """Users in an SQLite table keyed by username
+
+    Registration is a single INSERT and login a single primary-key lookup,
+    so neither loads the other users. The primary key also makes concurrent
+    registration of the same name from two processes safe: exactly one
+    INSERT succeeds. Users from a legacy users.json are imported once.
+    """
+    def __init__(self, filename: str = "users.db", durability: Optional[str] = None,
+                 legacy_filename: Optional[str] = "users.json"):
+        self.filename = filename
+        self.conn = sqlite3.connect(filename, timeout=SQLITE_TIMEOUT, check_same_thread=False)
+        # Logins are checked on background threads, several at once in the API server
+        self.lock = threading.Lock()
+        self.conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS[durability or DURABILITY]}")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, record TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if legacy_filename is not None:
+            self.migrate_json(legacy_filename)
+    
+    def migrate_json(self, legacy_filename: str):
+        """Import users from a legacy users.json the first time it is seen"""
+        if not os.path.exists(legacy_filename):
+            return
+        with self.conn:
+            # Only one process imports; others wait on the write lock
+            self.conn.execute("BEGIN IMMEDIATE")
+            done = self.conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if done is not None:
+                return
+            users = JsonUserStore(legacy_filename).users
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO users (username, record) VALUES (?, ?)",
+                [(username, json.dumps(record)) for username, record in users.items()]
+            )
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1')")
+    
+    def get(self, username: str) -> Optional[Dict]:
+        """Fetch one user's record"""
+        with self.lock:
+            row = self.conn.execute("SELECT record FROM users WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def add(self, username: str, record: Dict) -> bool:
+        """Insert the user, failing if the name is already taken"""
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO users (username, record) VALUES (?, ?)", (username, json.dumps(record))
+                )
+        except sqlite3.Error:
+            return False
+        return True
+    
+    def update(self, username: str, record: Dict) -> bool:
+        """Replace the user's record"""
+        try:
+            with self.lock, self.conn:
+                cursor = self.conn.execute(
+                    "UPDATE users SET record = ? WHERE username = ?", (json.dumps(record), username)
+                )
+        except sqlite3.Error:
+            return False
+        return cursor.rowcount == 1
+    
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+def create_user_store(backend: Optional[str] = None, durability: Optional[str] = None) -> UserStore:
+    """Create the configured user store"""
+    backend = backend or USER_STORE_BACKEND
+    if backend == "sqlite":
+        return SqliteUserStore(durability=durability)
+    if backend == "json":
+        return JsonUserStore(durability=durability)
+    raise ValueError(f"Unknown user store: {backend}")
+
+
+class UserManager:
+    """Manages user credentials and authentication
+
+    Passwords are stored as salted PBKDF2-HMAC-SHA256 hashes in the form
+    ``pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>``. Deriving a hash is
+    deliberately slow, so successful logins are remembered for
+    ``session_ttl`` seconds: repeated verify_user calls with the same
+    credentials, and session tokens from create_session, skip the KDF.
+    Unsalted SHA-256 hashes from older versions, and hashes made with a
+    different iteration count, are rehashed on the next successful login.
+    Usernames are compared in their canonical form (see
+    canonical_username), and only names passing valid_username can be
+    registered.
+
+    Command-line processes are too short-lived for the in-memory caches, so
+    start_cli_session writes a random token to ``[username]_cli.session``,
+    readable only by its owner, and keeps its digest and expiry in the
+    user's record; check_cli_session accepts that file without the KDF
+    until it expires.
+    """
+    def __init__(self, store: Optional[UserStore] = None, durability: Optional[str] = None,
+                 iterations: Optional[int] = None, session_ttl: Optional[float] = None):
+        self.store = store if store is not None else create_user_store(durability=durability)
+        self.iterations = iterations or PASSWORD_ITERATIONS
+        self.session_ttl = SESSION_TTL if session_ttl is None else session_ttl
+        # username -> (keyed digest of the password, expiry)
+        self.verified: Dict[str, Tuple[bytes, float]] = {}
+        # token -> (username, expiry)
+        self.sessions: Dict[str, Tuple[str, float]] = {}
+        self.cache_key = secrets.token_bytes(32)
+        self.lock = threading.Lock()
+    
+    @timed("users.hash_password")
+    def hash_password(self, password: str, salt: Optional[bytes] = None,
+                      iterations: Optional[int] = None) -> str:
+        """Hash password using salted PBKDF2-HMAC-SHA256"""
+        salt = salt if salt is not None else secrets.token_bytes(SALT_BYTES)
+        iterations = iterations or self.iterations
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+        return f"{PASSWORD_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+    
+    def check_password(self, password: str, stored: str) -> bool:
+        """Compare a password against a stored hash in either format"""
+        if "$" not in stored:
+            # Legacy unsalted SHA-256
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, stored)
+        try:
+            scheme, iterations, salt, _ = stored.split("$")
+            if scheme != PASSWORD_SCHEME:
+                return False
+            expected = self.hash_password(password, bytes.fromhex(salt), int(iterations))
+        except ValueError:
+            return False
+        return hmac.compare_digest(expected, stored)
+    
+    def needs_rehash(self, stored: str) -> bool:
+        """Whether a stored hash is legacy or uses a different cost"""
+        return not stored.startswith(f"{PASSWORD_SCHEME}${self.iterations}$")
+    
+    @timed("users.register_user")
+    def register_user(self, username: str, password: str) -> bool:
+        """Register a new user; False for an invalid username or one already taken"""
+        username = canonical_username(username)
+        if not valid_username(username) or not password:
+            return False
+        
+        hashed_password = self.hash_password(password)
+        # Fails if the user already exists
+        return self.store.add(username, {"password": hashed_password})
+    
+    @timed("users.verify_user")
+    def verify_user(self, username: str, password: str) -> bool:
+        """Verify user credentials"""
+        username = canonical_username(username)
+        key = hmac.new(self.cache_key, password.encode(), hashlib.sha256).digest()
+        now = time.monotonic()
+        with self.lock:
+            cached = self.verified.get(username)
+        if cached is not None and cached[1] > now and hmac.compare_digest(cached[0], key):
+            count("users.verify_cached")
+            return True
+        
+        record = self.store.get(username)
+        if record is None or not self.check_password(password, record["password"]):
+            return False
+        
+        if self.needs_rehash(record["password"]):
+            self.store.update(username, dict(record, password=self.hash_password(password)))
+        if self.session_ttl > 0:
+            with self.lock:
+                self.verified[username] = (key, now + self.session_ttl)
+        return True
+    
+    def create_session(self, username: str, password: str) -> Optional[str]:
+        """Verify credentials and return a session token, or None
+
+        The session holds the canonical username, which is also the name
+        the GUI and CLI use for the user's task files. Expired sessions and
+        cached logins are dropped whenever a session is created.
+        """
+        if not self.verify_user(username, password):
+            return None
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self.lock:
+            self._purge_expired(now)
+            self.sessions[token] = (canonical_username(username), now + self.session_ttl)
+        return token
+    
+    def _purge_expired(self, now: float):
+        """Forget sessions and cached logins that expired before now; the caller holds lock"""
+        for cache in (self.sessions, self.verified):
+            expired = [key for key, (_, expiry) in cache.items() if expiry <= now]
+            for key in expired:
+                del cache[key]
+    
+    def check_session(self, token: str) -> Optional[str]:
+        """Return the username for a live session token, or None"""
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None:
+                return None
+            if session[1] <= time.monotonic():
+                del self.sessions[token]
+                return None
+            return session[0]
+    
+    def end_session(self, token: str):
+        """Invalidate a session token"""
+        with self.lock:
+            self.sessions.pop(token, None)
+    
+    def start_cli_session(self, username: str, ttl: Optional[float] = None) -> bool:
+        """Write a session token file for a user who just logged in on the command line"""
+        username = canonical_username(username)
+        ttl = CLI_SESSION_TTL if ttl is None else ttl
+        record = self.store.get(username)
+        if ttl <= 0 or record is None or not valid_username(username):
+            return False
+        token = secrets.token_hex(32)
+        filename = cli_session_filename(username)
+        try:
+            fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            # An existing file keeps its mode, so tighten it as well
+            if hasattr(os, "fchmod"):
+                os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(token)
+        except OSError:
+            return False
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        return self.store.update(username, dict(record, cli_session=[digest, time.time() + ttl]))
+    
+    @timed("users.check_cli_session")
+    def check_cli_session(self, username: str) -> bool:
+        """Whether the user's session token file is current, without deriving a hash"""
+        username = canonical_username(username)
+        if not valid_username(username):
+            return False
+        try:
+            with open(cli_session_filename(username)) as f:
+                token = f.read().strip()
+        except OSError:
+            return False
+        record = self.store.get(username)
+        session = record.get("cli_session") if record is not None else None
+        if not token or not session or session[1] <= time.time():
+            return False
+        return hmac.compare_digest(hashlib.sha256(token.encode()).hexdigest(), session[0])
+    
+    def user_exists(self, username: str) -> bool:
+        """Check if user exists"""
+        username = canonical_username(username)
+        return self.store.get(username) is not None
+    
+    def close(self):
+        """Close the user store"""
+        self.store.close()